@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+File: BackgroundTask.py
+Created on 2025-07-21
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import threading
+import traceback
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+
+class BackgroundTask(QObject):
+    """
+    Ejecuta una función en un QThread propio y devuelve el resultado mediante señales.
+    La función recibe un argumento `progress_callback(done, total)` que emite `progress`
+    y devuelve False cuando el usuario ha pedido cancelar; la función decide cómo abortar.
+    """
+    progress = Signal(float, float)  # (hecho, total); float para admitir recuentos de bytes > 2 GB
+    finished = Signal(object)        # resultado de la función
+    failed = Signal(str)             # mensaje de error
+    canceled = Signal()
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+        self._cancel_event = threading.Event()
+
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self._run)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        """ Pide la cancelación; se hace efectiva en la siguiente llamada a progress_callback. """
+        self._cancel_event.set()
+
+    def is_canceled(self):
+        return self._cancel_event.is_set()
+
+    def is_running(self):
+        return self._thread.isRunning()
+
+    def wait(self):
+        self._thread.wait()
+
+    def _report_progress(self, done, total):
+        self.progress.emit(float(done), float(total))
+        return not self._cancel_event.is_set()
+
+    @Slot()
+    def _run(self):
+        try:
+            result = self._function(*self._args, progress_callback=self._report_progress, **self._kwargs)
+            if self._cancel_event.is_set():
+                self.canceled.emit()
+            else:
+                self.finished.emit(result)
+        except Exception as e:
+            if self._cancel_event.is_set():
+                self.canceled.emit()
+            else:
+                traceback.print_exc()
+                self.failed.emit(str(e))
+        finally:
+            self._thread.quit()
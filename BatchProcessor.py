@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+File: BatchProcessor.py
+Created on 2025-07-23
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+
+Modo de línea de comandos: procesa directorios completos de archivos .ibt en paralelo
+sin importar PySide6, OpenGL ni matplotlib.
+
+    python main.py batch <carpetas o .ibt> -o <salida> [--format csv parquet] [--workers N]
+    python main.py batch <carpetas o .ibt> -o <salida> --scan   (solo metadatos de las cabeceras)
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from TelemetrySession import TelemetrySession
+from TelemetryExport import export_dataframe
+from IbtMetadata import scan_metadata
+
+DEFAULT_SECTORS = [0.25, 0.5, 0.75]
+
+
+def find_ibt_files(paths, recursive=False):
+    """ Devuelve los .ibt de las rutas indicadas (archivos sueltos o carpetas). """
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+        elif os.path.isdir(path):
+            if recursive:
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, n) for n in names if n.lower().endswith('.ibt'))
+            else:
+                files.extend(os.path.join(path, n) for n in os.listdir(path) if n.lower().endswith('.ibt'))
+        else:
+            print(f"ADVERTENCIA: La ruta '{path}' no existe y se ignora.")
+    return sorted(files)
+
+
+def output_names(files):
+    """
+    Nombre base de las salidas de cada archivo: el del .ibt o, si varios archivos de distintas
+    carpetas se llaman igual (p. ej. con -r), su ruta relativa a la carpeta común con '__' en
+    lugar del separador, para que no se sobrescriban entre sí.
+    """
+    stems = [os.path.splitext(os.path.basename(f))[0] for f in files]
+    counts = Counter(stem.lower() for stem in stems)  # En Windows el sistema de archivos no distingue mayúsculas
+    try:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files]) if files else ''
+    except ValueError:
+        root = None  # Unidades distintas: solo queda el sufijo numérico
+    names, used = [], set()
+    for path, stem in zip(files, stems):
+        name = stem
+        if counts[stem.lower()] > 1 and root is not None:
+            name = os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0].replace(os.sep, '__')
+        candidate, n = name, 2
+        while candidate.lower() in used:
+            candidate = f"{name}_{n}"
+            n += 1
+        used.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+
+def process_file(ibt_path, output_dir, formats=('csv',), sector_percents=DEFAULT_SECTORS, output_name=None):
+    """
+    Ejecuta la misma cadena que la aplicación (carga -> filter_driving_columns ->
+    remove_problematic_rows -> times_by_laps) y escribe el resumen de vueltas y las exportaciones
+    como <output_name>_laps.csv y <output_name>.<formato> (por defecto, el nombre del archivo).
+    Devuelve un diccionario con el resumen del archivo.
+    """
+    start = time.perf_counter()
+    name = output_name or os.path.splitext(os.path.basename(ibt_path))[0]
+    session = TelemetrySession(ibt_path)
+    if session.dataframe.empty:
+        return {'File': ibt_path, 'Samples': 0, 'Laps': 0, 'BestLap': None, 'BestTime': None,
+                'Seconds': time.perf_counter() - start, 'Error': 'Sin datos de telemetría'}
+
+    session.filter_driving_columns()
+    session.remove_problematic_rows()
+    session.laps_df = session.times_by_laps(sector_percents)
+    session.close()
+
+    session.laps_df.to_csv(os.path.join(output_dir, f"{name}_laps.csv"), index=False)
+    for fmt in formats:
+        export_dataframe(session.dataframe, os.path.join(output_dir, f"{name}.{fmt}"))
+
+    # Mejor vuelta completa y válida: el tramo cortado al cerrar la sesión no cuenta
+    best_lap, best_time = session.best_lap(), None
+    if best_lap is not None:
+        best_time = float(session.laps_df.loc[session.laps_df['Lap'] == best_lap, 'Time'].iloc[0])
+    glitches = int(session.dataframe['GpsGlitch'].sum()) if 'GpsGlitch' in session.dataframe.columns else 0
+    return {'File': ibt_path, 'Samples': len(session.dataframe), 'Laps': len(session.laps_df),
+            'BestLap': best_lap, 'BestTime': best_time, 'GpsGlitches': glitches,
+            'InvalidLaps': ' '.join(str(lap) for lap in sorted(session.invalid_laps)),
+            'Seconds': time.perf_counter() - start, 'Error': None}
+
+
+def run_batch(files, output_dir, formats=('csv',), workers=None, sector_percents=DEFAULT_SECTORS):
+    """ Reparte los archivos entre un pool de procesos y devuelve el resumen de todos. """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, f, output_dir, formats, sector_percents, name): f
+                   for f, name in zip(files, output_names(files))}
+        for i, future in enumerate(as_completed(futures), start=1):
+            ibt_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'File': ibt_path, 'Samples': 0, 'Laps': 0, 'BestLap': None, 'BestTime': None,
+                          'Seconds': None, 'Error': str(e)}
+            results.append(result)
+            status = result['Error'] or f"{result['Laps']} vueltas en {result['Seconds']:.1f} s"
+            print(f"[{i}/{len(files)}] {os.path.basename(ibt_path)}: {status}")
+
+    summary = pd.DataFrame(results).sort_values('File')
+    summary.to_csv(os.path.join(output_dir, "batch_summary.csv"), index=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py batch",
+                                     description="Procesa archivos .ibt sin interfaz gráfica.")
+    parser.add_argument('inputs', nargs='+', help="Archivos .ibt o carpetas que los contienen")
+    parser.add_argument('-o', '--output', default='telemetry_output', help="Carpeta de salida")
+    parser.add_argument('-f', '--format', nargs='*', default=['csv'], choices=['csv', 'parquet', 'feather'],
+                        help="Formatos de exportación de la telemetría (ninguno = solo resumen de vueltas)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Buscar .ibt también en subcarpetas")
+    parser.add_argument('--scan', action='store_true',
+                        help="Solo leer las cabeceras (pista, coche, fecha, vueltas) y escribir scan_summary.csv")
+    parser.add_argument('--sectors', type=float, nargs='+', default=DEFAULT_SECTORS,
+                        help="Porcentajes de vuelta que delimitan los sectores")
+    args = parser.parse_args(argv)
+
+    files = find_ibt_files(args.inputs, args.recursive)
+    if not files:
+        print("ERROR: No se encontraron archivos .ibt.")
+        return 1
+
+    if args.scan:
+        start = time.perf_counter()
+        os.makedirs(args.output, exist_ok=True)
+        summary = scan_metadata(files)
+        summary.to_csv(os.path.join(args.output, "scan_summary.csv"), index=False)
+        print(f"INFO: {len(files)} cabeceras leídas en {(time.perf_counter() - start) * 1000:.0f} ms. "
+              f"Resultados en '{args.output}'.")
+        return 1 if 'error' in summary.columns and summary['error'].notna().any() else 0
+
+    print(f"INFO: Procesando {len(files)} archivos .ibt...")
+    start = time.perf_counter()
+    summary = run_batch(files, args.output, args.format, args.workers, args.sectors)
+    errors = summary['Error'].notna().sum()
+    print(f"INFO: Lote completado en {time.perf_counter() - start:.1f} s ({errors} con errores). "
+          f"Resultados en '{args.output}'.")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
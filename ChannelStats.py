@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+File: ChannelStats.py
+Created on 2025-07-27
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+import pandas as pd
+
+# Percentiles que se incluyen en el resumen (columnas p1, p5, ...)
+STAT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Columnas que se apilan en cada bloque: acota la memoria de la matriz muestras x canales
+STATS_BLOCK_COLUMNS = 16
+
+
+def numeric_columns(df):
+    return df.select_dtypes(include=[np.number, 'bool']).columns.tolist()
+
+
+def compute_stats(df, columns=None):
+    """
+    Estadísticos de varias columnas a la vez: se apilan en una matriz muestras x canales y
+    cada estadístico se calcula con una sola llamada vectorizada por eje.
+    Devuelve un DataFrame indexado por canal con count, nan, min, max, mean, std y pN.
+    """
+    columns = numeric_columns(df) if columns is None else [c for c in columns if c in df.columns]
+    stat_names = ['count', 'nan', 'min', 'max', 'mean', 'std'] + [f'p{p}' for p in STAT_PERCENTILES]
+    blocks = []
+    for start in range(0, len(columns), STATS_BLOCK_COLUMNS):
+        names = columns[start:start + STATS_BLOCK_COLUMNS]
+        values = df[names].to_numpy(dtype=np.float64)
+        nan = np.isnan(values).sum(axis=0)
+        count = len(values) - nan
+        block = np.full((len(names), len(stat_names)), np.nan)
+        block[:, 0] = count
+        block[:, 1] = nan
+        has_data = count > 0
+        if has_data.any():
+            data = values[:, has_data]
+            block[has_data, 2] = np.nanmin(data, axis=0)
+            block[has_data, 3] = np.nanmax(data, axis=0)
+            block[has_data, 4] = np.nanmean(data, axis=0)
+            block[has_data, 5] = np.nanstd(data, axis=0)
+            block[has_data, 6:] = np.nanpercentile(data, STAT_PERCENTILES, axis=0).T
+        blocks.append(pd.DataFrame(block, index=names, columns=stat_names))
+    if not blocks:
+        return pd.DataFrame(columns=stat_names, dtype=np.float64)
+    return pd.concat(blocks)
+
+
+class ChannelStats:
+    """
+    Estadísticos por canal de una TelemetrySession. El resumen de la sesión se calcula en
+    una pasada para todas las columnas numéricas y después solo para las columnas nuevas
+    (canales decodificados bajo demanda). Los de cada vuelta se calculan al pedirlos.
+    Todo se invalida cuando cambian las filas (rows_version) o se reescribe una columna.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._version = None
+        self._summary = None
+        self._laps = {}     # vuelta -> DataFrame de estadísticos
+
+    def _check_version(self):
+        if self._version != self.session.rows_version:
+            self._version = self.session.rows_version
+            self._summary = None
+            self._laps = {}
+
+    def summary(self):
+        """ Estadísticos de todas las columnas numéricas decodificadas. """
+        self._check_version()
+        df = self.session.dataframe
+        columns = numeric_columns(df)
+        if self._summary is None:
+            self._summary = compute_stats(df, columns)
+        else:
+            missing = [c for c in columns if c not in self._summary.index]
+            if missing:
+                self._summary = pd.concat([self._summary, compute_stats(df, missing)])
+            if len(self._summary) != len(columns):
+                self._summary = self._summary.loc[columns]  # Columnas eliminadas del DataFrame
+        return self._summary
+
+    def column(self, name):
+        """ Fila de estadísticos de un canal (None si no está decodificado o no es numérico). """
+        summary = self.summary()
+        return summary.loc[name] if name in summary.index else None
+
+    def value_range(self, columns):
+        """ (mínimo, máximo) conjunto de varias columnas; (nan, nan) si no hay ninguna. """
+        summary = self.summary()
+        present = [c for c in columns if c in summary.index]
+        if not present:
+            return np.nan, np.nan
+        return summary.loc[present, 'min'].min(), summary.loc[present, 'max'].max()
+
+    def lap(self, lap_num):
+        """ Estadísticos de una vuelta, calculados la primera vez que se piden. """
+        self._check_version()
+        df = self.session.lap_slice(lap_num)
+        columns = numeric_columns(df)
+        stats = self._laps.get(lap_num)
+        if stats is None:
+            stats = compute_stats(df, columns)
+        else:
+            missing = [c for c in columns if c not in stats.index]
+            if missing:
+                stats = pd.concat([stats, compute_stats(df, missing)])
+        self._laps[lap_num] = stats
+        return stats
+
+    def invalidate(self, columns=None, lap=None):
+        """ Descarta los estadísticos de columnas reescritas (todas si columns es None) o de una vuelta. """
+        if lap is not None:
+            self._laps.pop(lap, None)
+            return
+        if columns is None:
+            self._summary = None
+            self._laps = {}
+            return
+        if self._summary is not None:
+            self._summary = self._summary.drop(index=[c for c in columns if c in self._summary.index])
+        for lap_num, stats in self._laps.items():
+            self._laps[lap_num] = stats.drop(index=[c for c in columns if c in stats.index])
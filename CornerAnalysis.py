@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+File: CornerAnalysis.py
+Created on 2025-08-03
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CORNER_PARAMS = {
+    'lat_accel_threshold': 4.0,    # m/s²: aceleración lateral a partir de la cual se está girando
+    'yaw_rate_threshold': 0.15,    # rad/s
+    'steering_threshold': 0.35,    # rad de volante
+    'smooth_m': 15.0,              # Ventana (m) de la media móvil de la señal de giro
+    'min_length_m': 25.0,          # Curvas más cortas se descartan
+    'merge_gap_m': 30.0,           # Curvas separadas por menos de esto se unen (chicanes, curvas dobles)
+    'brake_threshold': 0.1,        # Freno mínimo para el punto de frenada
+    'brake_search_m': 400.0,       # Distancia antes del vértice en la que se busca la frenada
+}
+
+# Canales de la vuelta de referencia que definen el giro: (canal, parámetro del umbral)
+CORNERING_CHANNELS = [
+    ('LatAccel', 'lat_accel_threshold'),
+    ('YawRate', 'yaw_rate_threshold'),
+    ('SteeringWheelAngle', 'steering_threshold'),
+]
+
+CORNER_METRICS = {
+    'MinSpeed': "Velocidad mínima (km/h)",
+    'EntrySpeed': "Velocidad de entrada (km/h)",
+    'ExitSpeed': "Velocidad de salida (km/h)",
+    'Time': "Tiempo en curva (s)",
+    'BrakePoint': "Punto de frenada (m antes del vértice)",
+}
+
+
+def _moving_average(values, window):
+    if window <= 1:
+        return values
+    kernel = np.ones(int(window)) / int(window)
+    return np.convolve(np.nan_to_num(values), kernel, mode='same')
+
+
+def detect_corners(grid, channels, speed, **params):
+    """
+    Curvas de una vuelta de referencia remuestreada sobre la rejilla de distancia `grid`.
+    channels: {canal: array} con los canales de CORNERING_CHANNELS disponibles; cada uno se
+    normaliza por su umbral y se toma el máximo, de modo que basta con que uno indique giro.
+    Entrada y salida son los límites del tramo en giro y el vértice, la velocidad mínima.
+    Devuelve un DataFrame con Corner, EntryIdx, ApexIdx, ExitIdx, EntryDist, ApexDist,
+    ExitDist y Direction ('I' / 'D').
+    """
+    p = dict(DEFAULT_CORNER_PARAMS)
+    p.update(params)
+    columns = ['Corner', 'EntryIdx', 'ApexIdx', 'ExitIdx', 'EntryDist', 'ApexDist', 'ExitDist', 'Direction']
+    if len(grid) < 3 or not channels:
+        return pd.DataFrame(columns=columns)
+    step = float(grid[1] - grid[0])
+    window = max(1, int(round(p['smooth_m'] / step)))
+
+    signal = np.zeros(len(grid))
+    direction = np.zeros(len(grid))
+    for channel, threshold in CORNERING_CHANNELS:
+        if channel not in channels:
+            continue
+        smoothed = _moving_average(channels[channel], window)
+        signal = np.maximum(signal, np.abs(smoothed) / p[threshold])
+        if channel == 'LatAccel' or not direction.any():
+            direction = smoothed
+
+    turning = np.concatenate(([False], signal > 1.0, [False]))
+    edges = np.flatnonzero(np.diff(turning.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]  # fin exclusivo
+    if len(starts) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # Unir tramos separados por huecos cortos y descartar los demasiado cortos
+    gaps = (starts[1:] - ends[:-1]) * step
+    keep_start = np.concatenate(([True], gaps >= p['merge_gap_m']))
+    keep_end = np.concatenate((gaps >= p['merge_gap_m'], [True]))
+    starts, ends = starts[keep_start], ends[keep_end]
+    long_enough = (ends - starts) * step >= p['min_length_m']
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    speed = np.asarray(speed, dtype=np.float64)
+    # La rejilla llega a la vuelta más larga: la última curva termina donde acaba la referencia
+    finite = np.flatnonzero(np.isfinite(speed))
+    if len(finite):
+        ends = np.minimum(ends, finite[-1] + 1)
+        valid = ends > starts
+        starts, ends = starts[valid], ends[valid]
+    apexes = np.array([s + int(np.nanargmin(speed[s:e])) if np.isfinite(speed[s:e]).any() else (s + e) // 2
+                       for s, e in zip(starts, ends)], dtype=np.int64)
+    exits = ends - 1
+    sides = np.array(['I' if np.nanmean(direction[s:e]) > 0 else 'D' for s, e in zip(starts, ends)])
+    return pd.DataFrame({
+        'Corner': np.arange(1, len(starts) + 1),
+        'EntryIdx': starts.astype(np.int64), 'ApexIdx': apexes, 'ExitIdx': exits.astype(np.int64),
+        'EntryDist': grid[starts], 'ApexDist': grid[apexes], 'ExitDist': grid[exits],
+        'Direction': sides,
+    }, columns=columns)
+
+
+def corner_metrics(grid, corners, laps, speed, brake, elapsed, **params):
+    """
+    Matriz curvas x vueltas de cada métrica de CORNER_METRICS, calculada para todas las vueltas
+    a la vez sobre las matrices remuestreadas (vueltas x rejilla) de velocidad, freno y tiempo.
+    Devuelve {métrica: DataFrame (índice = vuelta, columnas = curva)}.
+    """
+    p = dict(DEFAULT_CORNER_PARAMS)
+    p.update(params)
+    laps = list(laps)
+    names = corners['Corner'].tolist()
+    if corners.empty or not laps:
+        return {metric: pd.DataFrame(index=pd.Index(laps, name='Lap'), columns=names, dtype=np.float64)
+                for metric in CORNER_METRICS}
+
+    entry = corners['EntryIdx'].to_numpy()
+    apex = corners['ApexIdx'].to_numpy()
+    exit_ = corners['ExitIdx'].to_numpy()
+    step = float(grid[1] - grid[0])
+    kmh = speed * 3.6
+
+    # Mínimo de cada tramo [entrada, salida] de todas las vueltas con una sola llamada (fmin ignora NaN)
+    padded = np.concatenate((kmh, np.full((len(laps), 1), np.nan)), axis=1)
+    bounds = np.column_stack((entry, exit_ + 1)).ravel()
+    min_speed = np.fmin.reduceat(padded, bounds, axis=1)[:, 0::2]
+
+    # Punto de frenada: primera muestra con freno en la ventana previa al vértice (sin pasar de la curva anterior)
+    previous_exit = np.concatenate(([0], exit_[:-1] + 1))
+    search_start = np.maximum(previous_exit, apex - int(p['brake_search_m'] / step))
+    braking = np.nan_to_num(brake) > p['brake_threshold']
+    brake_point = np.full((len(laps), len(names)), np.nan)
+    for k, (lo, hi) in enumerate(zip(search_start, apex + 1)):
+        window = braking[:, lo:hi]
+        found = window.any(axis=1)
+        first = window.argmax(axis=1)
+        brake_point[found, k] = grid[apex[k]] - grid[lo + first[found]]
+
+    values = {
+        'MinSpeed': min_speed,
+        'EntrySpeed': kmh[:, entry],
+        'ExitSpeed': kmh[:, exit_],
+        'Time': elapsed[:, exit_] - elapsed[:, entry],
+        'BrakePoint': brake_point,
+    }
+    index = pd.Index(laps, name='Lap')
+    return {metric: pd.DataFrame(matrix, index=index, columns=names) for metric, matrix in values.items()}
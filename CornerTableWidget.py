@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+'''
+File: CornerTableWidget.py
+Created on 2025-08-03
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+'''
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QComboBox, QTableWidget, QTableWidgetItem
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QColor
+import numpy as np
+
+from CornerAnalysis import CORNER_METRICS
+
+# Métricas en las que el mejor valor es el mayor (en el resto, el menor)
+HIGHER_IS_BETTER = {'MinSpeed', 'EntrySpeed', 'ExitSpeed'}
+
+
+class CornerTableWidget(QWidget):
+    """
+    Tabla vueltas x curvas de la métrica elegida (velocidad mínima, tiempo en curva...).
+    El mejor valor de cada curva entre las vueltas válidas se marca en magenta.
+    """
+    corner_selected = Signal(float, float)  # (pct de entrada, pct de salida) de la curva pulsada
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.metric_combo = QComboBox()
+        for metric, label in CORNER_METRICS.items():
+            self.metric_combo.addItem(label, metric)
+        self.metric_combo.currentIndexChanged.connect(self._fill_table)
+        layout.addWidget(self.metric_combo)
+
+        self.table = QTableWidget()
+        self.table.verticalHeader().setVisible(False)
+        self.table.setAlternatingRowColors(True)
+        self.table.setShowGrid(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().sectionClicked.connect(self.on_header_clicked)
+        layout.addWidget(self.table)
+
+        self.corners = None
+        self.metrics = {}
+        self.invalid_laps = set()
+
+    def update_data(self, corners, metrics, invalid_laps=None):
+        self.corners = corners
+        self.metrics = metrics
+        self.invalid_laps = set(invalid_laps or [])
+        self._fill_table()
+
+    def _fill_table(self):
+        metric = self.metric_combo.currentData()
+        matrix = self.metrics.get(metric)
+        self.table.setRowCount(0)
+        if matrix is None or self.corners is None or self.corners.empty:
+            self.table.setColumnCount(0)
+            return
+
+        headers = ["Vuelta"] + [f"C{c} ({d})" for c, d in zip(self.corners['Corner'], self.corners['Direction'])]
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(matrix))
+
+        values = matrix.to_numpy(dtype=np.float64)
+        laps = matrix.index.to_numpy()
+        valid = ~np.isin(laps, list(self.invalid_laps))
+        best_rows = {}
+        if valid.any():
+            candidates = np.where(valid[:, None], values, np.nan)
+            finite = np.isfinite(candidates).any(axis=0)
+            pick = np.nanargmax if metric in HIGHER_IS_BETTER else np.nanargmin
+            for col in np.flatnonzero(finite):
+                best_rows[col] = int(pick(candidates[:, col]))
+
+        decimals = 3 if metric == 'Time' else 1
+        for row, lap in enumerate(laps):
+            item = QTableWidgetItem(str(int(lap)))
+            item.setTextAlignment(Qt.AlignCenter)
+            if not valid[row]:
+                item.setForeground(QColor('gray'))
+            self.table.setItem(row, 0, item)
+            for col, value in enumerate(values[row]):
+                item = QTableWidgetItem("" if np.isnan(value) else f"{value:.{decimals}f}")
+                item.setTextAlignment(Qt.AlignCenter)
+                if not valid[row]:
+                    item.setForeground(QColor('gray'))
+                elif best_rows.get(col) == row:
+                    item.setForeground(QColor('magenta'))
+                    font = item.font()
+                    font.setBold(True)
+                    item.setFont(font)
+                self.table.setItem(row, col + 1, item)
+        self.table.resizeColumnsToContents()
+
+    def on_header_clicked(self, logical_index):
+        """ Al pulsar la cabecera de una curva se emite su tramo para ajustar el slider de distancia. """
+        if logical_index < 1 or self.corners is None or logical_index > len(self.corners):
+            return
+        corner = self.corners.iloc[logical_index - 1]
+        self.corner_selected.emit(float(corner['EntryPct']), float(corner['ExitPct']))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+'''
+File: EventListWidget.py
+Created on 2025-07-25
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+'''
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QColor
+import pandas as pd
+
+# Nombre visible y color (RGBA 0-1) de cada tipo de evento
+EVENT_STYLES = {
+    'LF_Lockup': ("Bloqueo DI", (1.0, 0.15, 0.15, 1.0)),
+    'RF_Lockup': ("Bloqueo DD", (1.0, 0.15, 0.15, 1.0)),
+    'LR_Lockup': ("Bloqueo TI", (1.0, 0.45, 0.15, 1.0)),
+    'RR_Lockup': ("Bloqueo TD", (1.0, 0.45, 0.15, 1.0)),
+    'WheelSpin': ("Patinaje", (1.0, 0.85, 0.1, 1.0)),
+    'ABS_Active': ("ABS", (0.3, 0.7, 1.0, 1.0)),
+}
+
+
+class EventListWidget(QWidget):
+    event_selected = Signal(int)  # Emite la fila (tick) de inicio del evento
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Tipo", "Vuelta", "% Vuelta", "Duración (s)", "Severidad"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setAlternatingRowColors(True)
+        self.table.setShowGrid(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setStyleSheet("""
+            QTableWidget {
+                background-color: #2E2E2E;
+                color: #FFFFFF;
+                border: none;
+            }
+            QHeaderView::section {
+                background-color: #3A3A3A;
+                color: #CCCCCC;
+                padding: 4px;
+                border: 1px solid #555555;
+            }
+            QTableWidget::item:selected {
+                background-color: #555555;
+            }
+        """)
+        self.table.cellClicked.connect(self._on_cell_clicked)
+        layout.addWidget(self.table)
+
+        self._start_rows = []
+
+    def update_events(self, events: pd.DataFrame):
+        """ Rellena la lista con las filas del índice de eventos (TelemetrySession.event_index). """
+        self.table.setRowCount(0)
+        self._start_rows = []
+        if events is None or events.empty:
+            return
+
+        self.table.setRowCount(len(events))
+        for row, event in enumerate(events.itertuples(index=False)):
+            label, rgba = EVENT_STYLES.get(event.Type, (event.Type, (1.0, 1.0, 1.0, 1.0)))
+            values = [label, str(int(event.Lap)), f"{event.PctStart * 100:.1f}%",
+                      f"{event.Duration:.2f}", "" if pd.isna(event.PeakSeverity) else f"{event.PeakSeverity:.2f}"]
+            for col, text in enumerate(values):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignCenter)
+                if col == 0:
+                    item.setForeground(QColor.fromRgbF(*rgba))
+                self.table.setItem(row, col, item)
+            self._start_rows.append(int(event.StartRow))
+        self.table.resizeColumnsToContents()
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+    def _on_cell_clicked(self, row, column):
+        if 0 <= row < len(self._start_rows):
+            self.event_selected.emit(self._start_rows[row])
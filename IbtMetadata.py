@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+File: IbtMetadata.py
+Created on 2025-08-01
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import os
+import re
+import datetime
+from functools import lru_cache
+
+import pandas as pd
+import yaml
+
+from IbtReader import read_headers
+
+
+def _yaml_loader():
+    # El cargador en C de PyYAML es ~10 veces más rápido; no todas las instalaciones lo incluyen
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def parse_session_info(text):
+    """
+    Convierte el bloque YAML de iRacing en un diccionario. Algunos valores libres (nombres de
+    piloto o equipo) no son YAML válido; si falla la primera lectura se entrecomillan y se reintenta.
+    """
+    if not text:
+        return {}
+    try:
+        return yaml.load(text, Loader=_yaml_loader()) or {}
+    except yaml.YAMLError:
+        pass
+    quoted = re.sub(r'^(\s*(?:- )?\w+: )(?=[*&!%@`|>]|.*: |.* #)(\S.*?)\s*$',
+                    lambda m: m.group(1) + '"' + m.group(2).replace('\\', '\\\\').replace('"', '\\"') + '"',
+                    text, flags=re.MULTILINE)
+    try:
+        return yaml.load(quoted, Loader=_yaml_loader()) or {}
+    except yaml.YAMLError as e:
+        print(f"ADVERTENCIA: No se pudo leer la información de sesión: {e}")
+        return {}
+
+
+@lru_cache(maxsize=1024)
+def _read_metadata_cached(path, size, mtime_ns):
+    """ Lectura de cabeceras + YAML, cacheada por (ruta, tamaño, fecha de modificación). """
+    with open(path, 'rb') as f:
+        header, disk_header = read_headers(f)
+        yaml_len = int(header['session_info_len'])
+        text = ''
+        if yaml_len > 0:
+            f.seek(int(header['session_info_offset']))
+            text = f.read(yaml_len).rstrip(b'\x00').decode('cp1252', errors='replace')
+
+    info = parse_session_info(text)
+    weekend = info.get('WeekendInfo') or {}
+    driver_info = info.get('DriverInfo') or {}
+    drivers = driver_info.get('Drivers') or []
+    car_idx = driver_info.get('DriverCarIdx', 0)
+    driver = next((d for d in drivers if d.get('CarIdx') == car_idx), drivers[0] if drivers else {})
+    sessions = (info.get('SessionInfo') or {}).get('Sessions') or []
+
+    # Mientras iRacing escribe el archivo el contador de registros es 0: se deduce del tamaño
+    record_count = int(disk_header['session_record_count'])
+    buf_len = int(header['buf_len'])
+    if record_count <= 0 and buf_len > 0:
+        record_count = max(0, (size - int(header['var_buf'][0]['buf_offset'])) // buf_len)
+    tick_rate = int(header['tick_rate'])
+    start_date = int(disk_header['session_start_date'])
+
+    return {
+        'path': path,
+        'track': str(weekend.get('TrackDisplayName') or weekend.get('TrackName') or ''),
+        'track_config': str(weekend.get('TrackConfigName') or ''),
+        'car': str(driver.get('CarScreenName') or ''),
+        'driver': str(driver.get('UserName') or ''),
+        'session_type': str(sessions[-1].get('SessionType') or '') if sessions else '',
+        'session_date': datetime.datetime.fromtimestamp(start_date).strftime('%Y-%m-%d %H:%M') if start_date > 0 else None,
+        'tick_rate': tick_rate,
+        'record_count': record_count,
+        'duration': record_count / tick_rate if tick_rate else 0.0,
+        'lap_count': int(disk_header['session_lap_count']),
+        'num_vars': int(header['num_vars']),
+    }
+
+
+def read_metadata(ibt_path):
+    """
+    Metadatos de un .ibt leyendo solo la cabecera, el sub-header de disco y el YAML de sesión
+    (ninguna muestra): pista, coche, piloto, tipo de sesión, fecha, registros, frecuencia y vueltas.
+    Devuelve un diccionario nuevo en cada llamada; el análisis del YAML se reutiliza mientras
+    el archivo no cambie de tamaño ni de fecha.
+    """
+    path = os.path.abspath(ibt_path)
+    stat = os.stat(path)
+    return dict(_read_metadata_cached(path, stat.st_size, stat.st_mtime_ns))
+
+
+def metadata_summary(metadata):
+    """ Texto de una línea con los metadatos (tooltips del menú de archivos recientes). """
+    parts = [metadata.get('track'), metadata.get('car'), metadata.get('session_type'), metadata.get('session_date')]
+    if metadata.get('lap_count'):
+        parts.append(f"{metadata['lap_count']} vueltas")
+    if metadata.get('tick_rate'):
+        minutes, seconds = divmod(int(metadata['duration']), 60)
+        parts.append(f"{minutes}:{seconds:02d} a {metadata['tick_rate']} Hz")
+    return " · ".join(str(p) for p in parts if p)
+
+
+def scan_metadata(files):
+    """ Metadatos de una lista de .ibt en un DataFrame (una fila por archivo; columna 'error' si falla). """
+    rows = []
+    for path in files:
+        try:
+            rows.append(read_metadata(path))
+        except (OSError, ValueError, IndexError) as e:
+            rows.append({'path': os.path.abspath(path), 'error': str(e)})
+    return pd.DataFrame(rows)
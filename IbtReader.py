@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+File: IbtReader.py
+Created on 2025-07-20
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import os
+import numpy as np
+
+# Tipos de variable del SDK de iRacing (irsdk.VAR_TYPE_MAP): char, bool, int, bitfield, float, double
+IBT_VAR_TYPES = {
+    0: np.dtype('S1'),
+    1: np.dtype('?'),
+    2: np.dtype('<i4'),
+    3: np.dtype('<u4'),
+    4: np.dtype('<f4'),
+    5: np.dtype('<f8'),
+}
+
+# Cabecera principal (112 bytes) seguida del sub-header de disco (32 bytes)
+_HEADER_DTYPE = np.dtype([
+    ('version', '<i4'), ('status', '<i4'), ('tick_rate', '<i4'),
+    ('session_info_update', '<i4'), ('session_info_len', '<i4'), ('session_info_offset', '<i4'),
+    ('num_vars', '<i4'), ('var_header_offset', '<i4'),
+    ('num_buf', '<i4'), ('buf_len', '<i4'), ('cur_buf_tick_count', '<i4'), ('cur_buf', '<i4'),
+    ('var_buf', [('tick_count', '<i4'), ('buf_offset', '<i4'), ('tick_count_begin', '<i4'), ('pad', '<i4')], (4,)),
+])
+_DISK_HEADER_OFFSET = 112
+_DISK_HEADER_DTYPE = np.dtype([
+    ('session_start_date', '<u8'), ('session_start_time', '<f8'), ('session_end_time', '<f8'),
+    ('session_lap_count', '<i4'), ('session_record_count', '<i4'),
+])
+# Cada cabecera de variable ocupa 144 bytes
+_VAR_HEADER_DTYPE = np.dtype([
+    ('type', '<i4'), ('offset', '<i4'), ('count', '<i4'), ('count_as_time', '?'), ('pad', 'V3'),
+    ('name', 'S32'), ('desc', 'S64'), ('unit', 'S32'),
+])
+
+
+def read_headers(f):
+    """ Lee la cabecera principal y el sub-header de disco de un archivo .ibt abierto en binario. """
+    f.seek(0)
+    header = np.frombuffer(f.read(_HEADER_DTYPE.itemsize), dtype=_HEADER_DTYPE)[0]
+    f.seek(_DISK_HEADER_OFFSET)
+    disk_header = np.frombuffer(f.read(_DISK_HEADER_DTYPE.itemsize), dtype=_DISK_HEADER_DTYPE)[0]
+    return header, disk_header
+
+
+class IbtReader:
+    """
+    Lector nativo de archivos .ibt basado en np.memmap.
+    Solo se leen las cabeceras al abrir; la zona de muestras se mapea con un dtype
+    estructurado construido a partir de las cabeceras de variables, de modo que cada
+    canal es una vista sin copia sobre el archivo.
+    """
+
+    def __init__(self, ibt_path: str = None):
+        self.ibt_path = None
+        self.header = None
+        self.disk_header = None
+        self.var_headers = {}     # nombre -> (tipo, offset, count, unidad, descripción)
+        self.record_dtype = None
+        self.records = None       # np.memmap estructurado (una fila por tick)
+
+        if ibt_path is not None:
+            self.open(ibt_path)
+
+    def open(self, ibt_path: str):
+        self.close()
+        self.ibt_path = ibt_path
+        with open(ibt_path, 'rb') as f:
+            self.header, self.disk_header = read_headers(f)
+            num_vars = int(self.header['num_vars'])
+            f.seek(int(self.header['var_header_offset']))
+            raw_headers = np.frombuffer(f.read(num_vars * _VAR_HEADER_DTYPE.itemsize), dtype=_VAR_HEADER_DTYPE)
+
+        names, formats, offsets = [], [], []
+        for var in raw_headers:
+            name = var['name'].decode('latin-1')
+            var_type, offset, count = int(var['type']), int(var['offset']), int(var['count'])
+            self.var_headers[name] = (var_type, offset, count,
+                                      var['unit'].decode('latin-1'), var['desc'].decode('latin-1'))
+            base = IBT_VAR_TYPES[var_type]
+            names.append(name)
+            formats.append(base if count == 1 else np.dtype((base, (count,))))
+            offsets.append(offset)
+
+        self.record_dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                                      'itemsize': int(self.header['buf_len'])})
+        self.records = self._map_records()
+
+    def _map_records(self, record_count=None):
+        buf_offset = int(self.header['var_buf'][0]['buf_offset'])
+        if record_count is None:
+            record_count = int(self.disk_header['session_record_count'])
+            if record_count <= 0:
+                # Archivo aún abierto por iRacing: el contador se escribe al cerrar la sesión
+                record_count = self.records_on_disk()
+        if record_count <= 0:
+            return np.zeros(0, dtype=self.record_dtype)
+        return np.memmap(self.ibt_path, dtype=self.record_dtype, mode='r',
+                         offset=buf_offset, shape=(record_count,))
+
+    def records_on_disk(self):
+        """ Registros completos que hay en el archivo según su tamaño (válido mientras se escribe). """
+        buf_offset = int(self.header['var_buf'][0]['buf_offset'])
+        buf_len = int(self.header['buf_len'])
+        if buf_len <= 0:
+            return 0
+        return max(0, (os.path.getsize(self.ibt_path) - buf_offset) // buf_len)
+
+    def refresh(self):
+        """
+        Vuelve a mapear las muestras si el archivo ha crecido desde la última lectura.
+        Devuelve el número de registros nuevos.
+        """
+        if self.records is None:
+            return 0
+        previous = len(self.records)
+        available = self.records_on_disk()
+        if available <= previous:
+            return 0
+        self.records = self._map_records(available)
+        return available - previous
+
+    def close(self):
+        # np.memmap libera el archivo cuando no quedan referencias a las vistas
+        self.records = None
+        self.header = None
+        self.disk_header = None
+        self.var_headers = {}
+        self.record_dtype = None
+
+    @property
+    def is_open(self):
+        return self.records is not None
+
+    @property
+    def var_headers_names(self):
+        return list(self.var_headers.keys())
+
+    @property
+    def record_count(self):
+        return 0 if self.records is None else len(self.records)
+
+    @property
+    def tick_rate(self):
+        return int(self.header['tick_rate']) if self.header is not None else 0
+
+    def channel(self, var_name: str):
+        """
+        Devuelve el canal como vista sin copia sobre el memmap.
+        Las variables con count > 1 se devuelven con forma (muestras, count).
+        """
+        if self.records is None or var_name not in self.var_headers:
+            return None
+        return self.records[var_name]
+
+    def read_channel(self, var_name: str):
+        """ Copia el canal a memoria con el dtype nativo (sin depender del archivo abierto). """
+        view = self.channel(var_name)
+        return None if view is None else np.array(view)
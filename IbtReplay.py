@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+File: IbtReplay.py
+Created on 2025-07-30
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import time
+import numpy as np
+
+from IbtReader import IbtReader
+
+
+class IbtReplay:
+    """
+    Productor de telemetría en directo de prueba: entrega los registros de un .ibt grabado al
+    ritmo real (tick_rate * speed muestras por segundo), como llegarían durante una sesión.
+    Cada poll() devuelve el bloque {canal: array} de las muestras que ya "han ocurrido".
+    """
+
+    def __init__(self, ibt_path: str, channels=None, speed: float = 1.0):
+        self.reader = IbtReader(ibt_path)
+        self.speed = speed
+        fields = self.reader.records.dtype.fields if self.reader.record_count else {}
+        if channels is None:
+            channels = self.reader.var_headers_names
+        # Solo canales escalares y numéricos (un valor por tick)
+        self.channels = [name for name in channels if name in self.reader.var_headers
+                         and self.reader.var_headers[name][2] == 1 and self.reader.var_headers[name][0] != 0]
+        self.dtypes = {name: fields[name][0] for name in self.channels} if fields else {}
+        self.position = 0
+        self._t0 = None
+
+    @property
+    def finished(self):
+        return self.position >= self.reader.record_count
+
+    def start(self):
+        self._t0 = time.perf_counter() - self.position / (self.reader.tick_rate * self.speed or 1)
+
+    def poll(self):
+        """ Bloque con los registros que corresponden al tiempo transcurrido desde start(). """
+        if self._t0 is None or self.finished:
+            return {}
+        elapsed = time.perf_counter() - self._t0
+        due = min(self.reader.record_count, int(elapsed * self.reader.tick_rate * self.speed))
+        if due <= self.position:
+            return {}
+        block = self.reader.records[self.position:due]
+        self.position = due
+        return {name: np.array(block[name]) for name in self.channels}
+
+    def close(self):
+        self.reader.close()
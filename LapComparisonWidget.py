@@ -12,6 +12,9 @@ import pyqtgraph as pg
 import pandas as pd
 import numpy as np
 
+# Variable calculada (no es un canal del .ibt): diferencia de tiempo con la vuelta de referencia
+DELTA_VARIABLE = 'Delta'
+
 class LapComparisonWidget(QWidget):
     # Señal que emite la lista de variables a graficar
     plotted_variables_changed = Signal(list)
@@ -34,13 +37,17 @@ class LapComparisonWidget(QWidget):
         main_layout.addWidget(self.variable_list_widget)
         main_layout.addWidget(self.graphics_layout_widget, 1) # El '1' le da más espacio
 
-    def populate_variables(self, columns):
-        """ Llena la lista de variables seleccionables. """
+        self.plot_items = []
+        self.x_range = None  # (distancia inicial, final) de la región de interés; None = vuelta completa
+        self._max_dist = 0.0
+
+    def populate_variables(self, columns, checked=None):
+        """ Llena la lista de variables seleccionables (checked: las que se marcan; por defecto Speed, Throttle y Brake). """
         self.variable_list_widget.blockSignals(True)
 
         self.variable_list_widget.clear()
-        defaults = ['Speed', 'Throttle', 'Brake']
-        for col in columns:
+        defaults = checked if checked is not None else ['Speed', 'Throttle', 'Brake']
+        for col in [DELTA_VARIABLE] + [c for c in columns if c != DELTA_VARIABLE]:
             item = QListWidgetItem(col, self.variable_list_widget)
             item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
             # Marcar los gráficos por defecto
@@ -52,24 +59,39 @@ class LapComparisonWidget(QWidget):
         self.variable_list_widget.blockSignals(False)
         self._on_variable_selection_changed(None)  # Emitir la señal inicial con los valores por defecto
 
-    def _on_variable_selection_changed(self, item):
-        """ Se activa cuando el usuario marca/desmarca una variable. """
+    def checked_variables(self):
         checked_vars = []
         for i in range(self.variable_list_widget.count()):
             item = self.variable_list_widget.item(i)
             if item.checkState() == Qt.Checked:
                 checked_vars.append(item.text())
-        self.plotted_variables_changed.emit(checked_vars)
+        return checked_vars
+
+    def _on_variable_selection_changed(self, item):
+        """ Se activa cuando el usuario marca/desmarca una variable. """
+        self.plotted_variables_changed.emit(self.checked_variables())
         
-    def update_plots(self, laps_data: dict, variables_to_plot: list):
+    def set_distance_range(self, x_range):
+        """ Limita el eje X (distancia) de todos los gráficos a x_range, o lo restaura con None. """
+        self.x_range = x_range
+        if not self.plot_items:
+            return
+        if x_range is not None:
+            self.plot_items[0].setXRange(*x_range, padding=0.02)  # Los ejes X están enlazados
+        else:
+            self.plot_items[0].setXRange(0, self._max_dist, padding=0.01)
+
+    def update_plots(self, distance, laps_data: dict, variables_to_plot: list):
         """
         Dibuja los gráficos.
-        laps_data: {'Vuelta 5': df_vuelta_5, 'Vuelta 7': df_vuelta_7}
+        distance: rejilla común de LapDist (m) compartida por todas las vueltas
+        laps_data: {'Vuelta 5': {'Speed': array, ...}, 'Vuelta 7': {...}} remuestreados sobre `distance`
         variables_to_plot: ['Speed', 'Throttle']
         """
         print(f"Actualizando gráficos con {len(laps_data)} vueltas y {variables_to_plot} variables.")
 
         self.graphics_layout_widget.clear()
+        self.plot_items = []
 
         # Generar una paleta de colores para las diferentes vueltas
         colors = ['#FF5733', '#33FF57', '#3357FF', '#FF33A1', '#A133FF', '#33FFA1']
@@ -82,29 +104,31 @@ class LapComparisonWidget(QWidget):
         linked_x_plot = None
         max_dist = 0.0
         y_ranges = {}
-        if laps_data:
-            # Encontrar la distancia máxima en todas las vueltas a graficar
-            for lap_df in laps_data.values():
-                if 'LapDist' in lap_df and not lap_df.empty:
-                    max_dist = max(max_dist, lap_df['LapDist'].max())
-            
+        if laps_data and distance is not None and len(distance) > 0:
+            # Distancia máxima con datos en alguna de las vueltas a graficar
+            for lap_values in laps_data.values():
+                for values in lap_values.values():
+                    valid = np.flatnonzero(~np.isnan(values))
+                    if len(valid):
+                        max_dist = max(max_dist, distance[valid[-1]])
+
             # Calcular los rangos Y para cada variable que no tenga un rango fijo
             for var_name in variables_to_plot:
                 if var_name not in fixed_y_ranges:
-                    min_val, max_val = np.inf, -np.inf
-                    for lap_df in laps_data.values():
-                        if var_name in lap_df and not lap_df.empty:
-                            min_val = min(min_val, lap_df[var_name].min())
-                            max_val = max(max_val, lap_df[var_name].max())
-                    
+                    stacked = [lap_values[var_name] for lap_values in laps_data.values() if var_name in lap_values]
+                    if not stacked or np.all(np.isnan(stacked)):
+                        continue
+                    min_val, max_val = np.nanmin(stacked), np.nanmax(stacked)
+
                     # Añadir un pequeño padding para que no quede pegado
                     padding = (max_val - min_val) * 0.05 if max_val > min_val else 1
                     y_ranges[var_name] = (min_val - padding, max_val + padding)
 
+        self._max_dist = max_dist
         for i, var_name in enumerate(variables_to_plot):
             plot_item = self.graphics_layout_widget.addPlot(row=i, col=0)
 
-            plot_item.setLabel('left', var_name)
+            plot_item.setLabel('left', 'Delta (s)' if var_name == DELTA_VARIABLE else var_name)
             if i == len(variables_to_plot) - 1:
                 plot_item.setLabel('bottom', 'Distancia (m)')
             plot_item.showGrid(x=True, y=True, alpha=0.3)
@@ -113,24 +137,23 @@ class LapComparisonWidget(QWidget):
             if linked_x_plot:
                 plot_item.setXLink(linked_x_plot)
             
-            for j, (lap_name, lap_df) in enumerate(laps_data.items()):
+            for j, (lap_name, lap_values) in enumerate(laps_data.items()):
                 pen_style = Qt.DashLine if lap_name == 'Teórica' else Qt.SolidLine
                 pen_color = '#FFFFFF' if lap_name == 'Teórica' else colors[j % len(colors)]
                 pen = pg.mkPen(color=pen_color, width=2, style=pen_style)
                 
-                if 'LapDist' in lap_df and var_name in lap_df:
-                    # Elimina NaN y ordena por LapDist
-                    plot_df = lap_df[['LapDist', var_name]].dropna().sort_values('LapDist')
-                    if not plot_df.empty:
-                        plot_item.plot(
-                            x=plot_df['LapDist'].to_numpy(), 
-                            y=plot_df[var_name].to_numpy(), 
-                            pen=pen,
-                            name=lap_name
-                            )
-                        max_dist = max(max_dist, lap_df['LapDist'].max())
-
-            plot_item.setXRange(0, max_dist, padding=0.01)
+                if var_name in lap_values:
+                    # Los NaN (fuera del recorrido de la vuelta) cortan la línea en lugar de unirse
+                    plot_item.plot(x=distance, y=lap_values[var_name], pen=pen, name=lap_name, connect='finite')
+
+            if var_name == DELTA_VARIABLE:
+                # Línea de referencia: por encima de 0 la vuelta es más lenta que la referencia
+                plot_item.addLine(y=0, pen=pg.mkPen(color='#888888', width=1, style=Qt.DotLine))
+
+            if self.x_range is not None:
+                plot_item.setXRange(*self.x_range, padding=0.02)
+            else:
+                plot_item.setXRange(0, max_dist, padding=0.01)
 
             if var_name in fixed_y_ranges:
                 min_y, max_y = fixed_y_ranges[var_name]
@@ -140,3 +163,4 @@ class LapComparisonWidget(QWidget):
                 plot_item.setYRange(min_y, max_y, padding=0)
 
             linked_x_plot = plot_item
+            self.plot_items.append(plot_item)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+File: LapResampler.py
+Created on 2025-07-26
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+
+def interpolation_weights(x, grid):
+    """
+    Índices y pesos para interpolar linealmente sobre `grid` una señal muestreada en `x`
+    (creciente). Fuera del rango de x el resultado es NaN en lugar de repetir el extremo.
+    """
+    idx = np.clip(np.searchsorted(x, grid, side='right'), 1, len(x) - 1)
+    x0, x1 = x[idx - 1], x[idx]
+    span = np.where(x1 > x0, x1 - x0, 1.0)
+    weight = np.clip((grid - x0) / span, 0.0, 1.0)
+    outside = (grid < x[0]) | (grid > x[-1])
+    return idx, weight, outside
+
+
+def resample_columns(x, columns, grid):
+    """
+    Remuestrea varias columnas (matriz muestras x canales) sobre el mismo grid en una sola
+    pasada: los índices y pesos se calculan una vez y se aplican a todos los canales.
+    Devuelve una matriz canales x grid.
+    """
+    columns = np.asarray(columns, dtype=np.float64)
+    if len(x) < 2:
+        return np.full((columns.shape[1], len(grid)), np.nan)
+    idx, weight, outside = interpolation_weights(x, grid)
+    values = columns[idx - 1] * (1.0 - weight)[:, None] + columns[idx] * weight[:, None]
+    values[outside] = np.nan
+    return values.T
+
+
+class LapResampler:
+    """
+    Motor de remuestreo en el dominio de la distancia: interpola cualquier conjunto de canales
+    de cualquier conjunto de vueltas sobre una rejilla común de LapDist (resolución en metros).
+    Los resultados se cachean por (vuelta, canal, rejilla) con expulsión LRU.
+    """
+
+    def __init__(self, session, resolution: float = 1.0, max_entries: int = 512):
+        self.session = session
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self._cache = OrderedDict()   # (versión_filas, vuelta, canal, rejilla) -> array
+        self._grid = None
+        self._grid_key = None
+
+    def grid(self, resolution: float = None):
+        """ Rejilla de distancias [0, longitud de pista] con paso `resolution` metros. """
+        resolution = resolution or self.resolution
+        key = (self.session.rows_version, resolution)
+        if key != self._grid_key:
+            df = self.session.dataframe
+            track_length = float(np.nanmax(df['LapDist'].to_numpy())) if 'LapDist' in df.columns and not df.empty else 0.0
+            self._grid = np.arange(0.0, track_length + resolution, resolution)
+            self._grid_key = key
+        return self._grid
+
+    def clear(self):
+        self._cache.clear()
+
+    def reset_grid(self):
+        """ Fuerza a recalcular la rejilla (p. ej. si la sesión ha crecido en modo seguimiento). """
+        self._grid_key = None
+
+    def discard_lap(self, lap):
+        """ Olvida los remuestreos de una vuelta cuyas filas han cambiado (p. ej. la vuelta teórica). """
+        for key in [k for k in self._cache if k[1] == lap]:
+            del self._cache[key]
+
+    def discard_channels(self, channels):
+        """ Descarta las entradas de los canales indicados (p. ej. un canal calculado redefinido). """
+        channels = set(channels)
+        for key in [k for k in self._cache if k[2] in channels]:
+            del self._cache[key]
+
+    def _lap_distance(self, lap_df):
+        """
+        LapDist creciente de la vuelta (y las filas usadas, o None si son todas). Las muestras del
+        inicio que aún llevan la distancia de la vuelta anterior (cerca de la longitud de la pista)
+        pasan a distancias negativas y las del final que ya llevan la de la siguiente se desplazan
+        una vuelta; el resto de retrocesos se absorben con el máximo acumulado, como la clave
+        monótona de compute_lap_times. Reordenar llevaría esas muestras al otro extremo de la rejilla.
+        """
+        x = lap_df['LapDist'].to_numpy().astype(np.float64)
+        valid = ~np.isnan(x)
+        order = None
+        if not valid.all():
+            order = np.flatnonzero(valid)
+            x = x[order]
+        if len(x) > 1 and np.any(np.diff(x) < 0):
+            length = float(x.max())
+            for wrap in np.flatnonzero(np.diff(x) < -0.5 * length) + 1:
+                if wrap <= len(x) // 2:
+                    x[:wrap] -= length
+                else:
+                    x[wrap:] += length
+            x = np.fmax.accumulate(x)
+        return x, order
+
+    def resample(self, laps, channels, resolution: float = None, grid=None):
+        """
+        Devuelve (grid, {canal: matriz vueltas x grid}). Para cada vuelta solo se interpolan
+        los canales que no estén ya en la caché, todos a la vez.
+        grid: rejilla externa (p. ej. la de otra sesión, para comparar vueltas de varios archivos).
+        """
+        if grid is None:
+            grid = self.grid(resolution)
+            grid_key = (resolution or self.resolution, len(grid))
+        else:
+            grid_key = ('grid', len(grid), float(grid[0]), float(grid[-1]))
+        version = self.session.rows_version
+        result = {channel: np.full((len(laps), len(grid)), np.nan) for channel in channels}
+        if 'LapDist' not in self.session.dataframe.columns:
+            return grid, result
+
+        available = self.session.ensure_columns(list(channels))
+        for row, lap in enumerate(laps):
+            missing = []
+            for channel in available:
+                key = (version, lap, channel, grid_key)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    result[channel][row] = self._cache[key]
+                else:
+                    missing.append(channel)
+            if not missing:
+                continue
+
+            lap_df = self.session.lap_slice(lap)
+            if lap_df.empty:
+                continue
+            x, order = self._lap_distance(lap_df)
+            columns = lap_df[missing].to_numpy(dtype=np.float64)
+            if order is not None:
+                columns = columns[order]
+            values = resample_columns(x, columns, grid)
+            for channel, lap_values in zip(missing, values):
+                result[channel][row] = lap_values
+                self._cache[(version, lap, channel, grid_key)] = lap_values
+        self._evict()
+        return grid, result
+
+    def resample_frame(self, df, channels, resolution: float = None):
+        """ Remuestrea un DataFrame arbitrario (p. ej. una vuelta virtual) sin usar la caché. """
+        grid = self.grid(resolution)
+        x, order = self._lap_distance(df)
+        columns = df[list(channels)].to_numpy(dtype=np.float64)
+        if order is not None:
+            columns = columns[order]
+        return grid, dict(zip(channels, resample_columns(x, columns, grid)))
+
+    def _evict(self):
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
@@ -10,6 +10,7 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetIt
 from PySide6.QtCore import Qt, Signal
 import pandas as pd
 from PySide6.QtGui import QColor
+from TelemetrySession import THEORETICAL_LAP
 
 class LapsTimeTable(QWidget):
     lap_filter_changed = Signal(object)  # Emite el número de vuelta (int) o None
@@ -27,6 +28,9 @@ class LapsTimeTable(QWidget):
         self.on_sector_selected = None
         self.sector_percents = []
         self.laps_df_ref = None 
+        self._row_keys = []     # fila -> vuelta (int), THEORETICAL_LAP o (sesión de referencia, vuelta)
+        self._invalid_laps = set()
+        self.region_times = {}  # vuelta -> tiempo (s) en la región de interés marcada en el mapa
 
     def _setup_ui(self):
         """ Configura la apariencia inicial y el estilo de la tabla. """
@@ -87,9 +91,16 @@ class LapsTimeTable(QWidget):
         else:
             return f"{seconds:05.3f}"
 
-    def update_data(self, laps_df: pd.DataFrame):
-        """ Limpia la tabla y la llena con los datos del nuevo DataFrame. """
+    def update_data(self, laps_df: pd.DataFrame, invalid_laps=None, reference_laps=None):
+        """
+        Limpia la tabla y la llena con los datos del nuevo DataFrame.
+        invalid_laps: vueltas con discontinuidades (huecos de tiempo, teletransportes), que se
+        muestran en gris y no cuentan para los mejores tiempos.
+        reference_laps: lista de (nombre, laps_df) de otras sesiones, que se añaden al final.
+        """
         self.laps_df_ref = laps_df
+        self._row_keys = []
+        self._invalid_laps = set(invalid_laps or [])
 
         self.table.blockSignals(True)
 
@@ -97,6 +108,7 @@ class LapsTimeTable(QWidget):
             self.table.setRowCount(0)
             self.table.blockSignals(False)
             return
+        self._row_keys = [int(lap) for lap in laps_df['Lap']]
 
         self.table.setRowCount(laps_df.shape[0])
         self.table.setColumnCount(len(laps_df.columns))
@@ -105,6 +117,8 @@ class LapsTimeTable(QWidget):
         # Identificar vueltas válidas (todos los sectores > 0)
         sector_cols = [col for col in laps_df.columns if col.startswith('S')]
         valid_mask = laps_df[sector_cols].gt(0).all(axis=1)
+        invalid_mask = laps_df['Lap'].isin(invalid_laps or [])
+        valid_mask &= ~invalid_mask
         valid_laps = laps_df[valid_mask]
 
         # Mejor vuelta válida (menor tiempo total)
@@ -137,6 +151,9 @@ class LapsTimeTable(QWidget):
                 item = QTableWidgetItem(display_text)
                 item.setTextAlignment(Qt.AlignCenter)
 
+                if invalid_mask.iloc[row_idx]:
+                    item.setForeground(QColor('gray'))
+
                 # Marcar mejor vuelta (Lap y Time) en magenta y negrita
                 if is_valid and row_idx == best_lap_idx and col_name in ['Lap', 'Time']:
                     item.setForeground(QColor('magenta'))
@@ -157,6 +174,7 @@ class LapsTimeTable(QWidget):
         if not valid_laps.empty and sector_cols:
             theoretical_row_idx = self.table.rowCount()
             self.table.insertRow(theoretical_row_idx)
+            self._row_keys.append(THEORETICAL_LAP)
 
             # Lap vacío
             lap_item = QTableWidgetItem("")
@@ -184,11 +202,70 @@ class LapsTimeTable(QWidget):
                 item.setForeground(QColor('lightblue'))
                 self.table.setItem(theoretical_row_idx, col_idx, item)
 
+        # --- Vueltas de las sesiones de referencia ---
+        for session_idx, (label, ref_laps_df) in enumerate(reference_laps or []):
+            for _, ref_row in ref_laps_df.iterrows():
+                row_idx = self.table.rowCount()
+                self.table.insertRow(row_idx)
+                self._row_keys.append((session_idx, int(ref_row['Lap'])))
+                for col_idx, col_name in enumerate(laps_df.columns):
+                    if col_name == 'Lap':
+                        display_text = f"{label} · {int(ref_row['Lap'])}"
+                    elif col_name == 'Time' and col_name in ref_row:
+                        display_text = self.format_time(ref_row[col_name], remove_leading_zero=True)
+                    elif col_name in ref_row:
+                        display_text = self.format_time(ref_row[col_name])
+                    else:
+                        display_text = ""
+                    item = QTableWidgetItem(display_text)
+                    item.setTextAlignment(Qt.AlignCenter)
+                    item.setForeground(QColor('orange'))
+                    self.table.setItem(row_idx, col_idx, item)
+
+        self._fill_region_column()
+
         # Ajustar el tamaño de las columnas al contenido
         self.table.resizeColumnsToContents()
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.blockSignals(False)
 
+    def set_region_times(self, region_times):
+        """ Muestra (o quita, con un diccionario vacío) la columna de tiempo en la región de interés. """
+        self.region_times = dict(region_times or {})
+        if self.laps_df_ref is None or self.laps_df_ref.empty:
+            return
+        self.table.blockSignals(True)
+        self._fill_region_column()
+        self.table.resizeColumnsToContents()
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.blockSignals(False)
+
+    def _fill_region_column(self):
+        base_columns = len(self.laps_df_ref.columns)
+        if not self.region_times:
+            self.table.setColumnCount(base_columns)
+            return
+        self.table.setColumnCount(base_columns + 1)
+        self.table.setHorizontalHeaderItem(base_columns, QTableWidgetItem("Región"))
+        # Mejor tiempo en la región entre las vueltas válidas de la sesión principal
+        valid_times = {lap: t for lap, t in self.region_times.items()
+                       if lap != THEORETICAL_LAP and lap not in self._invalid_laps}
+        best_lap = min(valid_times, key=valid_times.get) if valid_times else None
+        for row, key in enumerate(self._row_keys):
+            time = self.region_times.get(key) if not isinstance(key, tuple) else None
+            item = QTableWidgetItem(self.format_time(time) if time is not None else "")
+            item.setTextAlignment(Qt.AlignCenter)
+            if key == THEORETICAL_LAP:
+                item.setForeground(QColor('lightblue'))
+            elif isinstance(key, tuple) or key in self._invalid_laps:
+                item.setForeground(QColor('gray'))
+            elif key == best_lap:
+                item.setForeground(QColor('magenta'))
+                font = item.font()
+                font.setBold(True)
+                item.setFont(font)
+            self.table.setItem(row, base_columns, item)
+
     def on_header_clicked(self, logicalIndex):
         # Solo sectores (columna 2 en adelante, es decir, S1, S2, ...)
         if logicalIndex < 2:
@@ -218,28 +295,15 @@ class LapsTimeTable(QWidget):
         if hasattr(self, 'on_sector_selected'):
             self.on_sector_selected(start_pct, end_pct)
 
+    def selected_keys(self):
+        """ Claves de las filas seleccionadas: vuelta (int), THEORETICAL_LAP o (sesión de referencia, vuelta). """
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        return [self._row_keys[row] for row in rows if row < len(self._row_keys)]
+
     def on_selection_changed(self, selected, deselected):
         """
         Se activa cuando cambia la selección de filas en la tabla.
-        Emite la señal `lap_filter_changed`.
+        Emite la señal `lap_filter_changed` con las claves de las filas (ver selected_keys).
         """
-        selected_indexes = self.table.selectionModel().selectedRows()
-
-        if not selected_indexes:
-            self.lap_filter_changed.emit(None)
-            return
-
-        lap_numbers = []
-        if selected_indexes:
-            for index in selected_indexes:
-                # Ignorar la fila de vuelta teórica
-                if self.laps_df_ref is not None and index.row() >= len(self.laps_df_ref):
-                    continue
-                lap_item = self.table.item(index.row(), 0)
-                if lap_item:
-                    try:
-                        lap_numbers.append(int(lap_item.text()))
-                    except (ValueError, TypeError):
-                        pass # Ignorar si no es un número válido
-        
-        self.lap_filter_changed.emit(lap_numbers if lap_numbers else None)
\ No newline at end of file
+        keys = self.selected_keys()
+        self.lap_filter_changed.emit(keys if keys else None)
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+File: MathChannels.py
+Created on 2025-08-02
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import ast
+import operator
+
+import numpy as np
+import pandas as pd
+
+# Canales calculados que se ofrecen la primera vez (el usuario puede editarlos o borrarlos)
+DEFAULT_MATH_CHANNELS = [
+    ('SpeedKmh', 'Speed * 3.6'),
+    ('LatG', 'LatAccel / g'),
+    ('LongG', 'LongAccel / g'),
+    ('CombinedG', 'sqrt(LatG**2 + LongG**2)'),
+    ('SpeedAccel', 'derivative(rolling_mean(Speed, 15), SessionTime)'),
+]
+
+
+def rolling_mean(x, window):
+    """ Media móvil de `window` muestras (ventana hacia atrás; las primeras usan las disponibles). """
+    return pd.Series(x).rolling(int(window), min_periods=1).mean().to_numpy()
+
+
+def rolling_max(x, window):
+    return pd.Series(x).rolling(int(window), min_periods=1).max().to_numpy()
+
+
+def rolling_min(x, window):
+    return pd.Series(x).rolling(int(window), min_periods=1).min().to_numpy()
+
+
+def rolling_std(x, window):
+    return pd.Series(x).rolling(int(window), min_periods=1).std().to_numpy()
+
+
+def derivative(x, t):
+    """ Derivada de x respecto a t (diferencias centradas; t = SessionTime para obtener /s). """
+    x = np.asarray(x, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    if len(x) < 2:
+        return np.zeros(len(x))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.gradient(x, t)
+
+
+def shift(x, n):
+    """ Valor de n muestras antes (n > 0) o después (n < 0); los extremos quedan en NaN. """
+    x = np.asarray(x, dtype=np.float64)
+    n = int(n)
+    out = np.full(len(x), np.nan)
+    if n >= 0:
+        out[n:] = x[:len(x) - n]
+    else:
+        out[:n] = x[-n:]
+    return out
+
+
+MATH_FUNCTIONS = {
+    'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'arctan2': np.arctan2,
+    'minimum': np.minimum, 'maximum': np.maximum, 'clip': np.clip, 'where': np.where,
+    'rolling_mean': rolling_mean, 'rolling_max': rolling_max, 'rolling_min': rolling_min,
+    'rolling_std': rolling_std, 'derivative': derivative, 'shift': shift,
+}
+
+MATH_CONSTANTS = {'pi': np.pi, 'g': 9.80665}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_,
+}
+_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+_COMPARE_OPERATORS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+
+class MathChannelError(ValueError):
+    """ Definición de canal no válida (sintaxis, función desconocida o dependencia circular). """
+
+
+def check_channel_names(names, reserved=()):
+    """
+    Comprueba que los nombres no se repiten ni coinciden con canales de telemetría (reserved):
+    un canal calculado con el nombre de una columna existente la sustituiría en el DataFrame.
+    """
+    names = list(names)
+    duplicated = sorted({name for name in names if names.count(name) > 1})
+    if duplicated:
+        raise MathChannelError(f"Nombres repetidos: {', '.join(duplicated)}")
+    taken = sorted(set(names) & set(reserved))
+    if taken:
+        raise MathChannelError(f"Nombres ya usados por canales de telemetría: {', '.join(taken)}")
+
+
+def parse_expression(expression):
+    """
+    Analiza la expresión y comprueba que solo usa operadores aritméticos y de comparación,
+    números, nombres y llamadas a MATH_FUNCTIONS. Devuelve (árbol, nombres usados).
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise MathChannelError(f"Expresión no válida '{expression}': {e.msg}") from None
+
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in MATH_FUNCTIONS:
+                raise MathChannelError(f"Función no permitida en '{expression}': {ast.unparse(node.func)}")
+            if node.keywords:
+                raise MathChannelError(f"Las funciones no admiten argumentos con nombre: '{expression}'")
+        elif isinstance(node, ast.Name):
+            if node.id not in MATH_FUNCTIONS and node.id not in names:
+                names.append(node.id)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float, bool)):
+                raise MathChannelError(f"Solo se admiten constantes numéricas: '{expression}'")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _BINARY_OPERATORS:
+                raise MathChannelError(f"Operador no permitido en '{expression}'")
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in _UNARY_OPERATORS:
+                raise MathChannelError(f"Operador no permitido en '{expression}'")
+        elif isinstance(node, ast.Compare):
+            if len(node.ops) != 1 or type(node.ops[0]) not in _COMPARE_OPERATORS:
+                raise MathChannelError(f"Comparación no permitida en '{expression}' (una por expresión)")
+        elif not isinstance(node, (ast.Expression, ast.Load) + tuple(_BINARY_OPERATORS) +
+                            tuple(_UNARY_OPERATORS) + tuple(_COMPARE_OPERATORS)):
+            raise MathChannelError(f"Elemento no permitido en '{expression}': {type(node).__name__}")
+    return tree, names
+
+
+def _evaluate(node, lookup):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, lookup)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return lookup(node.id)
+    if isinstance(node, ast.BinOp):
+        return _BINARY_OPERATORS[type(node.op)](_evaluate(node.left, lookup), _evaluate(node.right, lookup))
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, lookup))
+    if isinstance(node, ast.Compare):
+        return _COMPARE_OPERATORS[type(node.ops[0])](_evaluate(node.left, lookup),
+                                                      _evaluate(node.comparators[0], lookup))
+    if isinstance(node, ast.Call):
+        return MATH_FUNCTIONS[node.func.id](*(_evaluate(arg, lookup) for arg in node.args))
+    raise MathChannelError(f"Elemento no permitido: {type(node).__name__}")
+
+
+class MathChannel:
+    """ Canal calculado: nombre, expresión vectorizada y parámetros con nombre usados en ella. """
+
+    def __init__(self, name, expression, params=None):
+        if not name.isidentifier() or name in MATH_FUNCTIONS or name in MATH_CONSTANTS:
+            raise MathChannelError(f"Nombre de canal no válido: '{name}'")
+        self.name = name
+        self.expression = expression
+        self.params = dict(params or {})
+        self.tree, names = parse_expression(expression)
+        self.inputs = [n for n in names if n not in self.params and n not in MATH_CONSTANTS]
+
+    def signature(self):
+        # Expresión normalizada: los cambios de espacios o paréntesis redundantes no obligan a recalcular
+        return (ast.unparse(self.tree), tuple(sorted(self.params.items())))
+
+
+class MathChannelEngine:
+    """
+    Canales calculados definidos por el usuario como expresiones sobre otras columnas
+    (p. ej. 'Speed * 3.6' o 'derivative(rolling_mean(Speed, 15), SessionTime)'), que pueden
+    usar a su vez otros canales calculados. Cada salida se calcula una sola vez y queda en caché;
+    el grafo de dependencias permite descartar solo los canales que dependen de una entrada
+    o de una definición modificada.
+    """
+
+    def __init__(self):
+        self.channels = {}            # nombre -> MathChannel
+        self.outputs = {}             # nombre -> array float64
+        self._computed_with = {}      # nombre -> firma (expresión, parámetros) del último cálculo
+        self._data_key = None
+
+    # --- Definiciones y grafo de dependencias ---
+
+    def define(self, name, expression, params=None):
+        """ Crea o reemplaza un canal. Devuelve los canales descartados (él y los que dependen de él). """
+        channel = MathChannel(name, expression, params)
+        previous = self.channels.get(name)
+        if previous is not None and previous.signature() == channel.signature():
+            return set()
+        self.channels[name] = channel
+        try:
+            self.evaluation_order()
+        except MathChannelError:
+            if previous is None:
+                del self.channels[name]
+            else:
+                self.channels[name] = previous
+            raise
+        return self.invalidate([name])
+
+    def set_params(self, name, **params):
+        """ Cambia parámetros de un canal; solo se recalculan él y los canales que dependen de él. """
+        channel = self.channels[name]
+        return self.define(name, channel.expression, {**channel.params, **params})
+
+    def remove(self, name):
+        """ Elimina un canal; los que dependían de él se descartan (fallarán hasta redefinirlo). """
+        if name not in self.channels:
+            return set()
+        dropped = self.invalidate([name])
+        del self.channels[name]
+        return dropped
+
+    def downstream(self, names):
+        """ Canales que dependen (directa o indirectamente) de los nombres dados, incluidos ellos. """
+        result = {name for name in names if name in self.channels}
+        frontier = set(names)
+        while frontier:
+            frontier = {c.name for c in self.channels.values()
+                        if c.name not in result and any(i in frontier for i in c.inputs)}
+            result |= frontier
+        return result
+
+    def evaluation_order(self, names=None):
+        """ Orden topológico de los canales pedidos y los canales calculados de los que dependen. """
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise MathChannelError(f"Dependencia circular: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.channels[name].inputs:
+                if dep in self.channels:
+                    visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in (self.channels if names is None else names):
+            if name in self.channels:
+                visit(name, [])
+        return order
+
+    def required_channels(self, names=None):
+        """ Columnas de telemetría (no calculadas) que necesitan los canales pedidos. """
+        channels = []
+        for name in self.evaluation_order(names):
+            channels += [c for c in self.channels[name].inputs if c not in self.channels and c not in channels]
+        return channels
+
+    def invalidate(self, names):
+        """ Descarta las salidas de los canales que dependen de las columnas o canales indicados. """
+        dropped = self.downstream(names)
+        for name in dropped:
+            self.outputs.pop(name, None)
+            self._computed_with.pop(name, None)
+        return dropped
+
+    # --- Cálculo ---
+
+    def run(self, df, data_key=None, only=None):
+        """
+        Calcula sobre df los canales pedidos (todos si only es None) y los que necesitan.
+        data_key identifica las filas del DataFrame; si cambia, se descartan todas las salidas.
+        Los canales cuyas entradas no existen se omiten. Devuelve la lista de canales recalculados.
+        """
+        if data_key is None or data_key != self._data_key or any(len(o) != len(df) for o in self.outputs.values()):
+            self.outputs = {}
+            self._computed_with = {}
+            self._data_key = data_key
+
+        recomputed = []
+        for name in self.evaluation_order(only):
+            channel = self.channels[name]
+            if self._computed_with.get(name) == channel.signature():
+                continue
+            if not all(i in self.outputs or (i not in self.channels and i in df.columns) for i in channel.inputs):
+                continue
+
+            def lookup(key, channel=channel):
+                if key in channel.params:
+                    return channel.params[key]
+                if key in MATH_CONSTANTS:
+                    return MATH_CONSTANTS[key]
+                if key in self.outputs:
+                    return self.outputs[key]
+                return df[key].to_numpy(dtype=np.float64)
+
+            try:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    values = _evaluate(channel.tree, lookup)
+                values = np.asarray(values, dtype=np.float64)
+                if values.ndim == 0:
+                    values = np.full(len(df), float(values))
+                if values.shape != (len(df),):
+                    raise MathChannelError(f"el resultado tiene forma {values.shape}")
+            except Exception as e:
+                print(f"ADVERTENCIA: No se pudo calcular el canal '{name}' = {channel.expression}: {e}")
+                continue
+            self.outputs[name] = values
+            self._computed_with[name] = channel.signature()
+            recomputed.append(name)
+        return recomputed
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+'''
+File: MathChannelsDialog.py
+Created on 2025-08-02
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+'''
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton,
+                               QLabel, QDialogButtonBox, QMessageBox, QHeaderView)
+
+from MathChannels import MathChannelEngine, MathChannelError, MATH_FUNCTIONS, MATH_CONSTANTS, check_channel_names
+
+
+class MathChannelsDialog(QDialog):
+    """
+    Editor de canales calculados: una fila por canal con su nombre y su expresión.
+    reserved_names: canales de telemetría de las sesiones abiertas, que no se pueden usar como nombre.
+    """
+
+    def __init__(self, definitions, reserved_names=(), parent=None):
+        super().__init__(parent)
+        self.reserved_names = set(reserved_names)
+        self.setWindowTitle("Canales calculados")
+        self.resize(700, 400)
+
+        layout = QVBoxLayout(self)
+        help_label = QLabel(
+            "Expresiones vectorizadas sobre canales de telemetría u otros canales calculados, p. ej. "
+            "<i>Speed * 3.6</i> o <i>derivative(rolling_mean(Speed, 15), SessionTime)</i>.<br>"
+            f"Funciones: {', '.join(sorted(MATH_FUNCTIONS))}. Constantes: {', '.join(sorted(MATH_CONSTANTS))}.")
+        help_label.setWordWrap(True)
+        layout.addWidget(help_label)
+
+        self.table = QTableWidget(0, 2)
+        self.table.setHorizontalHeaderLabels(["Nombre", "Expresión"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.table)
+        for name, expression in definitions:
+            self._add_row(name, expression)
+
+        row_buttons = QHBoxLayout()
+        add_button = QPushButton("Añadir")
+        add_button.clicked.connect(lambda: self._add_row("", ""))
+        remove_button = QPushButton("Eliminar")
+        remove_button.clicked.connect(self._remove_selected)
+        row_buttons.addWidget(add_button)
+        row_buttons.addWidget(remove_button)
+        row_buttons.addStretch(1)
+        layout.addLayout(row_buttons)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def _add_row(self, name, expression):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(name))
+        self.table.setItem(row, 1, QTableWidgetItem(expression))
+        if not name:
+            self.table.editItem(self.table.item(row, 0))
+
+    def _remove_selected(self):
+        for index in sorted(self.table.selectionModel().selectedRows(), key=lambda i: i.row(), reverse=True):
+            self.table.removeRow(index.row())
+
+    def definitions(self):
+        """ Lista [(nombre, expresión)] de las filas no vacías. """
+        result = []
+        for row in range(self.table.rowCount()):
+            name = (self.table.item(row, 0).text() if self.table.item(row, 0) else "").strip()
+            expression = (self.table.item(row, 1).text() if self.table.item(row, 1) else "").strip()
+            if name or expression:
+                result.append((name, expression))
+        return result
+
+    def accept(self):
+        # Se validan las definiciones (nombres, sintaxis, funciones y ciclos) antes de cerrar
+        definitions = self.definitions()
+        try:
+            check_channel_names([name for name, _ in definitions], self.reserved_names)
+            engine = MathChannelEngine()
+            for name, expression in definitions:
+                engine.define(name, expression)
+        except MathChannelError as e:
+            QMessageBox.warning(self, "Canales calculados", str(e))
+            return
+        super().accept()
@@ -13,6 +13,7 @@ import pandas as pd
 from TireTempWidget import TireTempWidget
 from SteeringInputWidget import SteeringInputWidget
 from GForceWidget import GForceWidget
+from ChannelStats import compute_stats
 
 class PlaybackControlWidget(QWidget):
     # Señal que emitirá el índice del frame/tick actual cada vez que cambie
@@ -96,20 +97,36 @@ class PlaybackControlWidget(QWidget):
         self.stop_button.clicked.connect(self.stop_playback)
         self.playback_slider.valueChanged.connect(self.scrub_to_tick)
 
-    def set_data(self, df: pd.DataFrame):
-        """ Recibe el dataframe completo para la reproducción. """
+    def set_data(self, df: pd.DataFrame, stats: pd.DataFrame = None):
+        """
+        Recibe el dataframe completo para la reproducción. stats son los estadísticos por canal
+        (ChannelStats) de ese dataframe; si no se pasan se calculan solo para los canales usados.
+        """
         self.stop_playback() # Detiene cualquier reproducción anterior
         self.dataframe = df
         if self.dataframe is not None and not self.dataframe.empty:
             self._total_ticks = len(self.dataframe) - 1
             self.playback_slider.setRange(0, self._total_ticks)
-            self.tire_temp_widget.set_temp_range_from_dataframe(df)
-            self._max_rpm = df['RPM'].max() if 'RPM' in df else 1.0  # Evitar división por cero
-            self.g_force_widget.set_max_g(int(df['LatAccel'].max() / 9.81+1) if 'LatAccel' in df else 5.0)
+            if stats is None:
+                stats = compute_stats(df, ['RPM', 'LatAccel'] + [c for c in df.columns if 'temp' in c.lower()])
+            self.tire_temp_widget.set_temp_range_from_dataframe(df, stats)
+            self._max_rpm = stats.loc['RPM', 'max'] if 'RPM' in stats.index else 1.0  # Evitar división por cero
+            self.g_force_widget.set_max_g(int(stats.loc['LatAccel', 'max'] / 9.81+1) if 'LatAccel' in stats.index else 5.0)
         else:
             self._total_ticks = 0
             self.playback_slider.setRange(0, 0)
 
+    def extend_data(self, df: pd.DataFrame):
+        """ Modo seguimiento: el dataframe ha crecido; se amplía el slider sin parar la reproducción. """
+        if self.dataframe is None or self.dataframe.empty:
+            self.set_data(df)
+            return
+        self.dataframe = df
+        self._total_ticks = len(self.dataframe) - 1
+        self.playback_slider.blockSignals(True)
+        self.playback_slider.setRange(0, self._total_ticks)
+        self.playback_slider.blockSignals(False)
+
     def toggle_playback(self):
         """ Inicia o pausa la reproducción. """
         if self._is_playing:
@@ -148,6 +165,19 @@ class PlaybackControlWidget(QWidget):
             self._current_tick = tick
             self._update_display(tick)
 
+    def seek_to_tick(self, tick):
+        """ Salta a un tick concreto (por ejemplo, el inicio de un evento) y pausa la reproducción. """
+        if self.dataframe is None or self.dataframe.empty:
+            return
+        if self.timer.isActive():
+            self.toggle_playback()
+        tick = max(0, min(int(tick), self._total_ticks))
+        self._current_tick = tick
+        self.playback_slider.blockSignals(True)
+        self.playback_slider.setValue(tick)
+        self.playback_slider.blockSignals(False)
+        self._update_display(tick)
+
     def _update_display(self, tick):
         """
         Actualiza los widgets visuales (TireTemp) con los datos del tick actual.
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+File: SessionCache.py
+Created on 2025-07-20
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from TelemetrySession import TelemetrySession
+
+# Se incrementa cuando cambia el contenido guardado para invalidar las entradas antiguas
+# (3: el limpiador marca GpsGlitch en lugar de eliminar las filas con GPS erróneo)
+CACHE_FORMAT_VERSION = 3
+
+
+def default_cache_dir():
+    base = os.getenv('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'SimracingTelemetryAnalyzer', 'session_cache')
+
+
+class SessionCache:
+    """
+    Caché en disco de sesiones ya filtradas y analizadas (dataframe, laps_df y columnas de
+    bloqueo/patinaje). Cada entrada es un .npz sin comprimir con una columna por array,
+    identificada por ruta + tamaño + fecha de modificación del .ibt. Cuando el tamaño total
+    supera max_bytes se eliminan las entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = 2 * 1024**3):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, ibt_path: str):
+        stat = os.stat(ibt_path)
+        raw = f"{CACHE_FORMAT_VERSION}|{os.path.abspath(ibt_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, ibt_path: str):
+        """ Devuelve la TelemetrySession cacheada o None si no hay una entrada válida. """
+        try:
+            entry = self._entry_path(self.key_for(ibt_path))
+        except OSError:
+            return None
+        if not os.path.exists(entry):
+            return None
+
+        try:
+            with np.load(entry, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                index = data['index']
+                dataframe = pd.DataFrame({col: data[f"df__{col}"] for col in meta['columns']}, index=index)
+                laps_df = pd.DataFrame({col: data[f"laps__{col}"] for col in meta['laps_columns']})
+        except Exception as e:
+            print(f"ADVERTENCIA: Entrada de caché ilegible, se descarta: {e}")
+            self._remove(entry)
+            return None
+
+        # Marcar la entrada como usada recientemente
+        os.utime(entry, None)
+
+        session = TelemetrySession()
+        session.open_reader(ibt_path)  # Solo cabeceras: los demás canales siguen disponibles bajo demanda
+        session.dataframe = dataframe
+        session.laps_df = laps_df
+        session.build_lap_index()
+        print(f"INFO: Sesión cargada desde la caché ({len(dataframe)} muestras).")
+        return session
+
+    def store(self, session: TelemetrySession):
+        """ Guarda las columnas numéricas del dataframe y laps_df de la sesión. """
+        if session.ibt_path is None or session.dataframe.empty:
+            return
+        df = session.dataframe
+        # Las columnas con listas por fila (variables con count > 1) no se cachean
+        columns = [col for col in df.columns if df[col].dtype != object]
+        laps_columns = session.laps_df.columns.tolist()
+
+        arrays = {f"df__{col}": df[col].to_numpy() for col in columns}
+        arrays.update({f"laps__{col}": session.laps_df[col].to_numpy() for col in laps_columns})
+        arrays['index'] = df.index.to_numpy()
+        arrays['meta'] = np.array(json.dumps({
+            'ibt_path': os.path.abspath(session.ibt_path),
+            'columns': columns,
+            'laps_columns': laps_columns,
+        }))
+
+        try:
+            entry = self._entry_path(self.key_for(session.ibt_path))
+            tmp_entry = entry + '.tmp'
+            with open(tmp_entry, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_entry, entry)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo guardar la sesión en la caché: {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        """ Elimina las entradas menos usadas hasta quedar por debajo de max_bytes. """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(('.npz', '.tmp')):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
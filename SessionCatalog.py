@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+File: SessionCatalog.py
+Created on 2025-07-31
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import os
+import re
+import time
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from IbtMetadata import read_metadata
+from TelemetrySession import TelemetrySession
+from BatchProcessor import find_ibt_files, DEFAULT_SECTORS
+
+# Se incrementa cuando cambia el esquema o lo que se calcula por vuelta: obliga a reindexar
+CATALOG_FORMAT_VERSION = 1
+
+# Canales que se decodifican para los tiempos y agregados por vuelta (el resto no se lee)
+CATALOG_COLUMNS = ['SessionTime', 'Lap', 'LapDistPct', 'LapDist', 'Speed', 'Throttle', 'Brake', 'Lat', 'Lon']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER, mtime_ns INTEGER, format_version INTEGER,
+    track TEXT, track_config TEXT, car TEXT, driver TEXT, session_type TEXT, session_date TEXT,
+    tick_rate INTEGER, record_count INTEGER, lap_count INTEGER, best_time REAL,
+    error TEXT, indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS laps (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    lap INTEGER NOT NULL, time REAL, valid INTEGER,
+    max_speed REAL, mean_speed REAL, full_throttle_pct REAL, brake_pct REAL,
+    PRIMARY KEY (file_id, lap)
+);
+CREATE TABLE IF NOT EXISTS sectors (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    lap INTEGER NOT NULL, sector INTEGER NOT NULL, time REAL,
+    PRIMARY KEY (file_id, lap, sector)
+);
+CREATE INDEX IF NOT EXISTS idx_files_track_car ON files(track, car);
+CREATE INDEX IF NOT EXISTS idx_laps_time ON laps(valid, time);
+CREATE INDEX IF NOT EXISTS idx_sectors_time ON sectors(sector, time);
+"""
+
+
+def default_catalog_path():
+    base = os.getenv('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'SimracingTelemetryAnalyzer', 'session_catalog.sqlite')
+
+
+def lap_aggregates(df: pd.DataFrame):
+    """ Agregados por vuelta en una pasada (agrupación por Lap): velocidad y uso de pedales. """
+    laps = df['Lap'].to_numpy()
+    unique_laps, inverse, counts = np.unique(laps, return_inverse=True, return_counts=True)
+    result = pd.DataFrame({'lap': unique_laps.astype(int)})
+    speed = df['Speed'].to_numpy(dtype=np.float64) if 'Speed' in df.columns else np.zeros(len(df))
+    max_speed = np.full(len(unique_laps), -np.inf)
+    np.maximum.at(max_speed, inverse, speed)
+    result['max_speed'] = max_speed
+    result['mean_speed'] = np.bincount(inverse, weights=speed) / counts
+    for column, name, threshold in (('Throttle', 'full_throttle_pct', 0.98), ('Brake', 'brake_pct', 0.05)):
+        values = df[column].to_numpy() if column in df.columns else np.zeros(len(df))
+        result[name] = 100.0 * np.bincount(inverse, weights=values > threshold) / counts
+    return result
+
+
+class SessionCatalog:
+    """
+    Catálogo local (SQLite) de archivos .ibt con sus vueltas y sectores, para buscar entre miles
+    de sesiones sin abrirlas. Cada archivo se identifica por ruta + tamaño + fecha de modificación:
+    al reindexar una carpeta solo se procesan los archivos nuevos o modificados.
+    Cada llamada abre su propia conexión, de modo que el indexado puede ejecutarse en un hilo
+    mientras la interfaz consulta el catálogo (modo WAL).
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or default_catalog_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # --- Indexado ---
+
+    def index_paths(self, paths, recursive=True, sector_percents=DEFAULT_SECTORS, progress_callback=None):
+        """
+        Indexa los .ibt de las rutas indicadas (archivos o carpetas). Los archivos sin cambios
+        desde el último indexado se saltan. Devuelve (indexados, sin cambios, con error).
+        progress_callback(hecho, total) puede devolver False para detener el indexado.
+        """
+        files = find_ibt_files(paths, recursive)
+        with closing(self._connect()) as conn:
+            known = {row[0]: row[1:] for row in conn.execute(
+                "SELECT path, size, mtime_ns, format_version FROM files")}
+
+        pending = []
+        for path in files:
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_size, stat.st_mtime_ns, CATALOG_FORMAT_VERSION):
+                pending.append((path, stat))
+
+        indexed, errors = 0, 0
+        for i, (path, stat) in enumerate(pending):
+            if progress_callback is not None and progress_callback(i, len(pending)) is False:
+                break
+            if self.index_file(path, stat, sector_percents):
+                indexed += 1
+            else:
+                errors += 1
+        if progress_callback is not None:
+            progress_callback(len(pending), len(pending))
+        print(f"INFO: Catálogo actualizado: {indexed} archivos indexados, {len(files) - len(pending)} sin cambios, "
+              f"{errors} con errores.")
+        return indexed, len(files) - len(pending), errors
+
+    def index_file(self, path, stat=None, sector_percents=DEFAULT_SECTORS):
+        """ (Re)indexa un archivo. Devuelve False si no se pudo leer (queda registrado el error). """
+        stat = stat or os.stat(path)
+        laps_rows, sector_rows, error = [], [], None
+        metadata = {}
+        try:
+            # Pista, coche, fecha... salen de las cabeceras; solo se decodifican los canales de tiempos
+            metadata = read_metadata(path)
+            session = TelemetrySession()
+            if metadata['record_count'] > 0:
+                session.load_telemetry(path, columns=CATALOG_COLUMNS)
+                session.close()
+            if not session.dataframe.empty:
+                session.remove_problematic_rows()
+                laps_df = session.times_by_laps(sector_percents)
+                if not laps_df.empty:
+                    laps_rows, sector_rows = self._lap_rows(session, laps_df)
+        except Exception as e:
+            error = str(e)
+            print(f"ADVERTENCIA: No se pudo indexar '{path}': {e}")
+
+        valid_times = [row[2] for row in laps_rows if row[3]]
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            cursor = conn.execute(
+                "INSERT INTO files (path, size, mtime_ns, format_version, track, track_config, car, driver, "
+                "session_type, session_date, tick_rate, record_count, lap_count, best_time, error, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, CATALOG_FORMAT_VERSION,
+                 metadata.get('track'), metadata.get('track_config'), metadata.get('car'), metadata.get('driver'),
+                 metadata.get('session_type'), metadata.get('session_date'), metadata.get('tick_rate'),
+                 metadata.get('record_count'), len(laps_rows), min(valid_times) if valid_times else None,
+                 error, time.time()))
+            file_id = cursor.lastrowid
+            conn.executemany("INSERT INTO laps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(file_id,) + row[1:] for row in laps_rows])
+            conn.executemany("INSERT INTO sectors VALUES (?, ?, ?, ?)",
+                             [(file_id,) + row[1:] for row in sector_rows])
+        return error is None
+
+    @staticmethod
+    def _lap_rows(session, laps_df):
+        sector_cols = [col for col in laps_df.columns if col.startswith('S')]
+        aggregates = lap_aggregates(session.dataframe).set_index('lap')
+        laps_rows, sector_rows = [], []
+        for row in laps_df.itertuples(index=False):
+            lap = int(row.Lap)
+            sectors = [float(getattr(row, col)) for col in sector_cols]
+            valid = all(s > 0 for s in sectors) and lap not in session.invalid_laps
+            agg = aggregates.loc[lap] if lap in aggregates.index else None
+            laps_rows.append((None, lap, float(row.Time), int(valid),
+                              *(float(agg[c]) if agg is not None else None
+                                for c in ('max_speed', 'mean_speed', 'full_throttle_pct', 'brake_pct'))))
+            sector_rows.extend((None, lap, i + 1, s) for i, s in enumerate(sectors))
+        return laps_rows, sector_rows
+
+    def prune(self):
+        """ Elimina del catálogo los archivos que ya no existen. Devuelve cuántos se eliminaron. """
+        with closing(self._connect()) as conn, conn:
+            missing = [(path,) for (path,) in conn.execute("SELECT path FROM files") if not os.path.exists(path)]
+            conn.executemany("DELETE FROM files WHERE path = ?", missing)
+        return len(missing)
+
+    # --- Consultas ---
+
+    def distinct(self, column):
+        """ Valores distintos de una columna de files (track, car, session_type...) para los filtros. """
+        if column not in ('track', 'track_config', 'car', 'driver', 'session_type'):
+            raise ValueError(f"Columna de catálogo no válida: {column}")
+        with closing(self._connect()) as conn:
+            return [value for (value,) in conn.execute(
+                f"SELECT DISTINCT {column} FROM files WHERE {column} IS NOT NULL AND {column} != '' ORDER BY {column}")]
+
+    def file_count(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def search_laps(self, track=None, car=None, session_type=None, sector=None, valid_only=True, limit=200):
+        """
+        Mejores vueltas que cumplen los filtros, ordenadas por tiempo de vuelta o, si se indica
+        `sector` (1, 2...), por el tiempo de ese sector. Devuelve un DataFrame con una fila por vuelta:
+        Track, Car, Driver, Session, Date, Lap, Time, S1..Sn, MaxSpeed, File.
+        """
+        conditions, params = [], []
+        for column, value in (('f.track', track), ('f.car', car), ('f.session_type', session_type)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if valid_only:
+            conditions.append("l.valid = 1")
+        if sector:
+            order_join = "JOIN sectors o ON o.file_id = l.file_id AND o.lap = l.lap AND o.sector = ?"
+            params.insert(0, int(sector))
+            order_by = "o.time"
+            conditions.append("o.time > 0")
+        else:
+            order_join, order_by = "", "l.time"
+            conditions.append("l.time > 0")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (f"SELECT l.file_id, f.track, f.car, f.driver, f.session_type, f.session_date, l.lap, l.time, "
+                 f"l.max_speed, f.path FROM laps l JOIN files f ON f.id = l.file_id {order_join} "
+                 f"{where} ORDER BY {order_by} LIMIT ?")
+        params.append(int(limit))
+
+        with closing(self._connect()) as conn:
+            laps = pd.read_sql_query(query, conn, params=params)
+            if laps.empty:
+                return laps
+            file_ids = ",".join(str(int(f)) for f in laps['file_id'].unique())
+            sectors = pd.read_sql_query(
+                f"SELECT file_id, lap, sector, time FROM sectors WHERE file_id IN ({file_ids})", conn)
+
+        sectors = sectors.pivot_table(index=['file_id', 'lap'], columns='sector', values='time')
+        sectors.columns = [f"S{int(c)}" for c in sectors.columns]
+        laps = laps.join(sectors, on=['file_id', 'lap'])
+        laps = laps.rename(columns={'track': 'Track', 'car': 'Car', 'driver': 'Driver', 'session_type': 'Session',
+                                    'session_date': 'Date', 'lap': 'Lap', 'time': 'Time',
+                                    'max_speed': 'MaxSpeed', 'path': 'File'})
+        sector_cols = [c for c in laps.columns if re.fullmatch(r'S\d+', c)]
+        return laps[['Track', 'Car', 'Driver', 'Session', 'Date', 'Lap', 'Time'] + sector_cols + ['MaxSpeed', 'File']]
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+'''
+File: SessionCatalogDialog.py
+Created on 2025-07-31
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+'''
+
+import os
+import time
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QCheckBox, QPushButton, QLabel,
+                               QTableWidget, QTableWidgetItem, QFileDialog, QProgressBar)
+from PySide6.QtCore import Qt, Signal
+
+from BackgroundTask import BackgroundTask
+from SessionCatalog import SessionCatalog
+
+ALL_ITEMS = "Todos"
+
+
+class SessionCatalogDialog(QDialog):
+    """
+    Navegador del catálogo de sesiones: filtra por pista, coche y tipo de sesión y ordena por
+    tiempo de vuelta o de un sector. El indexado de carpetas se ejecuta en segundo plano.
+    """
+    file_requested = Signal(str)  # Ruta del .ibt que se quiere abrir
+
+    def __init__(self, catalog: SessionCatalog, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Catálogo de sesiones")
+        self.resize(1000, 600)
+        self.catalog = catalog
+        self._index_task = None
+        self._results = None
+
+        layout = QVBoxLayout(self)
+        filters = QHBoxLayout()
+        self.track_combo = QComboBox()
+        self.car_combo = QComboBox()
+        self.session_combo = QComboBox()
+        self.order_combo = QComboBox()
+        self.order_combo.addItems(["Vuelta", "S1", "S2", "S3", "S4"])
+        self.valid_check = QCheckBox("Solo vueltas válidas")
+        self.valid_check.setChecked(True)
+        for label, widget in (("Pista", self.track_combo), ("Coche", self.car_combo),
+                              ("Sesión", self.session_combo), ("Ordenar por", self.order_combo)):
+            filters.addWidget(QLabel(label))
+            filters.addWidget(widget, 1)
+        filters.addWidget(self.valid_check)
+        layout.addLayout(filters)
+
+        self.table = QTableWidget()
+        self.table.verticalHeader().setVisible(False)
+        self.table.setAlternatingRowColors(True)
+        self.table.setShowGrid(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.cellDoubleClicked.connect(self.open_selected)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.status_label = QLabel()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        index_button = QPushButton("Indexar carpeta...")
+        index_button.clicked.connect(self.index_folder_dialog)
+        open_button = QPushButton("Abrir sesión")
+        open_button.clicked.connect(self.open_selected)
+        buttons.addWidget(self.status_label, 1)
+        buttons.addWidget(self.progress_bar)
+        buttons.addWidget(index_button)
+        buttons.addWidget(open_button)
+        layout.addLayout(buttons)
+
+        for widget in (self.track_combo, self.car_combo, self.session_combo, self.order_combo):
+            widget.currentIndexChanged.connect(self.refresh_results)
+        self.valid_check.toggled.connect(self.refresh_results)
+        self.refresh_filters()
+
+    def refresh_filters(self):
+        """ Rellena los filtros con los valores del catálogo conservando la selección actual. """
+        for combo, column in ((self.track_combo, 'track'), (self.car_combo, 'car'),
+                              (self.session_combo, 'session_type')):
+            current = combo.currentText()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(ALL_ITEMS)
+            combo.addItems(self.catalog.distinct(column))
+            index = combo.findText(current)
+            combo.setCurrentIndex(max(index, 0))
+            combo.blockSignals(False)
+        self.refresh_results()
+
+    def _filter_value(self, combo):
+        text = combo.currentText()
+        return None if text in ("", ALL_ITEMS) else text
+
+    def refresh_results(self):
+        start = time.perf_counter()
+        order = self.order_combo.currentText()
+        self._results = self.catalog.search_laps(track=self._filter_value(self.track_combo),
+                                                 car=self._filter_value(self.car_combo),
+                                                 session_type=self._filter_value(self.session_combo),
+                                                 sector=int(order[1:]) if order.startswith('S') else None,
+                                                 valid_only=self.valid_check.isChecked())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._fill_table(self._results)
+        self.status_label.setText(f"{self.catalog.file_count()} archivos en el catálogo · "
+                                  f"{len(self._results)} vueltas ({elapsed_ms:.0f} ms)")
+
+    def _fill_table(self, results):
+        self.table.setRowCount(0)
+        if results is None or results.empty:
+            return
+        columns = [col for col in results.columns if col != 'File'] + ['Archivo']
+        self.table.setColumnCount(len(columns))
+        self.table.setHorizontalHeaderLabels(columns)
+        self.table.setRowCount(len(results))
+        for row, values in enumerate(results.itertuples(index=False)):
+            for col, (name, value) in enumerate(zip(results.columns, values)):
+                if name == 'File':
+                    text = os.path.basename(value)
+                elif name == 'Time' or (name.startswith('S') and name[1:].isdigit()):
+                    text = self._format_time(value)
+                elif name == 'MaxSpeed':
+                    text = f"{value * 3.6:.1f}" if value == value else ""
+                else:
+                    text = "" if value is None else str(value)
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignCenter)
+                if name == 'File':
+                    item.setToolTip(value)
+                self.table.setItem(row, col, item)
+        self.table.resizeColumnsToContents()
+
+    @staticmethod
+    def _format_time(seconds):
+        if seconds is None or seconds != seconds:
+            return ""
+        minutes, seconds = divmod(seconds, 60)
+        return f"{int(minutes)}:{seconds:06.3f}" if minutes >= 1 else f"{seconds:.3f}"
+
+    def open_selected(self, *args):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows or self._results is None:
+            return
+        self.file_requested.emit(self._results['File'].iloc[rows[0].row()])
+
+    # --- Indexado en segundo plano ---
+
+    def index_folder_dialog(self):
+        folder = QFileDialog.getExistingDirectory(self, "Carpeta con archivos .ibt")
+        if folder:
+            self.start_indexing([folder])
+
+    def start_indexing(self, paths):
+        if self._index_task is not None and self._index_task.is_running():
+            print("ADVERTENCIA: Ya hay un indexado en curso.")
+            return
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self._index_task = BackgroundTask(self.catalog.index_paths, paths)
+        self._index_task.progress.connect(self.on_index_progress)
+        self._index_task.finished.connect(self.on_index_finished)
+        self._index_task.failed.connect(self.on_index_failed)
+        self._index_task.canceled.connect(self.on_index_finished)
+        self._index_task.start()
+
+    def on_index_progress(self, done, total):
+        self.progress_bar.setMaximum(max(int(total), 1))
+        self.progress_bar.setValue(int(done))
+
+    def on_index_finished(self, result=None):
+        self.progress_bar.setVisible(False)
+        self.refresh_filters()
+
+    def on_index_failed(self, message):
+        self.progress_bar.setVisible(False)
+        print(f"Error durante el indexado del catálogo: {message}")
+
+    def closeEvent(self, event):
+        if self._index_task is not None and self._index_task.is_running():
+            self._index_task.cancel()
+            self._index_task.wait()
+        super().closeEvent(event)
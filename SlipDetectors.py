@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+File: SlipDetectors.py
+Created on 2025-07-24
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+
+WHEELS = ['LF', 'RF', 'LR', 'RR']
+
+DEFAULT_PARAMS = {
+    'brake_threshold': 0.1,       # Freno mínimo para considerar que se está frenando
+    'speed_threshold': 5.0,       # m/s (equivalente a 18 km/h)
+    'throttle_threshold': 0.1,    # Acelerador mínimo para considerar que se está acelerando
+    'lockup_threshold': 1.0,      # m/s de velocidad de rueda por debajo de la cual está bloqueada
+    'spin_threshold_pct': 15.0,   # % de exceso de velocidad de las ruedas motrices
+    'drivetrain': 'RWD',          # 'RWD', 'FWD' o 'AWD'
+}
+
+# Predicados compartidos: nombre -> (canal, parámetro del umbral)
+SHARED_PREDICATES = {
+    'braking': ('Brake', 'brake_threshold'),
+    'moving': ('Speed', 'speed_threshold'),
+    'throttle': ('Throttle', 'throttle_threshold'),
+}
+
+
+class WheelLockupDetector:
+    """ Rueda bloqueada: velocidad de rueda casi nula mientras el coche se mueve y se frena. """
+    def __init__(self, wheel):
+        self.wheel = wheel
+        self.output = f'{wheel}_Lockup'
+        self.inputs = ['Brake', 'Speed', f'{wheel}speed']
+        self.predicates = ['braking', 'moving']
+        self.params = ['lockup_threshold']
+
+    def compute(self, engine, df, out):
+        np.logical_and(engine.predicate('braking'), engine.predicate('moving'), out=out)
+        out &= df[f'{self.wheel}speed'].to_numpy() < engine.params['lockup_threshold']
+
+    def severity(self, engine, df):
+        """ Deslizamiento de la rueda respecto al coche (0 = rueda libre, 1 = bloqueada). """
+        speed = df['Speed'].to_numpy()
+        return 1.0 - df[f'{self.wheel}speed'].to_numpy() / np.maximum(speed, 0.01)
+
+
+class WheelSpinDetector:
+    """
+    Patinaje: las ruedas motrices giran más rápido que las libres (o que el coche en AWD)
+    en un porcentaje mayor que spin_threshold_pct mientras se acelera.
+    """
+    output = 'WheelSpin'
+    inputs = ['Throttle', 'Speed', 'LFspeed', 'RFspeed', 'LRspeed', 'RRspeed']
+    predicates = ['throttle']
+    params = ['spin_threshold_pct', 'drivetrain']
+
+    def _slip_pct(self, engine, df):
+        front = (df['LFspeed'].to_numpy() + df['RFspeed'].to_numpy()) / 2
+        rear = (df['LRspeed'].to_numpy() + df['RRspeed'].to_numpy()) / 2
+        drivetrain = engine.params['drivetrain']
+        if drivetrain == 'FWD':
+            driven, free = front, rear
+        elif drivetrain == 'AWD':
+            driven, free = (front + rear) / 2, df['Speed'].to_numpy()
+        else:
+            driven, free = rear, front
+        # Sumamos un valor pequeño para evitar división por cero.
+        return (driven - free) / (free + 0.01) * 100
+
+    def compute(self, engine, df, out):
+        np.greater(self._slip_pct(engine, df), engine.params['spin_threshold_pct'], out=out)
+        out &= engine.predicate('throttle')
+
+    def severity(self, engine, df):
+        """ Porcentaje de exceso de velocidad de las ruedas motrices. """
+        return self._slip_pct(engine, df)
+
+
+class ABSActivityDetector:
+    """ Actividad del ABS según el canal BrakeABSactive de iRacing. """
+    output = 'ABS_Active'
+    inputs = ['BrakeABSactive']
+    predicates = []
+    params = []
+
+    def compute(self, engine, df, out):
+        np.not_equal(df['BrakeABSactive'].to_numpy(), 0, out=out)
+
+    def severity(self, engine, df):
+        """ Presión de freno aplicada mientras actúa el ABS. """
+        return df['Brake'].to_numpy() if 'Brake' in df.columns else np.ones(len(df))
+
+
+def default_detectors():
+    return [WheelLockupDetector(wheel) for wheel in WHEELS] + [WheelSpinDetector(), ABSActivityDetector()]
+
+
+class SlipDetectorEngine:
+    """
+    Ejecuta un registro de detectores sobre el DataFrame. Los predicados compartidos
+    (frenando, en movimiento, acelerando) se evalúan una sola vez por umbral y cada detector
+    escribe en su propio array uint8 preasignado. Al volver a ejecutar con otros parámetros
+    solo se recalculan los detectores que dependen de los parámetros modificados.
+    """
+
+    def __init__(self, detectors=None, **params):
+        self.detectors = detectors if detectors is not None else default_detectors()
+        self.params = dict(DEFAULT_PARAMS)
+        self.params.update(params)
+        self.outputs = {}             # salida -> array bool de 1 byte (se expone como uint8)
+        self._predicates = {}         # predicado -> (umbral, array bool)
+        self._computed_with = {}      # salida -> parámetros usados en el último cálculo
+        self._data_key = None
+        self._df = None
+
+    def required_channels(self):
+        channels = []
+        for detector in self.detectors:
+            channels += [c for c in detector.inputs if c not in channels]
+        return channels
+
+    def _detector_params(self, detector):
+        names = list(detector.params) + [SHARED_PREDICATES[p][1] for p in detector.predicates]
+        return {name: self.params[name] for name in names}
+
+    def predicate(self, name):
+        channel, param = SHARED_PREDICATES[name]
+        threshold = self.params[param]
+        cached = self._predicates.get(name)
+        if cached is None or cached[0] != threshold:
+            cached = (threshold, self._df[channel].to_numpy() > threshold)
+            self._predicates[name] = cached
+        return cached[1]
+
+    def run(self, df, data_key=None, only=None, **params):
+        """
+        Calcula las salidas sobre df. data_key identifica las filas del DataFrame; si cambia,
+        se descartan predicados y salidas previas. `only` limita los detectores a ejecutar.
+        Devuelve la lista de salidas recalculadas.
+        """
+        self.params.update(params)
+        if data_key is None or data_key != self._data_key or any(len(o) != len(df) for o in self.outputs.values()):
+            self.outputs = {}
+            self._predicates = {}
+            self._computed_with = {}
+            self._data_key = data_key
+        self._df = df
+
+        recomputed = []
+        for detector in self.detectors:
+            if only is not None and detector.output not in only:
+                continue
+            if not all(c in df.columns for c in detector.inputs):
+                continue
+            used_params = self._detector_params(detector)
+            if self._computed_with.get(detector.output) == used_params:
+                continue
+            out = self.outputs.get(detector.output)
+            if out is None:
+                out = np.empty(len(df), dtype=bool)
+                self.outputs[detector.output] = out
+            detector.compute(self, df, out)
+            self._computed_with[detector.output] = used_params
+            recomputed.append(detector.output)
+        self._df = None
+        return recomputed
+
+    def output_column(self, name):
+        """ Salida como uint8 (vista sin copia del array bool de 1 byte). """
+        return self.outputs[name].view(np.uint8)
+
+    def detector_for(self, name):
+        return next((d for d in self.detectors if d.output == name), None)
+
+    def severity(self, name, df):
+        """ Severidad por muestra de la salida indicada (None si el detector no existe o faltan entradas). """
+        detector = self.detector_for(name)
+        if detector is None or not all(c in df.columns for c in detector.inputs):
+            return None
+        return np.asarray(detector.severity(self, df), dtype=np.float64)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+File: TelemetryCleaner.py
+Created on 2025-07-28
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+DEFAULT_CLEANING_PARAMS = {
+    'zero_gps_deg': 0.01,         # |Lat| y |Lon| por debajo de esto: posición GPS no disponible
+    'speed_factor': 1.5,          # Distancia permitida entre muestras = Speed * dt * factor + margen
+    'jump_margin_m': 5.0,         # Margen fijo (m) para el ruido del GPS
+    'gap_factor': 5.0,            # Hueco de SessionTime: dt mayor que gap_factor * dt mediano
+    'min_gap_s': 0.5,             # ... y al menos estos segundos
+}
+
+
+def step_distances(lat, lon):
+    """ Distancia (m) entre muestras consecutivas con la aproximación equirectangular. """
+    lat_rad = np.radians(lat)
+    dlat = np.diff(lat_rad)
+    dlon = np.diff(np.radians(lon)) * np.cos((lat_rad[1:] + lat_rad[:-1]) / 2)
+    return EARTH_RADIUS_M * np.hypot(dlat, dlon)
+
+
+def detect_discontinuities(lat, lon, speed, session_time, **params):
+    """
+    Busca en una pasada vectorizada las muestras con problemas. Devuelve un diccionario de
+    máscaras posicionales (bool, una por fila):
+      'gps_zero'  -> posición (0, 0) o no finita
+      'gps_spike' -> una muestra aislada cuya velocidad implícita es incompatible con Speed
+                     tanto al llegar como al salir de ella
+      'teleport'  -> primera fila tras un salto de posición que no vuelve (reset, grúa)
+      'time_gap'  -> primera fila tras un hueco o retroceso de SessionTime
+    Las distancias se miden entre muestras con GPS válido, para que un tramo en (0, 0) no
+    oculte un teletransporte.
+    """
+    p = dict(DEFAULT_CLEANING_PARAMS)
+    p.update(params)
+    n = len(lat)
+    masks = {name: np.zeros(n, dtype=bool) for name in ('gps_zero', 'gps_spike', 'teleport', 'time_gap')}
+    if n < 2:
+        return masks
+
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    speed = np.nan_to_num(np.asarray(speed, dtype=np.float64), nan=0.0)
+    session_time = np.asarray(session_time, dtype=np.float64)
+
+    masks['gps_zero'] = ~(np.isfinite(lat) & np.isfinite(lon)) | \
+        ((np.abs(lat) < p['zero_gps_deg']) & (np.abs(lon) < p['zero_gps_deg']))
+
+    dt = np.diff(session_time)
+    positive = dt[dt > 0]
+    typical_dt = np.median(positive) if len(positive) else 0.0
+    gap = (dt <= 0) | (dt > max(p['gap_factor'] * typical_dt, p['min_gap_s']))
+    masks['time_gap'][1:] = gap
+
+    valid = np.flatnonzero(~masks['gps_zero'])
+    if len(valid) < 2:
+        return masks
+    dist = step_distances(lat[valid], lon[valid])
+    dt_valid = session_time[valid[1:]] - session_time[valid[:-1]]
+    allowed = np.maximum(speed[valid[1:]], speed[valid[:-1]]) * np.abs(dt_valid) * p['speed_factor'] \
+        + p['jump_margin_m']
+    # Un hueco de tiempo ya parte el tramo: no se cuenta además como salto de posición
+    gap_between = np.cumsum(masks['time_gap'])[valid]
+    jump = (dist > allowed) & (np.diff(gap_between) == 0)
+
+    # Pico aislado: se salta al llegar y al salir, y los vecinos sí son coherentes entre sí
+    spike = np.zeros(len(valid), dtype=bool)
+    if len(valid) >= 3:
+        skip_dist = EARTH_RADIUS_M * np.hypot(
+            np.radians(lat[valid[2:]] - lat[valid[:-2]]),
+            np.radians(lon[valid[2:]] - lon[valid[:-2]]) * np.cos(np.radians(lat[valid[1:-1]])))
+        skip_allowed = np.maximum(speed[valid[2:]], speed[valid[:-2]]) \
+            * np.abs(session_time[valid[2:]] - session_time[valid[:-2]]) * p['speed_factor'] + p['jump_margin_m']
+        spike[1:-1] = jump[:-1] & jump[1:] & (skip_dist <= skip_allowed)
+    masks['gps_spike'][valid] = spike
+
+    # Los saltos que no forman parte de un pico son teletransportes (la fila de llegada)
+    spike_edges = spike[1:] | spike[:-1]
+    masks['teleport'][valid[1:][jump & ~spike_edges]] = True
+    return masks
+
+
+def continuous_segments(breaks):
+    """ Filas de inicio y fin (exclusivo) de los tramos continuos delimitados por `breaks`. """
+    n = len(breaks)
+    starts = np.flatnonzero(breaks)
+    starts = np.concatenate(([0], starts[starts > 0])).astype(np.int64)
+    ends = np.append(starts[1:], n).astype(np.int64)
+    return starts, ends
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+File: TelemetryExport.py
+Created on 2025-07-22
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import os
+import numpy as np
+
+try:
+    import pyarrow  # noqa: F401  (necesario solo para Parquet/Feather)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Decimales con los que se escribe cada columna en el CSV (0 = entero redondeado)
+CSV_COLUMN_DECIMALS = {
+    'SessionTime': 3,
+    'RPM': 0,
+    'Speed': 2,
+    'Brake': 4,
+    'Throttle': 4,
+    'SteeringWheelAngle': 4,
+    'Yaw': 5,
+    'Pitch': 5,
+    'Roll': 5,
+    'Lat': 7,
+    'Lon': 7,
+    'Alt': 7,
+}
+
+# Filas que se formatean y escriben de una vez
+CSV_CHUNK_ROWS = 200_000
+
+EXPORT_FORMATS = {
+    '.csv': "CSV Files (*.csv)",
+    '.parquet': "Parquet Files (*.parquet)",
+    '.feather': "Feather Files (*.feather)",
+}
+
+
+class ExportCancelled(Exception):
+    """ Se lanza cuando el callback de progreso pide cancelar la exportación. """
+
+
+def format_fixed(values, decimals: int):
+    """
+    Formatea un array numérico con un número fijo de decimales sin recorrerlo en Python:
+    se redondea a entero escalado y se componen parte entera y decimal con np.strings.
+    Equivale a f"{x:.{decimals}f}" (y a f"{int(round(x))}" con decimals=0).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10 ** decimals
+    magnitude = np.abs(values) * scale
+    scaled = np.rint(magnitude)
+    # Cerca de un empate (...,5 tras escalar) el producto en coma flotante puede redondear distinto
+    # que el valor binario exacto que redondea f"{x:.nf}" (1.315 -> '1.31'): esos se formatean uno a uno
+    with np.errstate(invalid='ignore'):
+        near_tie = np.abs(magnitude - np.floor(magnitude) - 0.5) <= 1e-6 + magnitude * 1e-15
+    exact = np.isfinite(scaled) & (scaled < 2**53) & ~near_tie
+    ints = np.where(exact, scaled, 0).astype(np.int64)
+
+    text = (ints // scale).astype(str)
+    if decimals > 0:
+        fraction = np.strings.zfill((ints % scale).astype(str), decimals)
+        text = np.strings.add(np.strings.add(text, '.'), fraction)
+    negative = np.signbit(values) & exact
+    if decimals == 0:
+        negative &= ints != 0  # int(round(-0.3)) se escribe "0", sin signo
+    text = np.strings.add(np.where(negative, '-', ''), text)
+    text = text.astype(object)
+
+    # NaN, infinitos, valores enormes y casi empates (muy pocos) se formatean uno a uno
+    for i in np.flatnonzero(~exact):
+        value = values[i]
+        if decimals == 0:
+            if np.isnan(value):
+                text[i] = ''
+            else:
+                text[i] = f"{int(round(value))}" if np.isfinite(value) else f"{value:.0f}"
+        else:
+            text[i] = f"{value:.{decimals}f}"
+    return text
+
+
+def export_csv(df, path: str, chunk_rows: int = CSV_CHUNK_ROWS, progress_callback=None):
+    """
+    Escribe el DataFrame en CSV con el formato de CSV_COLUMN_DECIMALS, formateando cada
+    columna de forma vectorizada y por bloques de filas, sin copiar el DataFrame completo.
+    progress_callback(filas_escritas, filas_totales) puede devolver False para cancelar.
+    """
+    total_rows = len(df)
+    formatted_columns = [col for col in CSV_COLUMN_DECIMALS if col in df.columns]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for start in range(0, max(total_rows, 1), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            formatted = {col: format_fixed(chunk[col].to_numpy(), CSV_COLUMN_DECIMALS[col])
+                         for col in formatted_columns}
+            chunk.assign(**formatted).to_csv(f, index=False, header=(start == 0), lineterminator=os.linesep)
+            if progress_callback is not None and progress_callback(start + len(chunk), total_rows) is False:
+                raise ExportCancelled()
+
+
+def _require_pyarrow(format_name):
+    if not HAS_PYARROW:
+        raise RuntimeError(f"La exportación a {format_name} necesita el paquete 'pyarrow'.")
+
+
+def export_parquet(df, path: str, compression: str = 'zstd', progress_callback=None):
+    """ Exporta el DataFrame a Parquet comprimido (tipos binarios nativos, sin formateo). """
+    _require_pyarrow('Parquet')
+    df.to_parquet(path, compression=compression, index=False)
+    if progress_callback is not None:
+        progress_callback(len(df), len(df))
+
+
+def export_feather(df, path: str, compression: str = 'zstd', progress_callback=None):
+    """ Exporta el DataFrame a Feather (Arrow IPC) comprimido. """
+    _require_pyarrow('Feather')
+    df.reset_index(drop=True).to_feather(path, compression=compression)
+    if progress_callback is not None:
+        progress_callback(len(df), len(df))
+
+
+def export_dataframe(df, path: str, progress_callback=None):
+    """
+    Exporta según la extensión del archivo (.csv, .parquet o .feather).
+    Si la exportación se cancela o falla se borra el archivo incompleto.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    exporters = {'.csv': export_csv, '.parquet': export_parquet, '.feather': export_feather}
+    if extension not in exporters:
+        raise ValueError(f"Formato de exportación no soportado: '{extension}'")
+    try:
+        exporters[extension](df, path, progress_callback=progress_callback)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return path
+
+
+def available_export_filters():
+    """ Filtros para QFileDialog: Parquet y Feather solo si pyarrow está instalado. """
+    if HAS_PYARROW:
+        return list(EXPORT_FORMATS.values())
+    return [EXPORT_FORMATS['.csv']]
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+File: TelemetryRingBuffer.py
+Created on 2025-07-30
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class TelemetryRingBuffer:
+    """
+    Almacén columnar de capacidad fija para telemetría en directo o reproducida.
+    Cada canal es un array NumPy de 2 * capacidad en el que cada muestra se escribe dos veces
+    (en p y en p + capacidad), de modo que cualquier ventana de hasta `capacidad` muestras es
+    un tramo contiguo y se puede devolver como vista sin copia. Añadir es O(1) amortizado por
+    muestra y la memoria no crece con la duración de la sesión.
+    Las filas se identifican por su número absoluto (0, 1, 2... desde la primera muestra).
+    retain_laps: si se indica, solo se conservan las últimas N vueltas (además del límite de capacidad).
+    Las vistas son válidas hasta que un append posterior sobrescribe las filas más antiguas.
+    """
+
+    def __init__(self, channels: dict, capacity: int = 360_000, retain_laps: int = None):
+        self.capacity = int(capacity)
+        self.retain_laps = retain_laps
+        self._buffers = {name: np.zeros(2 * self.capacity, dtype=dtype) for name, dtype in channels.items()}
+        self.total = 0          # Muestras escritas desde el inicio
+        self.start = 0          # Fila absoluta más antigua que se conserva
+        self._lap_starts = []   # [(vuelta, fila absoluta de inicio)] de las vueltas conservadas
+
+    def __len__(self):
+        return self.total - self.start
+
+    @property
+    def channels(self):
+        return list(self._buffers.keys())
+
+    def append(self, block: dict):
+        """ Añade un bloque de muestras {canal: array}; los canales que falten se rellenan con 0. """
+        lengths = {len(values) for values in block.values()}
+        if not lengths:
+            return
+        if len(lengths) != 1:
+            raise ValueError("Todos los canales del bloque deben tener el mismo número de muestras.")
+        k = lengths.pop()
+        first_row = self.total
+        if k > self.capacity:
+            # Solo caben las últimas `capacity` muestras del bloque
+            skip = k - self.capacity
+            block = {name: values[skip:] for name, values in block.items()}
+            first_row += skip
+            k = self.capacity
+
+        pos = first_row % self.capacity
+        first = min(k, self.capacity - pos)
+        for name, buffer in self._buffers.items():
+            values = block.get(name)
+            if values is None:
+                values = np.zeros(k, dtype=buffer.dtype)
+            values = np.asarray(values)
+            buffer[pos:pos + first] = values[:first]
+            buffer[pos + self.capacity:pos + self.capacity + first] = values[:first]
+            if first < k:
+                buffer[:k - first] = values[first:]
+                buffer[self.capacity:self.capacity + k - first] = values[first:]
+
+        if 'Lap' in block:
+            lap = np.asarray(block['Lap'])
+            changes = np.flatnonzero(np.diff(lap)) + 1
+            if not self._lap_starts or self._lap_starts[-1][0] != lap[0]:
+                self._lap_starts.append((int(lap[0]), first_row))
+            self._lap_starts.extend((int(lap[i]), first_row + int(i)) for i in changes)
+
+        self.total = first_row + k
+        self.start = max(self.start, self.total - self.capacity)
+        if self.retain_laps and len(self._lap_starts) > self.retain_laps:
+            self.start = max(self.start, self._lap_starts[-self.retain_laps][1])
+        # Se olvidan las vueltas que ya han salido completamente de la ventana
+        while len(self._lap_starts) > 1 and self._lap_starts[1][1] <= self.start:
+            self._lap_starts.pop(0)
+
+    def _window(self, start, stop):
+        start = self.start if start is None else max(int(start), self.start)
+        stop = self.total if stop is None else min(int(stop), self.total)
+        return start, max(start, stop)
+
+    def view(self, name, start=None, stop=None):
+        """ Vista de solo lectura (sin copia) de un canal entre dos filas absolutas. """
+        start, stop = self._window(start, stop)
+        pos = start % self.capacity if self.capacity else 0
+        view = self._buffers[name][pos:pos + (stop - start)]
+        view.flags.writeable = False
+        return view
+
+    def frame(self, start=None, stop=None):
+        """ DataFrame de la ventana (columnas como vistas sin copia, índice = fila absoluta). """
+        start, stop = self._window(start, stop)
+        return pd.DataFrame({name: self.view(name, start, stop) for name in self._buffers},
+                            index=pd.RangeIndex(start, stop), copy=False)
+
+    def laps(self):
+        """ Vueltas presentes en la ventana, en orden de aparición. """
+        return [lap for lap, _ in self._lap_starts]
+
+    def lap_frame(self, lap):
+        """ Filas de la vuelta indicada que siguen en la ventana (vista sin copia). """
+        for i, (lap_num, first_row) in enumerate(self._lap_starts):
+            if lap_num == lap:
+                end = self._lap_starts[i + 1][1] if i + 1 < len(self._lap_starts) else self.total
+                return self.frame(first_row, end)
+        return self.frame(self.total, self.total)
@@ -1,34 +1,563 @@
-import irsdk
+import numpy as np
 import pandas as pd
 
+from IbtReader import IbtReader
+from TelemetryExport import export_csv
+from SlipDetectors import SlipDetectorEngine, WHEELS
+from LapResampler import LapResampler
+from ChannelStats import ChannelStats
+from TelemetryCleaner import detect_discontinuities, continuous_segments
+from MathChannels import MathChannelEngine, check_channel_names
+from CornerAnalysis import CORNERING_CHANNELS, detect_corners, corner_metrics
+from TrackCenterline import build_centerline
+
+# Columnas que se decodifican al abrir un archivo y que sobreviven a filter_driving_columns
+DRIVING_COLUMNS = [
+    'SessionTime', 'Lap', 'Speed', 'RPM', 'Throttle', 'Brake', 'Gear',
+    'Lat', 'Lon', 'Alt',      # Position
+    'SteeringWheelAngle',     # Steering wheel angle
+    'Yaw', 'Pitch', 'Roll',   # Car rotation
+    'YawRate',  # Slippage indicators (if available)
+    'LapDistPct', 'LapDist',
+    # Columnas de Temperatura
+    'LFtempL', 'LFtempM', 'LFtempR', 'RFtempL', 'RFtempM', 'RFtempR',
+    'LRtempL', 'LRtempM', 'LRtempR', 'RRtempL', 'RRtempM', 'RRtempR',
+    # Columnas creadas en analyze_driving_inputs
+    'LF_Lockup', 'RF_Lockup', 'LR_Lockup', 'RR_Lockup', 'WheelSpin', 'ABS_Active',
+    'LatAccel', 'LongAccel', 'VertAccel'
+]
+
+# Columnas que se decodifican al abrir una sesión de referencia: el resto de canales se lee
+# del .ibt (memmap) solo cuando se grafica
+REFERENCE_COLUMNS = ['SessionTime', 'Lap', 'LapDistPct', 'LapDist']
+
+# Columnas de marcas (uint8 por tick) que se indexan como eventos
+EVENT_COLUMNS = ['LF_Lockup', 'RF_Lockup', 'LR_Lockup', 'RR_Lockup', 'WheelSpin', 'ABS_Active']
+
+def run_lengths(flags):
+    """ Filas de inicio y fin (exclusivo) de cada tramo contiguo con la marca activa. """
+    padded = np.concatenate(([0], np.asarray(flags, dtype=np.int8) != 0, [0])).astype(np.int8)
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def region_passes(rows, lap, session_time, lap_dist=None, max_gap=3):
+    """
+    Pasadas por una región del mapa a partir de las filas (posicionales, ordenadas) que caen
+    dentro: cada tramo contiguo de filas de una misma vuelta es una pasada. Se toleran huecos de
+    hasta max_gap filas (ruido del GPS en el borde de la región). Devuelve un DataFrame con Lap,
+    StartRow, EndRow (inclusivo), Time (s) y, si se pasa lap_dist, DistStart y DistEnd (m).
+    """
+    columns = ['Lap', 'StartRow', 'EndRow', 'Time', 'DistStart', 'DistEnd']
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+    laps = np.asarray(lap)[rows]
+    breaks = (np.diff(rows) > max_gap) | (np.diff(laps) != 0)
+    starts = rows[np.concatenate(([True], breaks))]
+    ends = rows[np.concatenate((breaks, [True]))]
+    session_time = np.asarray(session_time, dtype=np.float64)
+    passes = pd.DataFrame({
+        'Lap': np.asarray(lap)[starts].astype(np.int64),
+        'StartRow': starts, 'EndRow': ends,
+        'Time': session_time[ends] - session_time[starts],
+        'DistStart': np.asarray(lap_dist, dtype=np.float64)[starts] if lap_dist is not None else np.nan,
+        'DistEnd': np.asarray(lap_dist, dtype=np.float64)[ends] if lap_dist is not None else np.nan,
+    }, columns=columns)
+    return passes
+
+# Número de registros que se copian entre dos avisos de progreso
+DECODE_CHUNK_ROWS = 1 << 18
+
+def lap_boundaries(lap):
+    """ Filas de inicio y fin (exclusivo) de cada tramo contiguo con el mismo número de vuelta. """
+    lap = np.asarray(lap)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(lap)) + 1))
+    ends = np.concatenate((starts[1:], [len(lap)]))
+    return starts, ends
+
+def compute_lap_times(lap, session_time, lap_dist_pct, sector_percents=(0.25, 0.5, 0.75), bounds=None):
+    """
+    Calcula en una sola pasada vectorizada los tiempos de vuelta y de sector.
+    Las vueltas se delimitan con np.diff(Lap) y los cruces de sector con un único searchsorted
+    sobre una clave monótona (vuelta * 2 + máximo acumulado de LapDistPct dentro de la vuelta).
+    El instante de cada cruce se interpola linealmente entre las dos muestras que lo rodean.
+    bounds: (starts, ends) ya calculados (p. ej. desde el índice de vueltas) para no volver a buscarlos.
+    Devuelve un DataFrame con columnas: Lap, Time, S1, S2, ..., Sn
+    """
+    lap = np.asarray(lap)
+    session_time = np.asarray(session_time, dtype=np.float64)
+    pct = np.nan_to_num(np.asarray(lap_dist_pct, dtype=np.float64), nan=0.0)
+    if len(lap) == 0:
+        return pd.DataFrame()
+
+    # Las muestras de una misma vuelta deben ser contiguas (orden estable si el contador retrocede)
+    if bounds is None and np.any(np.diff(lap) < 0):
+        order = np.argsort(lap, kind='stable')
+        lap, session_time, pct = lap[order], session_time[order], pct[order]
+
+    starts, ends = bounds if bounds is not None else lap_boundaries(lap)
+    t0 = session_time[starts]
+    t1 = session_time[ends - 1]
+
+    # Clave creciente: cada vuelta ocupa el intervalo [2k, 2k + 1]
+    segment = np.repeat(np.arange(len(starts)), ends - starts)
+    key = np.fmax.accumulate(segment * 2.0 + np.clip(pct, 0.0, 1.0))
+
+    sector_percents = np.asarray(sector_percents, dtype=np.float64)
+    targets = np.arange(len(starts))[:, None] * 2.0 + sector_percents[None, :]
+    idx = np.searchsorted(key, targets, side='left')
+    found = idx < ends[:, None]
+    idx_c = np.minimum(idx, len(lap) - 1)
+    prev = np.maximum(idx_c - 1, 0)
+    interpolate = found & (idx_c > starts[:, None])
+
+    p0, p1 = pct[prev], pct[idx_c]
+    span = np.where(p1 > p0, p1 - p0, 1.0)
+    frac = np.clip((sector_percents[None, :] - p0) / span, 0.0, 1.0)
+    crossing = np.where(interpolate,
+                        session_time[prev] + frac * (session_time[idx_c] - session_time[prev]),
+                        session_time[idx_c])
+    crossing = np.where(found, crossing, t1[:, None])  # Si no hay cruce, usar fin de vuelta
+
+    boundaries = np.column_stack((t0, crossing, t1))
+    sector_times = np.diff(boundaries, axis=1)
+
+    laps_df = pd.DataFrame({'Lap': lap[starts], 'Time': t1 - t0})
+    for i in range(sector_times.shape[1]):
+        laps_df[f'S{i+1}'] = sector_times[:, i]
+    return laps_df
+
+# Número de vuelta con el que se identifica la vuelta teórica (mejores sectores unidos)
+THEORETICAL_LAP = -1
+# Canales que usa remove_problematic_rows para marcar GpsGlitch y detectar discontinuidades
+GPS_CHECK_CHANNELS = ['Lat', 'Lon', 'SessionTime', 'Speed']
+# Fracción mínima de LapDistPct que debe cubrir una vuelta para considerarse completa
+COMPLETE_LAP_COVERAGE = 0.9
+
+class LoadCancelled(Exception):
+    """ Se lanza cuando el callback de progreso pide cancelar la carga. """
+
 class TelemetrySession:
-    def __init__(self, ibt_path: str = None):
+    def __init__(self, ibt_path: str = None, progress_callback=None):
         self.ibt_path = ibt_path
-        self.dataframe = pd.DataFrame() # DataFrame con todas las columnas
+        self.dataframe = pd.DataFrame() # DataFrame con las columnas decodificadas hasta ahora
+        self.laps_version = 0           # Se incrementa cada vez que se asigna laps_df (claves de caché)
         self.laps_df = pd.DataFrame()   # DataFrame con el resumen de vueltas
+        self.reader = None              # IbtReader abierto: registro de canales decodificables bajo demanda
+        self.lap_index = {}             # vuelta -> (fila_inicio, fila_fin, t0, t1), filas posicionales
+        self._laps_contiguous = True    # False si alguna vuelta aparece en varios tramos
+        self.rows_version = 0           # Se incrementa cada vez que cambian las filas del DataFrame
+        self.slip_engine = SlipDetectorEngine()
+        self.math_engine = MathChannelEngine()  # Canales calculados definidos por el usuario
+        self._math_columns = set()      # Columnas del DataFrame escritas por el motor de canales calculados
+        self._events_df = None          # Índice de eventos (se construye bajo demanda)
+        self.resampler = LapResampler(self)  # Remuestreo por distancia con caché por (vuelta, canal, rejilla)
+        self._delta_reference = None    # (clave, tiempo transcurrido de la vuelta de referencia por distancia)
+        self.segments = None            # (inicios, fines) posicionales de los tramos continuos
+        self.cleaning_report = None     # Una fila por tramo afectado: Type, StartRow, EndRow, Lap, PctStart, Rows
+        self.invalid_laps = set()       # Vueltas con huecos de tiempo o teletransportes
+        self._follow_buffers = None     # Modo seguimiento: columnas con capacidad extra para añadir filas
+        self.stats = ChannelStats(self)  # Estadísticos por canal (sesión y por vuelta), cacheados
+        self.sector_percents = [0.25, 0.5, 0.75]  # Configuración de sectores del último times_by_laps
+        self._theoretical = None        # (clave, filas posicionales, tiempos, vuelta de origen)
+        self._theoretical_frame = None  # (columnas, DataFrame de la vuelta teórica)
+        self._corners = None            # (clave, curvas, {métrica: vueltas x curvas})
+        self._centerline = None         # (clave, TrackCenterline o None)
 
         if not ibt_path is None:
-            self.load_telemetry(ibt_path)
+            self.load_telemetry(ibt_path, progress_callback=progress_callback)
             self.laps_df = self.times_by_laps()
 
-    def load_telemetry(self, ibt_path: str):
-        self.ibt_path = ibt_path
+    @property
+    def laps_df(self):
+        return self._laps_df
+
+    @laps_df.setter
+    def laps_df(self, laps_df):
+        # Las cachés que dependen de las vueltas usan laps_version: id() se reutiliza entre objetos
+        self._laps_df = laps_df
+        self.laps_version += 1
+
+    def load_telemetry(self, ibt_path: str, columns=None, progress_callback=None):
+        """
+        Abre el archivo y decodifica solo las columnas indicadas (por defecto DRIVING_COLUMNS).
+        El resto de canales queda registrado y se decodifica la primera vez que se pide con ensure_columns.
+        progress_callback(bytes_leidos, bytes_totales) se llama por bloques de registros; si devuelve
+        False la carga se aborta con LoadCancelled.
+        """
         self.dataframe = pd.DataFrame()
 
-        ibt = irsdk.IBT()
         try:
-            ibt.open(self.ibt_path)
-            telemetry_data = {}
-            for var_name in ibt.var_headers_names:
-                telemetry_data[var_name] = ibt.get_all(var_name)
-            self.dataframe = pd.DataFrame(telemetry_data)
-            print(f"INFO: ¡Lectura completa! Se encontraron {len(self.dataframe)} muestras (ticks) de telemetría.")
+            self.open_reader(ibt_path)
+            if columns is None:
+                columns = DRIVING_COLUMNS
+            names = [col for col in columns if col in self.reader.var_headers]
+            self.dataframe = pd.DataFrame(self._decode_channels(names, progress_callback))
+            self.build_lap_index()
+            print(f"INFO: ¡Lectura completa! Se encontraron {len(self.dataframe)} muestras (ticks) de telemetría "
+                  f"({len(names)} de {len(self.reader.var_headers)} canales decodificados).")
+        except LoadCancelled:
+            print("INFO: Carga cancelada por el usuario.")
+            self.close()
+            raise
         except Exception as e:
             print(f"ERROR: Ocurrió un error inesperado al procesar el archivo: {e}")
-        finally:
-            ibt.close()
+            self.close()
+
+    def _decode_channels(self, names, progress_callback=None):
+        """ Decodifica varios canales por bloques de registros, informando del progreso en bytes. """
+        total_rows = self.reader.record_count
+        if progress_callback is None:
+            return {name: self._decode_channel(name) for name in names}
+
+        fields = self.reader.records.dtype.fields
+        row_bytes = sum(fields[name][0].itemsize for name in names)
+        total_bytes = row_bytes * total_rows
+        columns = {name: np.empty((total_rows,) + fields[name][0].shape, dtype=fields[name][0].base)
+                   for name in names}
+        for start in range(0, total_rows, DECODE_CHUNK_ROWS):
+            stop = min(start + DECODE_CHUNK_ROWS, total_rows)
+            block = self.reader.records[start:stop]
+            for name in names:
+                columns[name][start:stop] = block[name]
+            if progress_callback(stop * row_bytes, total_bytes) is False:
+                raise LoadCancelled()
+        return {name: list(col) if col.ndim > 1 else col for name, col in columns.items()}
+
+    def open_reader(self, ibt_path: str):
+        """ Abre el registro de canales del archivo sin decodificar ninguna muestra. """
+        self.close()
+        self.ibt_path = ibt_path
+        self.reader = IbtReader(ibt_path)
+
+    def close(self):
+        """ Libera el mapeo del archivo .ibt. Los canales ya decodificados siguen disponibles. """
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
             print("INFO: Archivo .ibt cerrado.")
 
+    def _decode_channel(self, var_name, rows=None):
+        """ Copia un canal del memmap a memoria, opcionalmente solo para las filas indicadas. """
+        column = self.reader.channel(var_name)
+        column = np.array(column) if rows is None else column[rows]
+        # Las variables con varios valores por tick se guardan como una lista por fila
+        return list(column) if column.ndim > 1 else column
+
+    def build_lap_index(self):
+        """
+        Construye el índice vuelta -> (fila_inicio, fila_fin, t0, t1) en una sola pasada.
+        Debe reconstruirse cada vez que cambian las filas del DataFrame.
+        """
+        self.rows_version += 1
+        self._events_df = None
+        self.lap_index = {}
+        self._laps_contiguous = True
+        if self.dataframe.empty or 'Lap' not in self.dataframe.columns:
+            return
+        lap = self.dataframe['Lap'].to_numpy()
+        times = self.dataframe['SessionTime'].to_numpy() if 'SessionTime' in self.dataframe.columns else None
+        starts, ends = lap_boundaries(lap)
+        for lap_num, start, end in zip(lap[starts].tolist(), starts.tolist(), ends.tolist()):
+            if lap_num in self.lap_index:
+                # La vuelta reaparece más adelante: el rango abarca ambos tramos y hay que filtrar
+                self._laps_contiguous = False
+                start = self.lap_index[lap_num][0]
+            t0 = float(times[start]) if times is not None else None
+            t1 = float(times[end - 1]) if times is not None else None
+            self.lap_index[lap_num] = (start, end, t0, t1)
+
+    def lap_slice(self, lap_num):
+        """ Devuelve las filas de una vuelta como vista (iloc) sin recorrer todo el DataFrame. """
+        if lap_num == THEORETICAL_LAP:
+            return self.get_theoretical_best_lap_data()
+        if lap_num not in self.lap_index:
+            return self.dataframe.iloc[0:0]
+        start, end, _, _ = self.lap_index[lap_num]
+        lap_df = self.dataframe.iloc[start:end]
+        if not self._laps_contiguous:
+            lap_df = lap_df[lap_df['Lap'] == lap_num]
+        return lap_df
+
+    def laps_slice(self, lap_numbers):
+        """
+        Devuelve las filas de varias vueltas. Si forman un único rango contiguo se devuelve
+        una vista; si no, se concatenan las vistas de cada vuelta en orden de filas.
+        """
+        if THEORETICAL_LAP in lap_numbers:
+            real_laps = [n for n in lap_numbers if n != THEORETICAL_LAP]
+            theoretical_df = self.get_theoretical_best_lap_data()
+            return pd.concat([self.laps_slice(real_laps), theoretical_df]) if real_laps else theoretical_df
+        ranges = sorted(self.lap_index[n][:2] + (n,) for n in set(lap_numbers) if n in self.lap_index)
+        if not ranges:
+            return self.dataframe.iloc[0:0]
+        if self._laps_contiguous and all(prev[1] == cur[0] for prev, cur in zip(ranges, ranges[1:])):
+            return self.dataframe.iloc[ranges[0][0]:ranges[-1][1]]
+        return pd.concat([self.lap_slice(n) for _, _, n in ranges])
+
+    def _build_theoretical_lap(self, sector_percents):
+        """
+        Elige, para cada sector, la vuelta válida (todos los sectores > 0 y sin discontinuidades,
+        como en LapsTimeTable) con el mejor tiempo y toma sus filas entre los instantes de
+        entrada y salida del sector.
+        El tiempo de cada tramo se desplaza para que la vuelta teórica sea continua desde 0.
+        Devuelve (filas posicionales, tiempos, vuelta de origen de cada fila).
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64))
+        laps_df = self.laps_df
+        sector_cols = [f'S{i+1}' for i in range(len(sector_percents) + 1)]
+        if laps_df is None or laps_df.empty or not all(col in laps_df.columns for col in sector_cols) \
+                or 'SessionTime' not in self.dataframe.columns:
+            return empty
+        valid_laps = laps_df[laps_df[sector_cols].gt(0).all(axis=1) & ~laps_df['Lap'].isin(self.invalid_laps)]
+        if valid_laps.empty:
+            return empty
+
+        session_time = self.dataframe['SessionTime'].to_numpy()
+        lap_column = self.dataframe['Lap'].to_numpy()
+        positions, times, sources = [], [], []
+        offset = 0.0
+        for k, col in enumerate(sector_cols):
+            best = valid_laps.loc[valid_laps[col].idxmin()]
+            lap = int(best['Lap'])
+            if lap not in self.lap_index:
+                return empty
+            start, end, t0, _ = self.lap_index[lap]
+            rows = np.arange(start, end)
+            if not self._laps_contiguous:
+                rows = rows[lap_column[start:end] == lap]
+            # Instantes de entrada/salida del sector en la vuelta de origen (los mismos de times_by_laps)
+            sector_start = t0 + float(best[sector_cols[:k]].sum())
+            sector_end = sector_start + float(best[col])
+            lo, hi = np.searchsorted(session_time[rows], [sector_start, sector_end], side='left')
+            segment = rows[lo:hi] if k < len(sector_cols) - 1 else rows[lo:]  # El último llega al fin de vuelta
+            positions.append(segment)
+            times.append(session_time[segment] - sector_start + offset)
+            sources.append(np.full(len(segment), lap, dtype=np.int64))
+            offset += float(best[col])
+        return np.concatenate(positions), np.concatenate(times), np.concatenate(sources)
+
+    def get_theoretical_best_lap_data(self, sector_percents=None):
+        """
+        Vuelta virtual formada por los mejores sectores de las vueltas válidas, con SessionTime
+        continuo desde 0, Lap = THEORETICAL_LAP y la columna SourceLap con la vuelta de origen.
+        La selección de filas se calcula una vez por configuración de sectores y el DataFrame
+        solo se reconstruye si cambian las columnas decodificadas.
+        """
+        if sector_percents is None:
+            sector_percents = self.sector_percents
+        key = (self.rows_version, tuple(sector_percents), self.laps_version, tuple(sorted(self.invalid_laps)))
+        if self._theoretical is None or self._theoretical[0] != key:
+            self._theoretical = (key,) + self._build_theoretical_lap(list(sector_percents))
+            self._theoretical_frame = None
+            self.resampler.discard_lap(THEORETICAL_LAP)
+            self.stats.invalidate(lap=THEORETICAL_LAP)
+            if self._delta_reference is not None and self._delta_reference[0][1] == THEORETICAL_LAP:
+                self._delta_reference = None
+
+        columns = tuple(self.dataframe.columns)
+        if self._theoretical_frame is None or self._theoretical_frame[0] != columns:
+            _, positions, times, sources = self._theoretical
+            frame = self.dataframe.iloc[positions].copy()
+            if not frame.empty:
+                frame['SessionTime'] = times
+                frame['Lap'] = THEORETICAL_LAP
+            frame['SourceLap'] = sources
+            self._theoretical_frame = (columns, frame)
+        return self._theoretical_frame[1]
+
+    def lap_start_time(self, lap):
+        """ SessionTime del inicio de la vuelta (0 para la vuelta teórica, que empieza en 0). """
+        if lap == THEORETICAL_LAP:
+            return 0.0
+        return self.lap_index[lap][2] if lap in self.lap_index else np.nan
+
+    def resample_laps(self, laps, channels, resolution=None, grid=None):
+        """
+        Interpola los canales de las vueltas indicadas sobre una rejilla común de LapDist.
+        Devuelve (grid, {canal: matriz vueltas x grid}); ver LapResampler.
+        grid permite usar la rejilla de otra sesión para alinear vueltas de varios archivos.
+        """
+        return self.resampler.resample(list(laps), list(channels), resolution, grid)
+
+    def complete_laps(self, min_coverage=COMPLETE_LAP_COVERAGE):
+        """
+        Vueltas de laps_df válidas (fuera de invalid_laps) y completas: sus muestras cubren al
+        menos min_coverage de LapDistPct. Así se descartan la vuelta de salida empezada a mitad
+        de pista y el tramo final cortado al cerrar la sesión, que suelen ser las más "rápidas".
+        Sin LapDistPct se exige un tiempo cercano a la mediana de las vueltas válidas.
+        """
+        if self.laps_df is None or self.laps_df.empty:
+            return []
+        valid = self.laps_df[~self.laps_df['Lap'].isin(self.invalid_laps) & (self.laps_df['Lap'] != THEORETICAL_LAP)]
+        if valid.empty:
+            return []
+        if 'LapDistPct' not in self.dataframe.columns:
+            median = float(valid['Time'].median())
+            return [int(lap) for lap, time in zip(valid['Lap'], valid['Time']) if time >= min_coverage * median]
+
+        pct = self.dataframe['LapDistPct'].to_numpy()
+        lap_column = self.dataframe['Lap'].to_numpy()
+        complete = []
+        for lap in valid['Lap'].astype(int).tolist():
+            if lap not in self.lap_index:
+                continue
+            start, end, _, _ = self.lap_index[lap]
+            lap_pct = pct[start:end] if self._laps_contiguous else pct[start:end][lap_column[start:end] == lap]
+            lap_pct = lap_pct[np.isfinite(lap_pct)]
+            if len(lap_pct) and lap_pct.max() - lap_pct.min() >= min_coverage:
+                complete.append(lap)
+        return complete
+
+    def best_lap(self):
+        """ Número de la vuelta completa y válida más rápida según laps_df (None si no hay ninguna). """
+        complete = self.laps_df[self.laps_df['Lap'].isin(self.complete_laps())] if self.laps_df is not None else None
+        if complete is None or complete.empty:
+            return None
+        return int(complete.loc[complete['Time'].idxmin(), 'Lap'])
+
+    def elapsed_at_distance(self, laps, resolution=None, grid=None):
+        """ Tiempo transcurrido desde el inicio de cada vuelta en cada punto de la rejilla de distancia. """
+        grid, resampled = self.resample_laps(laps, ['SessionTime'], resolution, grid)
+        t0 = np.array([self.lap_start_time(lap) for lap in laps], dtype=np.float64)
+        return grid, resampled['SessionTime'] - t0[:, None]
+
+    def reference_elapsed(self, reference_lap=None, resolution=None):
+        """
+        Tiempo por distancia de la vuelta de referencia (la mejor por defecto) sobre la rejilla
+        de esta sesión. Se calcula una vez y se cachea. Devuelve (grid, array) o (grid, None).
+        """
+        if reference_lap is None:
+            reference_lap = self.best_lap()
+        grid = self.resampler.grid(resolution)
+        if reference_lap is None:
+            return grid, None
+        key = (self.rows_version, reference_lap, resolution or self.resampler.resolution)
+        if self._delta_reference is None or self._delta_reference[0] != key:
+            self._delta_reference = (key, self.elapsed_at_distance([reference_lap], resolution)[1][0])
+        return grid, self._delta_reference[1]
+
+    def delta_time(self, laps, reference_lap=None, resolution=None):
+        """
+        Diferencia de tiempo (s) de cada vuelta respecto a la vuelta de referencia (la mejor por
+        defecto) a lo largo de la rejilla de distancia: positivo = más lento que la referencia.
+        Devuelve (grid, matriz vueltas x grid).
+        """
+        grid, reference = self.reference_elapsed(reference_lap, resolution)
+        if reference is None:
+            return grid, np.full((len(laps), len(grid)), np.nan)
+        _, elapsed = self.elapsed_at_distance(list(laps), resolution)
+        return grid, elapsed - reference[None, :]
+
+    def corner_analysis(self, reference_lap=None, **params):
+        """
+        Curvas detectadas en la vuelta de referencia (por defecto best_lap, la mejor vuelta completa) y sus
+        métricas en todas las vueltas: (curvas, {métrica: DataFrame vueltas x curvas}); ver
+        CornerAnalysis. Las curvas se proyectan sobre las demás vueltas por distancia recorrida,
+        con las mismas matrices remuestreadas (y cacheadas) que la comparación de vueltas.
+        El resultado se cachea hasta que cambian las filas, las vueltas o los parámetros.
+        """
+        laps_df = self.laps_df
+        if laps_df is None or laps_df.empty or 'LapDist' not in self.dataframe.columns:
+            return pd.DataFrame(), {}
+        laps = [int(lap) for lap in laps_df['Lap']]
+        if reference_lap is None:
+            # La mejor vuelta completa: una vuelta cortada al cerrar la sesión no tiene curvas
+            reference_lap = self.best_lap()
+            if reference_lap is None:
+                return pd.DataFrame(), {}
+        key = (self.rows_version, self.laps_version, len(self.dataframe), reference_lap,
+               tuple(sorted(params.items())))
+        if self._corners is not None and self._corners[0] == key:
+            return self._corners[1], self._corners[2]
+
+        cornering = [channel for channel, _ in CORNERING_CHANNELS]
+        grid, reference = self.resample_laps([reference_lap], cornering + ['Speed'])
+        available = self.ensure_columns(cornering)
+        corners = detect_corners(grid, {c: reference[c][0] for c in available}, reference['Speed'][0], **params)
+
+        _, resampled = self.resample_laps(laps, ['Speed', 'Brake'])
+        _, elapsed = self.elapsed_at_distance(laps)
+        metrics = corner_metrics(grid, corners, laps, resampled['Speed'], resampled['Brake'], elapsed, **params)
+        if not corners.empty:
+            track_length = float(grid[-1]) or 1.0
+            for column in ('Entry', 'Apex', 'Exit'):
+                corners[f'{column}Pct'] = corners[f'{column}Dist'] / track_length
+        self._corners = (key, corners, metrics)
+        print(f"INFO: {len(corners)} curvas detectadas en la vuelta {reference_lap}; métricas de {len(laps)} vueltas.")
+        return corners, metrics
+
+    def centerline(self, **params):
+        """
+        Línea central de la pista (TrackCenterline) construida con las vueltas completas y válidas
+        de la sesión, sin las posiciones GPS no válidas. Se cachea hasta que cambian las filas,
+        las vueltas o los parámetros. Devuelve None si no hay datos de posición suficientes.
+        """
+        df = self.dataframe
+        if df.empty or not all(col in df.columns for col in ['LapDistPct', 'Lat', 'Lon']):
+            return None
+        key = (self.rows_version, self.laps_version, len(df), frozenset(self.invalid_laps),
+               tuple(sorted(params.items())))
+        if self._centerline is not None and self._centerline[0] == key:
+            return self._centerline[1]
+
+        clean = np.ones(len(df), dtype=bool)
+        if 'GpsGlitch' in df.columns:
+            clean &= df['GpsGlitch'].to_numpy() == 0
+        if 'Lap' in df.columns:
+            laps = self.complete_laps()
+            if laps:
+                clean &= np.isin(df['Lap'].to_numpy(), laps)
+        centerline = build_centerline(df['LapDistPct'].to_numpy(), df['Lat'].to_numpy(), df['Lon'].to_numpy(),
+                                      clean, **params)
+        self._centerline = (key, centerline)
+        if centerline is not None:
+            print(f"INFO: Línea central de {len(centerline)} vértices ({centerline.length:.0f} m) "
+                  f"a partir de {int(clean.sum())} muestras.")
+        return centerline
+
+    def available_channels(self):
+        """ Nombres de todos los canales: los ya decodificados y los que aún están en el archivo. """
+        names = self.dataframe.columns.tolist()
+        if self.reader is not None:
+            names += [name for name in self.reader.var_headers_names if name not in self.dataframe.columns]
+        return names
+
+    def numeric_channels(self):
+        """ Canales numéricos escalares (aptos para colorear o graficar), decodificados o no. """
+        names = self.dataframe.select_dtypes(include=[np.number]).columns.tolist()
+        if self.reader is not None:
+            for name, (var_type, _, count, _, _) in self.reader.var_headers.items():
+                if name not in self.dataframe.columns and count == 1 and var_type != 0:
+                    names.append(name)
+        # Los canales calculados aún no evaluados también se ofrecen (se calculan al elegirlos)
+        names += [name for name in self.math_engine.channels if name not in names]
+        return names
+
+    def ensure_columns(self, columns):
+        """
+        Decodifica (una sola vez) los canales pedidos que aún no están en el DataFrame.
+        Las filas se toman del índice actual, que conserva el número de registro original
+        aunque se hayan eliminado filas. Devuelve las columnas que existen tras la llamada.
+        """
+        missing = [col for col in columns
+                   if col not in self.dataframe.columns and self.reader is not None and col in self.reader.var_headers]
+        if missing and not self.dataframe.empty:
+            rows = self.dataframe.index.to_numpy()
+            for name in missing:
+                self.dataframe[name] = self._decode_channel(name, rows)
+            print(f"INFO: Canales decodificados bajo demanda: {', '.join(missing)}")
+        pending_math = [col for col in columns if col in self.math_engine.channels and col not in self.dataframe.columns]
+        if pending_math and not self.dataframe.empty:
+            self.run_math_channels(only=pending_math)
+        return [col for col in columns if col in self.dataframe.columns]
+
+    def get_channel(self, column):
+        """ Devuelve la Serie del canal, decodificándola si es la primera vez que se usa. """
+        if self.ensure_columns([column]):
+            return self.dataframe[column]
+        return None
+
     def resumen(self):
         if not self.dataframe.empty:
             print("\n--- RESUMEN DEL DATAFRAME CARGADO ---")
@@ -43,113 +572,394 @@ class TelemetrySession:
             print(f"INFO: Columnas encontradas: {self.dataframe.columns.tolist()}")
             print(self.dataframe[columnas_existentes].head(10).to_string())
 
-            # Imprimir mínimos y máximos de las columnas relevantes
+            # Imprimir mínimos y máximos de las columnas relevantes (desde los estadísticos cacheados)
             print("\n--- MÍNIMOS Y MÁXIMOS DE COLUMNAS RELEVANTES ---")
+            stats = self.stats.summary()
             for col in columnas_existentes:
-                min_val = self.dataframe[col].min()
-                max_val = self.dataframe[col].max()
-                mean_val = self.dataframe[col].mean()
-                print(f"{col}: min={min_val}, max={max_val}, mean={mean_val:.2f}")
+                row = stats.loc[col]
+                print(f"{col}: min={row['min']}, max={row['max']}, mean={row['mean']:.2f}, "
+                      f"std={row['std']:.2f}, NaN={int(row['nan'])}")
     
-    def remove_problematic_rows(self):
+    def remove_problematic_rows(self, **params):
+        """
+        Limpieza de la telemetría sin copiar el DataFrame: las filas no se eliminan sino que se
+        marcan. GpsGlitch (uint8) señala las posiciones no válidas, que no se dibujan en el mapa:
+        GPS en (0, 0) y picos aislados incompatibles con Speed. Los teletransportes y los huecos
+        de SessionTime parten la sesión en tramos continuos (self.segments) e invalidan la vuelta.
+        Los parámetros se describen en TelemetryCleaner.DEFAULT_CLEANING_PARAMS.
+        """
         if self.dataframe.empty:
-            return 
-        
-        # Imprimir las primeras 10 filas problemáticas: Lat o Lon < promedio o < 10000
-        if 'Lat' in self.dataframe.columns and 'Lon' in self.dataframe.columns:
-            mask = (
-                ((self.dataframe['Lat'] < 0.01) & (self.dataframe['Lat'] > -0.01) &
-                (self.dataframe['Lon'] < 0.01) & (self.dataframe['Lon'] > -0.01)) 
-            )
-            problematic = self.dataframe[mask]
-            print("\n--- PRIMERAS 10 FILAS PROBLEMÁTICAS (Lat o Lon < promedio o < 10000) ---")
-            print(problematic.head(10).to_string(index=False))
-
-            self.dataframe = self.dataframe[~mask]
-            print(f"INFO: Se eliminaron {len(problematic)} filas problemáticas.")
+            return
+
+        df = self.dataframe
+        if not all(col in df.columns for col in ['Lat', 'Lon', 'SessionTime']):
+            print("INFO: Las columnas 'Lat', 'Lon' o 'SessionTime' no están presentes para la limpieza de la telemetría.")
+            return
+
+        speed = df['Speed'].to_numpy() if 'Speed' in df.columns else np.zeros(len(df))
+        masks = detect_discontinuities(df['Lat'].to_numpy(), df['Lon'].to_numpy(), speed,
+                                       df['SessionTime'].to_numpy(), **params)
+        glitch = masks['gps_zero'] | masks['gps_spike']
+        self.dataframe['GpsGlitch'] = glitch.view(np.uint8)
+        self.stats.invalidate(['GpsGlitch'])
+        self.segments = continuous_segments(masks['teleport'] | masks['time_gap'])
+        self.cleaning_report = self._discontinuity_report(masks)
+        breaks = self.cleaning_report[self.cleaning_report['Type'].isin(['teleport', 'time_gap'])]
+        self.invalid_laps = set(breaks['Lap'].astype(int).tolist())
+
+        print("\n--- LIMPIEZA DE LA TELEMETRÍA ---")
+        for name, mask in masks.items():
+            events = self.cleaning_report[self.cleaning_report['Type'] == name]
+            where = ", ".join(f"vuelta {int(e.Lap)} al {e.PctStart * 100:.1f}%" for e in events.head(5).itertuples())
+            more = f" (+{len(events) - 5} más)" if len(events) > 5 else ""
+            print(f"{name}: {int(mask.sum())} filas en {len(events)} tramos" + (f" -> {where}{more}" if where else ""))
+        print(f"INFO: {int(glitch.sum())} filas marcadas como GPS no válido; {len(self.segments[0])} tramos continuos. "
+              f"Vueltas invalidadas: {sorted(self.invalid_laps) or 'ninguna'}")
+
+    def _discontinuity_report(self, masks, offset=0):
+        """ Tramos de cada máscara de limpieza (filas posicionales a partir de `offset`). """
+        df = self.dataframe
+        lap = df['Lap'].to_numpy() if 'Lap' in df.columns else np.zeros(len(df), dtype=int)
+        pct = df['LapDistPct'].to_numpy() if 'LapDistPct' in df.columns else np.zeros(len(df))
+        parts = []
+        for name, mask in masks.items():
+            starts, ends = run_lengths(mask)
+            starts, ends = starts + offset, ends + offset
+            parts.append(pd.DataFrame({'Type': name, 'StartRow': starts, 'EndRow': ends,
+                                       'Lap': lap[starts], 'PctStart': pct[starts], 'Rows': ends - starts}))
+        return pd.concat(parts, ignore_index=True).sort_values('StartRow', ignore_index=True)
+
+    def follow_update(self):
+        """
+        Modo seguimiento de un .ibt que iRacing todavía está escribiendo: decodifica solo los
+        registros añadidos desde la última lectura y amplía columnas, índice de vueltas y laps_df
+        sin reconstruir lo anterior. Las filas existentes no cambian, así que rows_version se
+        mantiene y solo se descartan las cachés de las vueltas afectadas.
+        Devuelve la primera fila posicional nueva, o None si el archivo no ha crecido.
+        """
+        if self.reader is None or self.dataframe.empty:
+            return None
+        start = len(self.dataframe)
+        first_record = int(self.dataframe.index[-1]) + 1
+        self.reader.refresh()
+        if self.reader.record_count <= first_record:
+            return None
+
+        records = np.arange(first_record, self.reader.record_count)
+        tail, masks = self._decode_tail(records)
+        self._append_rows(tail, records)
+
+        affected = self._extend_lap_index(start)
+        if 'SessionTime' in self.dataframe.columns and 'LapDistPct' in self.dataframe.columns:
+            first = min(self.lap_index[lap][0] for lap in affected)
+            df = self.dataframe.iloc[first:]
+            new_times = compute_lap_times(df['Lap'].to_numpy(), df['SessionTime'].to_numpy(),
+                                          df['LapDistPct'].to_numpy(), self.sector_percents)
+            new_times = new_times[new_times['Lap'].isin(affected)]
+            kept = self.laps_df[~self.laps_df['Lap'].isin(affected)] if not self.laps_df.empty else self.laps_df
+            self.laps_df = pd.concat([kept, new_times], ignore_index=True)
+
+        if masks is not None:
+            report = self._discontinuity_report(masks, offset=start)
+            self.cleaning_report = report if self.cleaning_report is None else \
+                pd.concat([self.cleaning_report, report], ignore_index=True)
+            breaks = report[report['Type'].isin(['teleport', 'time_gap'])]
+            self.invalid_laps |= set(breaks['Lap'].astype(int).tolist())
+            if self.segments is not None:
+                tail_starts, _ = continuous_segments(masks['teleport'] | masks['time_gap'])
+                starts = np.concatenate((self.segments[0], tail_starts[1:] + start))
+                self.segments = (starts, np.append(starts[1:], len(self.dataframe)))
+
+        # Cachés: solo lo que depende de la cola o de las vueltas que han crecido
+        self._events_df = None
+        self.stats.invalidate()
+        self.resampler.reset_grid()
+        for lap in affected:
+            self.resampler.discard_lap(lap)
+        if self._delta_reference is not None and self._delta_reference[0][1] in affected:
+            self._delta_reference = None
+        # Los canales calculados ya presentes se recalculan sobre la sesión ampliada (ventanas móviles, derivadas)
+        math_columns = [name for name in self.math_engine.channels if name in self.dataframe.columns]
+        if math_columns:
+            self.run_math_channels(only=math_columns)
+        print(f"INFO: Seguimiento: {len(records)} registros nuevos (vueltas {affected}).")
+        return start
+
+    def load_from_ring_buffer(self, store):
+        """
+        Usa la ventana actual de un TelemetryRingBuffer como DataFrame (columnas como vistas sin
+        copia) y recalcula índice de vueltas y laps_df, que solo dependen del tamaño de la ventana.
+        """
+        math_columns = [name for name in self.math_engine.channels if name in self.dataframe.columns]
+        self.dataframe = store.frame()
+        self.build_lap_index()
+        self.laps_df = self.times_by_laps(self.sector_percents) if not self.dataframe.empty else pd.DataFrame()
+        if math_columns:
+            self.run_math_channels(only=math_columns)
+
+    def _decode_tail(self, records):
+        """
+        Columnas de los registros nuevos: los canales del .ibt se leen del memmap y las columnas
+        derivadas (detectores, GpsGlitch) se calculan solo sobre la cola. Devuelve (columnas,
+        máscaras de limpieza de la cola o None).
+        """
+        names = [name for name in self.dataframe.columns if name in self.reader.var_headers]
+        # Las entradas de los detectores y de la limpieza se leen aunque filter_driving_columns las
+        # haya quitado del DataFrame: la cola debe marcarse igual que en una carga completa
+        inputs = [name for name in self.slip_engine.required_channels() + GPS_CHECK_CHANNELS
+                  if name in self.reader.var_headers and name not in names]
+        raw = {name: self._decode_channel(name, records) for name in names + inputs}
+        tail = {name: raw[name] for name in names}
+
+        engine = SlipDetectorEngine(**self.slip_engine.params)
+        for name in engine.run(pd.DataFrame(raw, index=records)):
+            if name in self.dataframe.columns:
+                tail[name] = engine.output_column(name)
+
+        masks = None
+        if 'GpsGlitch' in self.dataframe.columns and all(c in raw for c in ['Lat', 'Lon', 'SessionTime']):
+            # Se incluyen dos registros anteriores para evaluar los saltos con la muestra previa
+            context = min(2, len(self.dataframe))
+            previous = self.dataframe.index.to_numpy()[len(self.dataframe) - context:]
+            joined = {c: np.concatenate((self._decode_channel(c, previous), raw[c]))
+                      for c in GPS_CHECK_CHANNELS if c in raw}
+            speed = joined['Speed'] if 'Speed' in joined else np.zeros(context + len(records))
+            masks = detect_discontinuities(joined['Lat'], joined['Lon'], speed, joined['SessionTime'])
+            masks = {name: mask[context:] for name, mask in masks.items()}
+            tail['GpsGlitch'] = (masks['gps_zero'] | masks['gps_spike']).view(np.uint8)
+        return tail, masks
+
+    def _append_rows(self, tail, records):
+        """
+        Añade filas al DataFrame sobre buffers con capacidad sobrante (crecen al doble cuando se
+        llenan), de modo que cada actualización copia solo la cola y no el DataFrame completo.
+        Las columnas que no llegan en `tail` se rellenan con NaN (o 0 si no son de coma flotante).
+        """
+        n, k = len(self.dataframe), len(records)
+        buffers = self._follow_buffers
+        if buffers is None or len(buffers['__index__']) < n + k:
+            capacity = max(2 * (n + k), 1024)
         else:
-            print("INFO: Las columnas 'Lat' o 'Lon' no están presentes para la eliminación de filas problemáticas.")
+            capacity = len(buffers['__index__'])
+        new_buffers = {}
+        for name in ['__index__'] + list(self.dataframe.columns):
+            current = self.dataframe.index.to_numpy() if name == '__index__' else self.dataframe[name].to_numpy()
+            buffer = buffers.get(name) if buffers is not None else None
+            # El buffer sirve si tiene sitio y la columna actual sigue siendo una vista suya
+            if buffer is None or len(buffer) < capacity or not np.may_share_memory(current, buffer[:n]):
+                buffer = np.empty(capacity, dtype=current.dtype)
+                buffer[:n] = current
+            values = records if name == '__index__' else tail.get(name)
+            if values is None:
+                buffer[n:n + k] = np.nan if buffer.dtype.kind == 'f' else 0
+            elif buffer.dtype == object:
+                for i, value in enumerate(values):
+                    buffer[n + i] = value
+            else:
+                buffer[n:n + k] = values
+            new_buffers[name] = buffer
+        self._follow_buffers = new_buffers
+        self.dataframe = pd.DataFrame({name: new_buffers[name][:n + k] for name in self.dataframe.columns},
+                                      index=pd.Index(new_buffers['__index__'][:n + k]), copy=False)
 
+    def _extend_lap_index(self, start):
+        """ Amplía el índice de vueltas con las filas desde `start`. Devuelve las vueltas afectadas. """
+        lap = self.dataframe['Lap'].to_numpy()
+        times = self.dataframe['SessionTime'].to_numpy() if 'SessionTime' in self.dataframe.columns else None
+        starts, ends = lap_boundaries(lap[start:])
+        affected = []
+        for lap_num, first, end in zip(lap[start:][starts].tolist(), (starts + start).tolist(), (ends + start).tolist()):
+            if lap_num in self.lap_index:
+                first_row, last_end, t0, _ = self.lap_index[lap_num]
+                if last_end != first:
+                    self._laps_contiguous = False
+                first = first_row
+            else:
+                t0 = float(times[first]) if times is not None else None
+            t1 = float(times[end - 1]) if times is not None else None
+            self.lap_index[lap_num] = (first, end, t0, t1)
+            affected.append(lap_num)
+        return affected
 
-    def analyze_lockup(self, lockup_threshold=1.0):
+    def run_slip_detectors(self, only=None, **params):
         """
-        Analiza el DataFrame para crear nuevas columnas para bloqueo y patinaje.
+        Ejecuta el motor de detectores (bloqueo por rueda, patinaje, ABS) en una pasada y
+        escribe sus columnas uint8 en el DataFrame. Los umbrales se pasan como parámetros
+        (ver SlipDetectors.DEFAULT_PARAMS); solo se recalculan las salidas afectadas.
         """
         if self.dataframe.empty:
-            return
+            return []
 
-        print("INFO: Analizando bloqueo de frenos...")
-        df = self.dataframe
-        # --- Análisis de Bloqueo de Ruedas ---
-        # Definimos una velocidad mínima para considerar un bloqueo
-        speed_threshold_mps = 5.0 # m/s (equivalente a 18 km/h)
-        # Creamos una columna booleana para cada rueda
-        # Una rueda está bloqueada si su velocidad es casi cero mientras el coche se mueve y se está frenando.
-        if all(k in df for k in ['Brake', 'Speed', 'LFspeed']):
-            df['LF_Lockup'] = ((df['Brake'] > 0.1) & (df['Speed'] > speed_threshold_mps) & (df['LFspeed'] < lockup_threshold)).astype('uint8')
-        if all(k in df for k in ['Brake', 'Speed', 'RFspeed']):
-            df['RF_Lockup'] = ((df['Brake'] > 0.1) & (df['Speed'] > speed_threshold_mps) & (df['RFspeed'] < lockup_threshold)).astype('uint8')
-        if all(k in df for k in ['Brake', 'Speed', 'LRspeed']):
-            df['LR_Lockup'] = ((df['Brake'] > 0.1) & (df['Speed'] > speed_threshold_mps) & (df['LRspeed'] < lockup_threshold)).astype('uint8')
-        if all(k in df for k in ['Brake', 'Speed', 'RRspeed']):
-            df['RR_Lockup'] = ((df['Brake'] > 0.1) & (df['Speed'] > speed_threshold_mps) & (df['RRspeed'] < lockup_threshold)).astype('uint8')
-
-        self.dataframe = df
-        print("INFO: Análisis bloqueo completado. Nuevas columnas añadidas.")
-
-    def analyze_spin(self, spin_threshold_pct=15.0):
-        if self.dataframe.empty:
-            return
+        self.ensure_columns(self.slip_engine.required_channels())
+        recomputed = self.slip_engine.run(self.dataframe, data_key=self.rows_version, only=only, **params)
+        for name in recomputed:
+            self.dataframe[name] = self.slip_engine.output_column(name)
+        if recomputed:
+            self._events_df = None
+            self.stats.invalidate(recomputed)
+            # Los canales calculados que usan estas salidas se recalculan la próxima vez que se pidan
+            self._discard_math_columns(self.math_engine.invalidate(recomputed))
+            self._discard_centerline_profiles(recomputed)
+            print(f"INFO: Detectores recalculados: {', '.join(recomputed)}")
+        return recomputed
+
+    def define_math_channels(self, definitions):
+        """
+        Sustituye las definiciones de canales calculados por la lista [(nombre, expresión)].
+        Los canales que desaparecen o cambian se quitan del DataFrame junto con los que dependen
+        de ellos; se vuelven a calcular la próxima vez que se pidan (ensure_columns).
+        Lanza MathChannelError si alguna definición no es válida.
+        """
+        definitions = list(definitions)
+        # Se validan todas antes de tocar el motor, para no dejarlo a medio actualizar
+        check_channel_names([name for name, _ in definitions], self.telemetry_channels())
+        trial = MathChannelEngine()
+        for name, expression in definitions:
+            trial.define(name, expression)
+        dropped = set()
+        wanted = {name for name, _ in definitions}
+        for name in [n for n in self.math_engine.channels if n not in wanted]:
+            dropped |= self.math_engine.remove(name)
+            dropped.add(name)
+        for name, expression in definitions:
+            dropped |= self.math_engine.define(name, expression)
+        self._discard_math_columns(dropped)
+        return dropped
+
+    def telemetry_channels(self):
+        """ Canales del .ibt y columnas del DataFrame que no ha creado el motor de canales calculados. """
+        names = {name for name in self.dataframe.columns if name not in self._math_columns}
+        if self.reader is not None:
+            names |= set(self.reader.var_headers)
+        return names
+
+    def _discard_math_columns(self, names):
+        # Solo se quitan columnas creadas por el motor, nunca canales de telemetría
+        columns = [name for name in names if name in self._math_columns and name in self.dataframe.columns]
+        self._math_columns.difference_update(names)
+        if columns:
+            self.dataframe.drop(columns=columns, inplace=True)
+            self.stats.invalidate(columns)
+            self.resampler.discard_channels(columns)
+            self._discard_centerline_profiles(columns)
+
+    def _discard_centerline_profiles(self, columns):
+        # Los mapas de calor de la línea central se recalculan si cambian los valores de la columna
+        if self._centerline is not None and self._centerline[1] is not None:
+            self._centerline[1].discard_profiles(columns)
+
+    def run_math_channels(self, only=None):
+        """
+        Calcula los canales calculados pedidos (todos si only es None) y los que necesitan,
+        decodificando antes las columnas de telemetría que usan. Solo se evalúan los que no
+        estén ya en caché. Devuelve la lista de canales recalculados.
+        """
+        if self.dataframe.empty or not self.math_engine.channels:
+            return []
+        self.ensure_columns(self.math_engine.required_channels(only))
+        data_key = (self.rows_version, len(self.dataframe), self.dataframe.index[0])
+        recomputed = self.math_engine.run(self.dataframe, data_key=data_key, only=only)
+        for name in recomputed:
+            self.dataframe[name] = self.math_engine.outputs[name]
+        self._math_columns.update(recomputed)
+        if recomputed:
+            self.stats.invalidate(recomputed)
+            self.resampler.discard_channels(recomputed)
+            self._theoretical_frame = None
+            self._discard_centerline_profiles(recomputed)
+            print(f"INFO: Canales calculados: {', '.join(recomputed)}")
+        return recomputed
+
+    def event_index(self):
+        """
+        Índice de eventos codificado por tramos (run-length) de las columnas EVENT_COLUMNS:
+        una fila por tramo contiguo con Type, StartRow, EndRow (posicionales, fin exclusivo),
+        Lap, PctStart, PctEnd, Duration y PeakSeverity. Se construye una vez y se invalida
+        cuando cambian las filas o se recalculan los detectores.
+        """
+        if self._events_df is not None:
+            return self._events_df
 
-        print("INFO: Patinaje de Ruedas (asumiendo Tracción Trasera)...")
+        columns = ['Type', 'StartRow', 'EndRow', 'Lap', 'PctStart', 'PctEnd', 'Duration', 'PeakSeverity']
         df = self.dataframe
+        event_types = [col for col in EVENT_COLUMNS if col in df.columns]
+        if df.empty or not event_types:
+            self._events_df = pd.DataFrame(columns=columns)
+            return self._events_df
+
+        lap = df['Lap'].to_numpy() if 'Lap' in df.columns else np.zeros(len(df), dtype=int)
+        pct = df['LapDistPct'].to_numpy() if 'LapDistPct' in df.columns else np.zeros(len(df))
+        times = df['SessionTime'].to_numpy() if 'SessionTime' in df.columns else np.arange(len(df), dtype=float)
+        tick = 1.0 / self.reader.tick_rate if self.reader is not None and self.reader.tick_rate else 0.0
+
+        parts = []
+        for name in event_types:
+            starts, ends = run_lengths(df[name].to_numpy())
+            if len(starts) == 0:
+                continue
+            detector = self.slip_engine.detector_for(name)
+            if detector is not None:
+                self.ensure_columns(detector.inputs)
+            severity = self.slip_engine.severity(name, self.dataframe)
+            if severity is None:
+                peak = np.full(len(starts), np.nan)
+            else:
+                # reduceat sobre [inicio0, fin0, inicio1, fin1, ...]: los tramos pares son los eventos.
+                # Se añade un centinela para que un evento que acaba en la última fila sea válido.
+                bounds = np.column_stack((starts, ends)).ravel()
+                peak = np.maximum.reduceat(np.append(severity, -np.inf), bounds)[::2]
+            parts.append(pd.DataFrame({
+                'Type': name,
+                'StartRow': starts,
+                'EndRow': ends,
+                'Lap': lap[starts],
+                'PctStart': pct[starts],
+                'PctEnd': pct[ends - 1],
+                'Duration': times[ends - 1] - times[starts] + tick,
+                'PeakSeverity': peak,
+            }))
 
-        # --- Análisis de Patinaje de Ruedas (asumiendo Tracción Trasera) ---
-        if all(k in df for k in ['Throttle', 'LRspeed', 'RRspeed', 'LFspeed', 'RFspeed']):
-            # Calculamos la velocidad media de cada eje
-            driven_wheel_speed = (df['LRspeed'] + df['RRspeed']) / 2
-            free_wheel_speed = (df['LFspeed'] + df['RFspeed']) / 2
-            # Hay patinaje si la velocidad de las ruedas motrices supera a las libres en un %
-            # y estamos acelerando. Sumamos un valor pequeño para evitar división por cero.
-            speed_diff_pct = ((driven_wheel_speed - free_wheel_speed) / (free_wheel_speed + 0.01)) * 100
-            df['WheelSpin'] = ((df['Throttle'] > 0.1) & (speed_diff_pct > spin_threshold_pct)).astype('uint8')
-        
-        self.dataframe = df
-        print("INFO: Análisis completado. Nuevas columnas añadidas.")
-
-    def save_to_csv(self, ruta_csv: str):
+        if parts:
+            self._events_df = pd.concat(parts, ignore_index=True).sort_values('StartRow', ignore_index=True)
+        else:
+            self._events_df = pd.DataFrame(columns=columns)
+        return self._events_df
+
+    def events_in(self, laps=None, pct_range=None, types=None):
+        """ Consulta el índice de eventos por vueltas, rango de LapDistPct y tipo. """
+        events = self.event_index()
+        mask = np.ones(len(events), dtype=bool)
+        if laps is not None:
+            mask &= events['Lap'].isin(laps).to_numpy()
+        if pct_range is not None:
+            low, high = pct_range
+            mask &= ((events['PctEnd'] >= low) & (events['PctStart'] <= high)).to_numpy()
+        if types is not None:
+            mask &= events['Type'].isin(types).to_numpy()
+        return events[mask]
+
+    def analyze_lockup(self, lockup_threshold=1.0):
+        """
+        Analiza el DataFrame para crear las columnas de bloqueo de cada rueda.
+        """
+        return self.run_slip_detectors(only=[f'{wheel}_Lockup' for wheel in WHEELS],
+                                       lockup_threshold=lockup_threshold)
+
+    def analyze_spin(self, spin_threshold_pct=15.0, drivetrain='RWD'):
+        """
+        Analiza el patinaje de las ruedas motrices (tracción trasera por defecto) y la actividad del ABS.
+        """
+        return self.run_slip_detectors(only=['WheelSpin', 'ABS_Active'],
+                                       spin_threshold_pct=spin_threshold_pct, drivetrain=drivetrain)
+
+    def save_to_csv(self, ruta_csv: str, progress_callback=None):
         """
         Guarda el DataFrame de telemetría en un archivo CSV con formato personalizado.
+        El formateo por columna y la escritura por bloques están en TelemetryExport.export_csv.
         :param ruta_csv: Ruta donde se guardará el archivo CSV.
         """
         if not self.dataframe.empty:
-            df = self.dataframe.copy()
-            # Formateo de columnas según lo solicitado
-            if 'SessionTime' in df.columns:
-                df['SessionTime'] = df['SessionTime'].map(lambda x: f"{x:.3f}")
-            if 'RPM' in df.columns:
-                df['RPM'] = df['RPM'].map(lambda x: f"{int(round(x))}")
-            if 'Speed' in df.columns:
-                df['Speed'] = df['Speed'].map(lambda x: f"{x:.2f}")
-            if 'Brake' in df.columns:
-                df['Brake'] = df['Brake'].map(lambda x: f"{x:.4f}")
-            if 'Throttle' in df.columns:
-                df['Throttle'] = df['Throttle'].map(lambda x: f"{x:.4f}")
-            if 'SteeringWheelAngle' in df.columns:
-                df['SteeringWheelAngle'] = df['SteeringWheelAngle'].map(lambda x: f"{x:.4f}")
-            if 'Yaw' in df.columns:
-                df['Yaw'] = df['Yaw'].map(lambda x: f"{x:.5f}")
-            if 'Pitch' in df.columns:
-                df['Pitch'] = df['Pitch'].map(lambda x: f"{x:.5f}")
-            if 'Roll' in df.columns:
-                df['Roll'] = df['Roll'].map(lambda x: f"{x:.5f}")
-            if 'Lat' in df.columns:
-                df['Lat'] = df['Lat'].map(lambda x: f"{x:.7f}")
-            if 'Lon' in df.columns:
-                df['Lon'] = df['Lon'].map(lambda x: f"{x:.7f}")
-            if 'Alt' in df.columns:
-                df['Alt'] = df['Alt'].map(lambda x: f"{x:.7f}")
-            df.to_csv(ruta_csv, index=False)
+            export_csv(self.dataframe, ruta_csv, progress_callback=progress_callback)
             print(f"INFO: DataFrame guardado exitosamente en '{ruta_csv}' con formato personalizado.")
         else:
             print("ADVERTENCIA: El DataFrame está vacío. No se guardó ningún archivo.")
@@ -160,23 +970,11 @@ class TelemetrySession:
         if analyze_spin:
             self.analyze_spin()
 
-        required_columns = [
-            'SessionTime', 'Lap', 'Speed', 'RPM', 'Throttle', 'Brake', 'Gear',
-            'Lat', 'Lon', 'Alt',      # Position
-            'SteeringWheelAngle',     # Steering wheel angle
-            'Yaw', 'Pitch', 'Roll',   # Car rotation
-            'YawRate',  # Slippage indicators (if available)
-            'LapDistPct', 'LapDist',
-            # Columnas de Temperatura
-            'LFtempL', 'LFtempM', 'LFtempR', 'RFtempL', 'RFtempM', 'RFtempR',
-            'LRtempL', 'LRtempM', 'LRtempR', 'RRtempL', 'RRtempM', 'RRtempR',
-            # Columnas creadas en analyze_driving_inputs
-            'LF_Lockup', 'RF_Lockup', 'LR_Lockup', 'RR_Lockup', 'WheelSpin',
-            'LatAccel', 'LongAccel', 'VertAccel'
-        ]
-        existing_columns = [col for col in required_columns if col in self.dataframe.columns]
+        required_columns = DRIVING_COLUMNS
         missing_columns = [col for col in required_columns if col not in self.dataframe.columns]
-        self.dataframe = self.dataframe[existing_columns]
+        # Los canales descartados siguen disponibles bajo demanda a través de ensure_columns
+        extra_columns = [col for col in self.dataframe.columns if col not in required_columns]
+        self.dataframe = self.dataframe.drop(columns=extra_columns)
         print(f"INFO: DataFrame filtered. Current columns: {self.dataframe.columns.tolist()}")
         if missing_columns:
             print(f"WARNING: The following required columns were not found in the DataFrame: {', '.join(missing_columns)}")
@@ -196,39 +994,12 @@ class TelemetrySession:
             print("Faltan columnas necesarias: Lap, SessionTime o LapDistPct.")
             return pd.DataFrame()
 
-        laps = []
-        for lap_num in sorted(df['Lap'].unique()):
-            lap_df = df[df['Lap'] == lap_num]
-            if lap_df.empty:
-                continue
-
-            # Tiempos de inicio y fin de la vuelta
-            t0 = lap_df['SessionTime'].iloc[0]
-            t1 = lap_df['SessionTime'].iloc[-1]
-            lap_time = t1 - t0
-
-            # Calcular tiempos de sectores
-            sector_times = []
-            prev_pct = 0.0
-            prev_time = t0
-            for i, pct in enumerate(sector_percents):
-                # Buscar el primer índice donde LapDistPct >= pct
-                sector_df = lap_df[lap_df['LapDistPct'] >= pct]
-                if not sector_df.empty:
-                    sector_time = sector_df['SessionTime'].iloc[0]
-                else:
-                    sector_time = t1  # Si no hay, usar fin de vuelta
-                sector_times.append(sector_time - prev_time)
-                prev_time = sector_time
-                prev_pct = pct
-            # Último sector: desde el último porcentaje hasta el final de la vuelta
-            sector_times.append(t1 - prev_time)
-
-            # Construir fila
-            row = {'Lap': lap_num, 'Time': lap_time}
-            for i, st in enumerate(sector_times):
-                row[f'S{i+1}'] = st
-            laps.append(row)
-
-        laps_df = pd.DataFrame(laps)
-        return laps_df
\ No newline at end of file
+        if not self.lap_index:
+            self.build_lap_index()
+        self.sector_percents = list(sector_percents)
+        bounds = None
+        if self._laps_contiguous:
+            ranges = sorted(entry[:2] for entry in self.lap_index.values())
+            bounds = (np.array([r[0] for r in ranges]), np.array([r[1] for r in ranges]))
+        return compute_lap_times(df['Lap'].to_numpy(), df['SessionTime'].to_numpy(),
+                                 df['LapDistPct'].to_numpy(), sector_percents, bounds=bounds)
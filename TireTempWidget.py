@@ -14,6 +14,7 @@ import numpy as np
 import pandas as pd
 
 from RangeSlider import QRangeSlider
+from ChannelStats import compute_stats
 from utils import resource_path
 
 class _CarCanvas(QWidget):
@@ -98,13 +99,16 @@ class TireTempWidget(QWidget):
         layout.addWidget(self.temp_slider)
         layout.addWidget(self.car_canvas, 1) # El '1' le da más espacio para estirarse
 
-    def set_temp_range_from_dataframe(self, df):
+    def set_temp_range_from_dataframe(self, df, stats=None):
+        """ stats: estadísticos por canal ya calculados (ChannelStats); si faltan se calculan aquí. """
         temp_cols = [col for col in df.columns if 'temp' in col.lower() and col.endswith(('L', 'M', 'R'))]
         if not temp_cols:
             min_temp, max_temp = 70.0, 120.0
         else:
-            min_temp = df[temp_cols].min().min()
-            max_temp = df[temp_cols].max().max()
+            if stats is None:
+                stats = compute_stats(df, temp_cols)
+            min_temp = stats.loc[temp_cols, 'min'].min()
+            max_temp = stats.loc[temp_cols, 'max'].max()
         
         if pd.isna(min_temp) or pd.isna(max_temp) or min_temp == max_temp:
             min_temp, max_temp = 70.0, 120.0
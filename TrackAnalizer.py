@@ -7,22 +7,37 @@ Created on 2025-06-29
 '''
 
 import os
+import json
 import numpy as np
+import pandas as pd
 from PySide6.QtWidgets import (QApplication, QMainWindow, QFileDialog, QToolBar, QComboBox, QLabel,
-                               QProgressDialog, QStatusBar, QStyle, QDockWidget, QWidget, QVBoxLayout)
-from PySide6.QtGui import QAction, QIcon, QColor
-from PySide6.QtCore import Qt, QSettings
+                               QProgressDialog, QStatusBar, QStyle, QDockWidget, QWidget, QVBoxLayout, QToolTip)
+from PySide6.QtGui import QAction, QIcon, QColor, QCursor
+from PySide6.QtCore import Qt, QSettings, QTimer
 from matplotlib import cm
 import requests
 from PySide6.QtGui import QImage, QPixmap, QPainter
 import math
 
-from TelemetrySession import TelemetrySession
+from TelemetrySession import TelemetrySession, THEORETICAL_LAP, DRIVING_COLUMNS, REFERENCE_COLUMNS, region_passes
+from TelemetryRingBuffer import TelemetryRingBuffer
+from IbtReplay import IbtReplay
+from SessionCache import SessionCache
+from BackgroundTask import BackgroundTask
+from SessionCatalog import SessionCatalog
+from IbtMetadata import read_metadata, metadata_summary
+from MathChannels import DEFAULT_MATH_CHANNELS, MathChannelError
+from MathChannelsDialog import MathChannelsDialog
+from CornerTableWidget import CornerTableWidget
+from SessionCatalogDialog import SessionCatalogDialog
+from TelemetryExport import export_dataframe, available_export_filters, EXPORT_FORMATS
 from RangeSlider import QRangeSlider
 from TrackViewer import TrackWidget
+from TrackSpatialIndex import TrackSpatialIndex
 from LapsTimeTable import LapsTimeTable
 from PlaybackControlWidget import PlaybackControlWidget
-from LapComparisonWidget import LapComparisonWidget
+from LapComparisonWidget import LapComparisonWidget, DELTA_VARIABLE
+from EventListWidget import EventListWidget, EVENT_STYLES
 from utils import resource_path
 
 class MainWindow(QMainWindow):
@@ -31,6 +46,13 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Simracing Telemetry Analizer")
         self.setGeometry(100, 100, 1200, 900)
         self.session = None  # Inicializamos la sesión de telemetría
+        self.dataframe = None  # La interfaz sigue activa mientras se carga el primer archivo
+        self._load_task = None       # Carga en segundo plano en curso
+        self._load_progress = None   # Diálogo de progreso de la carga
+        self._export_task = None     # Exportación en segundo plano en curso
+        self._export_progress = None
+        self.reference_sessions = []  # [(nombre, TelemetrySession)] de otros archivos para comparar
+        self._reference_task = None
         self.ZOOM = 18  # Zoom por defecto para las teselas del mapa
 
         self.selected_laps = None # Para filtrar por una vuelta específica
@@ -64,6 +86,10 @@ class MainWindow(QMainWindow):
         self.recent_file_actions = []
         self.max_recent_files = 5
 
+        # Caché en disco de sesiones ya analizadas (tamaño máximo configurable en MB)
+        cache_max_mb = self.settings.value("sessionCacheMaxMB", 2048, type=int)
+        self.session_cache = SessionCache(max_bytes=cache_max_mb * 1024 * 1024)
+
         # Creamos una barra de menú
         menu_bar = self.menuBar()
         self.file_menu = menu_bar.addMenu("&Archivo")
@@ -73,8 +99,48 @@ class MainWindow(QMainWindow):
         open_action.triggered.connect(self.open_file_dialog)
         self.file_menu.addAction(open_action)
 
-        # Separador y espacio para archivos recientes
+        # Catálogo local de sesiones (SQLite) para buscar vueltas entre todos los .ibt indexados
+        catalog_action = QAction("Catálogo de sesiones...", self)
+        catalog_action.triggered.connect(self.show_session_catalog)
+        self.file_menu.addAction(catalog_action)
+        self.catalog_dialog = None
+
+        # Canales calculados (expresiones sobre otros canales), guardados en la configuración
+        self.math_channel_definitions = self._load_math_channel_definitions()
+        math_channels_action = QAction("Canales calculados...", self)
+        math_channels_action.triggered.connect(self.edit_math_channels)
+        self.file_menu.addAction(math_channels_action)
+
+        # Sesiones de referencia (p. ej. el archivo de un compañero) para comparar vueltas
+        add_reference_action = QAction("Añadir sesión de referencia...", self)
+        add_reference_action.triggered.connect(self.add_reference_session_dialog)
+        self.file_menu.addAction(add_reference_action)
+        clear_references_action = QAction("Quitar sesiones de referencia", self)
+        clear_references_action.triggered.connect(self.clear_reference_sessions)
+        self.file_menu.addAction(clear_references_action)
+
+        # Modo seguimiento: relee periódicamente la cola de un .ibt que iRacing sigue escribiendo
+        self.follow_action = QAction("Seguir archivo (sesión en directo)", self)
+        self.follow_action.setCheckable(True)
+        self.follow_action.toggled.connect(self.on_toggle_follow)
+        self.file_menu.addAction(self.follow_action)
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(1000)
+        self.follow_timer.timeout.connect(self.on_follow_timer)
+
+        # Reproducción en tiempo real de un .ibt sobre un almacén de memoria acotada (ring buffer)
+        self.live_replay_action = QAction("Reproducir .ibt en tiempo real...", self)
+        self.live_replay_action.triggered.connect(self.start_live_replay)
+        self.file_menu.addAction(self.live_replay_action)
+        self.live_replay = None
+        self.live_store = None
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(250)
+        self.live_timer.timeout.connect(self.on_live_timer)
+
+        # Separador y espacio para archivos recientes (con los metadatos de la sesión como tooltip)
         self.file_menu.addSeparator()
+        self.file_menu.setToolTipsVisible(True)
         for i in range(self.max_recent_files):
             action = QAction(self)
             action.setVisible(False)
@@ -82,6 +148,11 @@ class MainWindow(QMainWindow):
             self.recent_file_actions.append(action)
             self.file_menu.addAction(action)
 
+        self.file_menu.addSeparator()
+        clear_cache_action = QAction("Vaciar caché de sesiones", self)
+        clear_cache_action.triggered.connect(self.session_cache.clear)
+        self.file_menu.addAction(clear_cache_action)
+
         # Botón toggle para mostrar/ocultar fondo de mapa
         self.show_map_action = QAction(QIcon(resource_path("./icons/google_maps.png")), "Cargar fondo", self)
         self.show_map_action.setCheckable(True)
@@ -89,6 +160,13 @@ class MainWindow(QMainWindow):
         self.show_map_action.toggled.connect(self.on_toggle_map_background)
         self.toolbar.addAction(self.show_map_action)
 
+        # Vista simplificada: línea central de la pista coloreada con la mediana de cada tramo
+        self.centerline_action = QAction("Línea central", self)
+        self.centerline_action.setCheckable(True)
+        self.centerline_action.setToolTip("Dibuja la línea central (mediana de las vueltas limpias) en lugar de todos los puntos")
+        self.centerline_action.toggled.connect(self.process_and_update_track)
+        self.toolbar.addAction(self.centerline_action)
+
         # Botón para resetear la vista del mapa
         self.toolbar.addSeparator()
         reset_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_BrowserReload)
@@ -98,8 +176,8 @@ class MainWindow(QMainWindow):
         self.toolbar.addAction(self.reset_view_action)
 
         # Acción Guardar como
-        self.save_as_action = QAction(QIcon(resource_path("./icons/save.ico")), "Guardar como CSV", self)
-        self.save_as_action.setToolTip("Guardar como CSV")
+        self.save_as_action = QAction(QIcon(resource_path("./icons/save.ico")), "Guardar como", self)
+        self.save_as_action.setToolTip("Guardar como CSV, Parquet o Feather")
         self.save_as_action.triggered.connect(self.save_as_csv)
         self.toolbar.addAction(self.save_as_action)
 
@@ -115,6 +193,12 @@ class MainWindow(QMainWindow):
         self.statusbar.addPermanentWidget(self.coord_label)
 
         self.track_widget.mouse_coord_changed.connect(self.update_statusbar_coords)
+        # Punto bajo el cursor y región de interés: índices espaciales de las muestras del mapa
+        self._spatial_indexes = {}  # (clave de la sesión, vueltas) -> (TrackSpatialIndex, DataFrame, filas)
+        self.track_region = None    # (filas dentro de la región, pasadas por vuelta) de la última región
+        self.track_widget.point_hovered.connect(self.on_track_hover)
+        self.track_widget.point_clicked.connect(self.on_track_click)
+        self.track_widget.region_selected.connect(self.on_track_region_selected)
 
         # --- DOCK WIDGET DERECHO (PARA TIEMPOS Y DISTANCIA) ---
         self.distance_slider = QRangeSlider(self, labels_visible=False)
@@ -134,6 +218,26 @@ class MainWindow(QMainWindow):
         laps_dock_widget.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
         self.addDockWidget(Qt.LeftDockWidgetArea, laps_dock_widget)
 
+        # --- DOCK DE EVENTOS (BLOQUEOS, PATINAJE, ABS) ---
+        self.event_list_widget = EventListWidget(self)
+        self.event_list_widget.event_selected.connect(self.on_event_selected)
+        self._event_query = None  # Última consulta al índice de eventos, para no repetirla
+        events_dock = QDockWidget("Eventos", self)
+        events_dock.setWidget(self.event_list_widget)
+        events_dock.setAllowedAreas(Qt.AllDockWidgetAreas)
+        self.addDockWidget(Qt.LeftDockWidgetArea, events_dock)
+
+        # --- DOCK DE CURVAS (métricas por curva y vuelta) ---
+        self.corner_table_widget = CornerTableWidget(self)
+        self.corner_table_widget.corner_selected.connect(self.set_distance_slider_range)
+        self.corners_dock = QDockWidget("Curvas", self)
+        self.corners_dock.setWidget(self.corner_table_widget)
+        self.corners_dock.setAllowedAreas(Qt.AllDockWidgetAreas)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.corners_dock)
+        self.tabifyDockWidget(events_dock, self.corners_dock)
+        events_dock.raise_()
+        self.corners_dock.visibilityChanged.connect(lambda visible: visible and self.refresh_corner_table())
+
         # --- AÑADIMOS EL NUEVO DOCK DE REPRODUCCIÓN ---
         self.playback_widget = PlaybackControlWidget(self)
         playback_dock = QDockWidget("Control de Reproducción y Temperaturas", self)
@@ -177,66 +281,276 @@ class MainWindow(QMainWindow):
 
     def load_file(self, file_name):
         print(f"Abriendo archivo: {file_name}")
+        self.stop_live_replay()
+        if self._load_task is not None and self._load_task.is_running():
+            # Solo una carga a la vez: se cancela la anterior (sus señales pendientes se ignoran)
+            self._load_task.cancel()
+            self._load_task.wait()
+        self._close_load_progress()  # El diálogo de la carga anterior no se reutiliza
+
+        self._load_progress = QProgressDialog("Cargando telemetría...", "Cancelar", 0, 100, self)
+        self._load_progress.setWindowModality(Qt.WindowModal)
+        self._load_progress.setMinimumDuration(0)
+        self._load_progress.setAutoClose(False)
+        self._load_progress.setAutoReset(False)
+        self._load_progress.setValue(0)
+
+        task = BackgroundTask(self._load_session_task, file_name)
+        self._load_task = task
+
+        def if_current(slot):
+            # Las señales en cola de una carga ya sustituida por otra no deben tocar la nueva
+            return lambda *args: slot(*args) if task is self._load_task else None
+
+        task.progress.connect(if_current(self.on_load_progress))
+        task.finished.connect(if_current(lambda session: self.on_session_loaded(session, file_name)))
+        task.failed.connect(if_current(self.on_load_failed))
+        task.canceled.connect(if_current(self.on_load_canceled))
+        self._load_progress.canceled.connect(task.cancel)
+        self._load_progress.show()
+        task.start()
+
+    def _load_session_task(self, file_name, progress_callback=None):
+        """ Se ejecuta en el hilo de carga: no debe tocar widgets. """
+        # Si la sesión ya se analizó antes, se recupera de la caché sin decodificar el .ibt
+        session = self.session_cache.load(file_name)
+        if session is None:
+            session = TelemetrySession(file_name, progress_callback=progress_callback)
+            print(f"INFO: Cargando datos de telemetría... {session}")
+            if not session.dataframe.empty:
+                session.filter_driving_columns()
+                session.remove_problematic_rows()
+                self.session_cache.store(session)
+        elif not session.dataframe.empty:
+            # La caché guarda la marca GpsGlitch; los tramos y el informe se recalculan (es vectorizado)
+            session.remove_problematic_rows()
+        self._apply_math_channels(session, self.math_channel_definitions)
+        # Estadísticos de todos los canales en una pasada, curvas y línea central, aún en el hilo de carga
+        session.stats.summary()
+        session.corner_analysis()
+        session.centerline()
+        return session
+
+    def _load_math_channel_definitions(self):
+        raw = self.settings.value("mathChannels", None)
+        if raw is None:
+            return list(DEFAULT_MATH_CHANNELS)
+        try:
+            return [(name, expression) for name, expression in json.loads(raw)]
+        except (TypeError, ValueError) as e:
+            print(f"ADVERTENCIA: Configuración de canales calculados ilegible, se usan los predeterminados: {e}")
+            return list(DEFAULT_MATH_CHANNELS)
+
+    @staticmethod
+    def _apply_math_channels(session, definitions):
+        """ Registra los canales calculados en la sesión (se evalúan al pedirlos). """
+        try:
+            session.define_math_channels(definitions)
+        except MathChannelError as e:
+            print(f"ADVERTENCIA: Canales calculados no aplicados: {e}")
+
+    def edit_math_channels(self):
+        reserved = set()
+        for session in [self.session] + [session for _, session in self.reference_sessions]:
+            if session is not None:
+                reserved |= session.telemetry_channels()
+        dialog = MathChannelsDialog(self.math_channel_definitions, reserved, self)
+        if not dialog.exec():
+            return
+        self.math_channel_definitions = dialog.definitions()
+        self.settings.setValue("mathChannels", json.dumps(self.math_channel_definitions))
+        for _, session in self.reference_sessions:
+            self._apply_math_channels(session, self.math_channel_definitions)
+        if self.session is not None:
+            self._apply_math_channels(self.session, self.math_channel_definitions)
+            self.dataframe = self.session.dataframe
+            self.refresh_variable_lists()
+            self.update_comparison_charts()
+
+    def refresh_variable_lists(self, keep_selection=True):
+        """
+        Rellena el combo de color y la lista de LapComparisonWidget con los canales disponibles.
+        Con keep_selection=False (sesión nueva) se vuelve a Speed y a las variables por defecto.
+        """
+        numeric_cols = self.session.numeric_channels()
+        current = self.color_combo.currentText() if keep_selection else 'Speed'
+        checked = self.comparison_widget.checked_variables() if keep_selection else None
+        self.color_combo.blockSignals(True)
+        self.color_combo.clear()
+        self.color_combo.addItems(numeric_cols)
+        self.color_combo.blockSignals(False)
+        if current in numeric_cols:
+            self.color_combo.setCurrentText(current)
+        self.on_color_column_changed(self.color_combo.currentText())
+        self.comparison_widget.populate_variables(numeric_cols, checked or None)
+
+    def refresh_corner_table(self):
+        """ Curvas y métricas por vuelta de la sesión (cacheadas en la sesión hasta que cambian las vueltas). """
+        if self.session is None or self.session.dataframe.empty:
+            return
+        corners, metrics = self.session.corner_analysis()
+        self.corner_table_widget.update_data(corners, metrics, self.session.invalid_laps)
+
+    def show_session_catalog(self):
+        if self.catalog_dialog is None:
+            self.catalog_dialog = SessionCatalogDialog(SessionCatalog(), self)
+            self.catalog_dialog.file_requested.connect(self.load_file)
+        self.catalog_dialog.refresh_filters()
+        self.catalog_dialog.show()
+        self.catalog_dialog.raise_()
+
+    def add_reference_session_dialog(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Añadir sesión de referencia", "", "iRacing Telemetry Files (*.ibt)")
+        if not file_name:
+            return
+        if self._reference_task is not None and self._reference_task.is_running():
+            print("ADVERTENCIA: Ya se está cargando una sesión de referencia.")
+            return
+        sector_percents = list(self.session.sector_percents) if self.session is not None else [0.25, 0.5, 0.75]
+        self.statusbar.showMessage(f"Cargando sesión de referencia {os.path.basename(file_name)}...")
+        self._reference_task = BackgroundTask(self._load_reference_task, file_name, sector_percents,
+                                              list(self.math_channel_definitions))
+        self._reference_task.finished.connect(lambda session: self.on_reference_loaded(session, file_name))
+        self._reference_task.failed.connect(self.on_load_failed)
+        self._reference_task.start()
+
+    @staticmethod
+    def _load_reference_task(file_name, sector_percents, math_channels=(), progress_callback=None):
+        """
+        Hilo de carga de una sesión de referencia: solo se decodifican tiempo, vuelta y distancia.
+        Los canales que se grafiquen se leen después del memmap con ensure_columns.
+        """
+        session = TelemetrySession()
+        session.load_telemetry(file_name, columns=REFERENCE_COLUMNS, progress_callback=progress_callback)
+        if not session.dataframe.empty:
+            session.laps_df = session.times_by_laps(sector_percents)
+        MainWindow._apply_math_channels(session, math_channels)
+        return session
+
+    def on_reference_loaded(self, session, file_name):
+        self.statusbar.clearMessage()
+        if session.dataframe.empty or session.laps_df.empty:
+            print(f"Error: La sesión de referencia '{file_name}' no tiene vueltas.")
+            return
+        label = os.path.splitext(os.path.basename(file_name))[0]
+        self.reference_sessions.append((label, session))
+        print(f"INFO: Sesión de referencia añadida: {label} ({len(session.laps_df)} vueltas).")
+        self.refresh_laps_table()
+
+    def clear_reference_sessions(self):
+        for _, session in self.reference_sessions:
+            session.close()
+        self.reference_sessions = []
+        self.refresh_laps_table()
+        self.update_comparison_charts()
 
-        progress_dialog = QProgressDialog("Cargando telemetría...", "Cancelar", 0, 0, self)
-        progress_dialog.setWindowModality(Qt.WindowModal)
-        progress_dialog.setMinimumDuration(0)
-        progress_dialog.setValue(0)
-        progress_dialog.show()
-
-        QApplication.processEvents()
-
+    def refresh_laps_table(self):
+        """ Rellena la tabla de vueltas con la sesión principal y las de referencia. """
+        if self.session is None or self.session.laps_df is None:
+            return
+        reference_laps = [(label, session.laps_df) for label, session in self.reference_sessions]
+        self.laps_table_widget.update_data(self.session.laps_df, self.session.invalid_laps, reference_laps)
+
+    def on_load_progress(self, done, total):
+        if self._load_progress is not None and total > 0:
+            self._load_progress.setValue(int(100 * done / total))
+
+    def _close_load_progress(self):
+        if self._load_progress is not None:
+            # closeEvent emite canceled: se desconecta para no cancelar una tarea ya terminada
+            self._load_progress.canceled.disconnect()
+            self._load_progress.close()
+            self._load_progress.deleteLater()
+            self._load_progress = None
+
+    def on_load_failed(self, message):
+        self._close_load_progress()
+        print(f"Error durante la carga: {message}")
+
+    def on_load_canceled(self):
+        self._close_load_progress()
+        print("INFO: Carga de telemetría cancelada.")
+
+    def on_session_loaded(self, session, file_name, remember=True):
+        """
+        Recibe en el hilo de la GUI la sesión cargada por el hilo de carga. remember: añadir el
+        archivo a los recientes (no se hace con la reproducción en tiempo real).
+        """
+        self._close_load_progress()
         try:
-            self.session = TelemetrySession(file_name)
-            print(f"INFO: Cargando datos de telemetría... {self.session}")
-            if not self.session.dataframe.empty:
-                self.session.filter_driving_columns()
-                self.session.remove_problematic_rows()
-                self.dataframe = self.session.dataframe
-                self.playback_widget.set_data(self.session.dataframe)
-
-                # Llenar el combo con columnas numéricas
-                numeric_cols = self.dataframe.select_dtypes(include=[np.number]).columns.tolist()
-                self.color_combo.clear()
-                self.color_combo.addItems(numeric_cols)
-                if 'Speed' in numeric_cols:
-                    self.color_combo.setCurrentText('Speed')
-                self.update_color_controls()
-
-                self.comparison_widget.populate_variables(numeric_cols)
-                self.update_comparison_charts()
-
-                # Actualizar la tabla de tiempos por vuelta
-                if self.session.laps_df is not None:
-                    self.laps_table_widget.update_data(self.session.laps_df)
-                    self.laps_table_widget.table.clearSelection() # Limpiar selección anterior
-                    self.selected_laps = None # Resetear el filtro de vuelta
-
-                if 'LapDistPct' in self.dataframe.columns:
-                    pct_min = self.dataframe['LapDistPct'].min()
-                    pct_max = self.dataframe['LapDistPct'].max()
-                    self.distance_slider.setRange(pct_min, pct_max)
-                    self.distance_slider.setValues(pct_min, pct_max)
-
-                self.track_widget.reset_view()
-                self.add_to_recent_files(file_name)
-            else:
+            if session.dataframe.empty:
                 print("Error: No se cargaron datos de telemetría.")
+                return
+
+            self.follow_action.setChecked(False)  # El seguimiento es del archivo anterior
+            self.session = session
+            self.dataframe = self.session.dataframe
+            self.clear_track_region()  # La región se refiere a las filas de la sesión anterior
+            self.playback_widget.set_data(self.session.dataframe, self.session.stats.summary())
+
+            # Llenar el combo y la lista de comparación con los canales numéricos y calculados
+            # (los no decodificados o no calculados se cargan al elegirlos)
+            self.refresh_variable_lists(keep_selection=False)
+            self.update_comparison_charts()
+
+            # Actualizar la tabla de tiempos por vuelta y la de curvas
+            self.refresh_corner_table()
+            if self.session.laps_df is not None:
+                self.refresh_laps_table()
+                self.laps_table_widget.table.clearSelection() # Limpiar selección anterior
+                self.selected_laps = None # Resetear el filtro de vuelta
+
+            if 'LapDistPct' in self.dataframe.columns:
+                pct_min = self.dataframe['LapDistPct'].min()
+                pct_max = self.dataframe['LapDistPct'].max()
+                self.distance_slider.setRange(pct_min, pct_max)
+                self.distance_slider.setValues(pct_min, pct_max)
+
+            self.track_widget.reset_view()
+            if remember:
+                self.add_to_recent_files(file_name)
         except Exception as e:
             print(f"Error durante la carga: {e}")
-        finally:
-            progress_dialog.cancel()
-            del progress_dialog
 
     def save_as_csv(self):
         if hasattr(self, "session") and self.session is not None:
-            file_name, _ = QFileDialog.getSaveFileName(self, "Guardar como CSV", "", "CSV Files (*.csv)")
+            file_name, selected_filter = QFileDialog.getSaveFileName(self, "Guardar como", "", ";;".join(available_export_filters()))
+            if file_name and not os.path.splitext(file_name)[1]:
+                # Sin extensión: se usa la del filtro elegido
+                file_name += next((ext for ext, name in EXPORT_FORMATS.items() if name == selected_filter), '.csv')
             if file_name:
-                self.session.save_to_csv(file_name)
-                self.session.resumen()
+                # La exportación se hace en segundo plano sobre una instantánea de las columnas actuales
+                snapshot = self.session.dataframe.copy(deep=False)
+                self._export_progress = QProgressDialog("Exportando telemetría...", "Cancelar", 0, 100, self)
+                self._export_progress.setWindowModality(Qt.WindowModal)
+                self._export_progress.setMinimumDuration(0)
+                self._export_progress.setAutoClose(False)
+                self._export_progress.setAutoReset(False)
+
+                self._export_task = BackgroundTask(export_dataframe, snapshot, file_name)
+                self._export_task.progress.connect(
+                    lambda done, total: self._export_progress.setValue(int(100 * done / total)) if total > 0 else None)
+                self._export_task.finished.connect(self.on_export_finished)
+                self._export_task.failed.connect(lambda message: self.on_export_finished(None, message))
+                self._export_task.canceled.connect(lambda: self.on_export_finished(None, "cancelada"))
+                self._export_progress.canceled.connect(self._export_task.cancel)
+                self._export_progress.show()
+                self._export_task.start()
         else:
             print("No hay sesión de telemetría cargada.")
 
+    def on_export_finished(self, file_name, error=None):
+        if self._export_progress is not None:
+            self._export_progress.canceled.disconnect()
+            self._export_progress.close()
+            self._export_progress.deleteLater()
+            self._export_progress = None
+        if file_name:
+            print(f"INFO: Telemetría exportada en '{file_name}'.")
+            self.session.resumen()
+        else:
+            print(f"ADVERTENCIA: Exportación no completada ({error}).")
+
     def add_to_recent_files(self, file_name):
         files = self.settings.value("recentFiles", [], type=list)
         try:
@@ -255,10 +569,20 @@ class MainWindow(QMainWindow):
             text = f"&{i + 1} {os.path.basename(files[i])}"
             self.recent_file_actions[i].setText(text)
             self.recent_file_actions[i].setData(files[i])
+            self.recent_file_actions[i].setToolTip(self._recent_file_tooltip(files[i]))
             self.recent_file_actions[i].setVisible(True)
         for i in range(num_recent_files, self.max_recent_files):
             self.recent_file_actions[i].setVisible(False)
 
+    @staticmethod
+    def _recent_file_tooltip(file_name):
+        """ Ruta y metadatos del archivo leídos solo de las cabeceras (milisegundos por archivo). """
+        try:
+            summary = metadata_summary(read_metadata(file_name))
+        except (OSError, ValueError, IndexError):
+            return f"{file_name}\n(no disponible)"
+        return f"{file_name}\n{summary}" if summary else file_name
+
     def open_recent_file(self):
         action = self.sender()
         if action:
@@ -267,6 +591,8 @@ class MainWindow(QMainWindow):
     def on_color_column_changed(self, column_name):
         """Callback cuando el usuario cambia la columna de color."""
         if column_name and self.dataframe is not None:
+            if self.session is not None:
+                self.session.ensure_columns([column_name])
             self.update_color_controls()
 
     def on_range_changed(self, low, high):
@@ -279,9 +605,24 @@ class MainWindow(QMainWindow):
     def on_lap_filter_changed(self, selected_laps):
         """Slot para manejar la selección de vuelta desde la LapsTimeTable."""
         print(f"INFO: Filtro de vuelta cambiado a: {selected_laps}")
+        # El mapa y la reproducción muestran solo la sesión principal: se ignoran las vueltas de referencia
+        if selected_laps is not None:
+            selected_laps = [lap for lap in selected_laps if not isinstance(lap, tuple)] or None
         self.selected_laps = selected_laps 
+        self.update_playback_source()
         self.process_and_update_track()
 
+    def update_playback_source(self):
+        """ Reproduce la vuelta teórica si es lo único seleccionado; si no, la sesión completa. """
+        if self.session is None:
+            return
+        if self.selected_laps == [THEORETICAL_LAP]:
+            source, stats = self.session.get_theoretical_best_lap_data(), self.session.stats.lap(THEORETICAL_LAP)
+        else:
+            source, stats = self.session.dataframe, self.session.stats.summary()
+        if self.playback_widget.dataframe is not source:
+            self.playback_widget.set_data(source, stats)
+
     def on_lap_selection_for_chart_changed(self):
         self.update_comparison_charts()
 
@@ -295,8 +636,20 @@ class MainWindow(QMainWindow):
         df = self.dataframe
         column_name = self.color_combo.currentText()
         if df is not None and column_name in df.columns:
-            min_val = df[column_name].min()
-            max_val = df[column_name].max()
+            # Rango desde los estadísticos cacheados de la sesión (sin recorrer la columna). Durante la
+            # reproducción en directo no hay sesión, y los canales sin estadísticos se leen del DataFrame
+            column_stats = None
+            if self.session is not None and self.session.dataframe is df:
+                column_stats = self.session.stats.column(column_name)
+            if column_stats is not None:
+                min_val = column_stats['min']
+                max_val = column_stats['max']
+            else:
+                values = pd.to_numeric(df[column_name], errors='coerce').to_numpy(dtype=np.float64)
+                if not np.isfinite(values).any():
+                    return
+                min_val = float(np.nanmin(values))
+                max_val = float(np.nanmax(values))
 
             # Puedes elegir la paleta según la columna si lo deseas
             colormap = cm.get_cmap('RdYlGn')  # O cualquier otra lógica
@@ -327,43 +680,312 @@ class MainWindow(QMainWindow):
         if self.dataframe is not None and not self.dataframe.empty:
             lon = self.dataframe['Lon'].to_numpy()
             lat = self.dataframe['Lat'].to_numpy()
+            if 'GpsGlitch' in self.dataframe.columns:
+                gps_valid = self.dataframe['GpsGlitch'].to_numpy() == 0
+                lon, lat = lon[gps_valid], lat[gps_valid]
+            if len(lon) == 0:
+                return None
             return {'min_lon': lon.min(), 'max_lon': lon.max(), 'min_lat': lat.min(), 'max_lat': lat.max()}
         return None
 
+    def _track_frame(self):
+        """ Filas que se dibujan en el mapa: las de las vueltas seleccionadas o la sesión completa. """
+        if self.selected_laps is not None:
+            return self.session.laps_slice(self.selected_laps)
+        return self.dataframe
+
+    def _spatial_index(self, laps):
+        """
+        Índice espacial de las muestras de las vueltas indicadas (None = sesión completa). Se
+        construye al primer uso y se conservan el de la sesión y el del último filtro de vueltas
+        hasta que cambian las filas, no con cada movimiento del ratón.
+        Devuelve (índice, DataFrame, filas en la reproducción).
+        """
+        session_key = (self.session.rows_version, len(self.session.dataframe), self.session.laps_version)
+        key = (session_key, laps)
+        if key not in self._spatial_indexes:
+            df = self.session.laps_slice(list(laps)) if laps is not None else self.session.dataframe
+            valid = df['GpsGlitch'].to_numpy() == 0 if 'GpsGlitch' in df.columns else None
+            index = TrackSpatialIndex(df['Lon'].to_numpy(), df['Lat'].to_numpy(), valid)
+            # La reproducción es la vuelta teórica si es lo único seleccionado y, si no, la sesión
+            if laps is None or list(laps) == [THEORETICAL_LAP]:
+                rows = np.arange(len(df))
+            else:
+                rows = self.session.dataframe.index.get_indexer(df.index)
+            self._spatial_indexes = {k: v for k, v in self._spatial_indexes.items()
+                                     if k[0] == session_key and k[1] is None}
+            self._spatial_indexes[key] = (index, df, rows)
+        return self._spatial_indexes[key]
+
+    def track_pick_index(self):
+        """ Índice espacial de las muestras dibujadas con el filtro de vueltas actual (None si no hay datos). """
+        if self.session is None or self.dataframe is None or self.dataframe.empty \
+                or not all(col in self.dataframe.columns for col in ['Lon', 'Lat']):
+            return None
+        return self._spatial_index(tuple(self.selected_laps) if self.selected_laps is not None else None)
+
+    def pick_track_point(self, lon, lat, radius_m):
+        """ Muestra visible más cercana a (lon, lat): (DataFrame, posición, fila en la reproducción) o None. """
+        picked = self.track_pick_index()
+        if picked is None:
+            return None
+        index, df, rows = picked
+        # Solo los puntos visibles con los filtros de color y distancia (no en la vista de línea central)
+        colors = self.track_widget.colors
+        visible = None
+        if not self.track_widget.closed_line and colors is not None and len(colors) >= len(df):
+            visible = colors[:len(df), 3] > 0
+        hit = index.nearest(lon, lat, radius_m, visible)
+        if hit is None:
+            return None
+        return df, hit[0], int(rows[hit[0]])
+
+    def on_track_hover(self, lon, lat, radius_m):
+        hit = self.pick_track_point(lon, lat, radius_m)
+        if hit is None:
+            QToolTip.hideText()
+            return
+        df, position, _ = hit
+        sample = df.iloc[position]
+        lap = int(sample['Lap']) if 'Lap' in sample.index else None
+        lines = ['Teórica' if lap == THEORETICAL_LAP else f"Vuelta {lap}"]
+        if 'LapDist' in sample.index:
+            lines[0] += f" · LapDist {sample['LapDist']:.0f} m"
+        column_name = self.color_combo.currentText()
+        if column_name in sample.index:
+            lines.append(f"{column_name}: {sample[column_name]:.3f}")
+        QToolTip.showText(QCursor.pos(), "\n".join(lines), self.track_widget)
+
+    def on_track_click(self, lon, lat, radius_m):
+        """ Lleva la reproducción (y el coche en el mapa) a la muestra pulsada. """
+        hit = self.pick_track_point(lon, lat, radius_m)
+        if hit is None or hit[2] < 0:
+            return
+        self.update_playback_source()
+        self.playback_widget.seek_to_tick(hit[2])
+
+    def on_track_region_selected(self, poly_lon, poly_lat):
+        """
+        Región de interés dibujada en el mapa (lazo o rectángulo): muestras de toda la sesión que
+        caen dentro, según el índice espacial, y sus pasadas como tramos contiguos de filas de
+        cada vuelta. El tiempo de cada vuelta en la región se muestra en la tabla de tiempos y
+        los gráficos comparativos se limitan a la distancia que abarca.
+        """
+        if len(poly_lon) < 3 or self.track_pick_index() is None:
+            self.clear_track_region()
+            return
+        index, df, _ = self._spatial_index(None)
+        rows = index.in_polygon(poly_lon, poly_lat)
+        lap_dist = df['LapDist'].to_numpy() if 'LapDist' in df.columns else None
+        passes = region_passes(rows, df['Lap'].to_numpy(), df['SessionTime'].to_numpy(), lap_dist)
+        self.track_region = (rows, passes)
+        if passes.empty:
+            self.laps_table_widget.set_region_times({})
+            self.comparison_widget.set_distance_range(None)
+            self.statusbar.showMessage("Región: ninguna muestra dentro.", 5000)
+            return
+
+        region_times = passes.groupby('Lap')['Time'].sum()
+        self.laps_table_widget.set_region_times({int(lap): float(t) for lap, t in region_times.items()})
+        if lap_dist is not None:
+            self.comparison_widget.set_distance_range((float(passes['DistStart'].min()), float(passes['DistEnd'].max())))
+        message = f"Región: {len(rows)} muestras en {len(passes)} pasadas de {len(region_times)} vueltas."
+        self.statusbar.showMessage(message, 10000)
+        print(f"INFO: {message}")
+
+    def clear_track_region(self):
+        self.track_region = None
+        self.track_widget.set_region(None, None)
+        self.laps_table_widget.set_region_times({})
+        self.comparison_widget.set_distance_range(None)
+
     def process_and_update_track(self):
         """
         Procesa el dataframe actual basado en los controles de la UI y envía los datos al TrackWidget.
         """
-        if self.dataframe is None or self.dataframe.empty:
+        if self.session is None or self.dataframe is None or self.dataframe.empty:
             self.track_widget.setData(None, None, None, None, None)
+            self.track_widget.set_event_markers(None, None)
             self.track_widget.update()
             return
 
-        # --- NUEVO: Filtrar por vuelta seleccionada ---
-        if self.selected_laps is not None:
-            df = self.dataframe[self.dataframe['Lap'].isin(self.selected_laps)].copy()
-        else:
-            df = self.dataframe
-
+        df = self._track_frame()
         column_name = self.color_combo.currentText()
         if df.empty or not column_name:
             self.track_widget.setData(None, None, None, None, None)
             self.track_widget.update()
             return
 
-        vmin = self.color_range_slider.getLowValue()
-        vmax = self.color_range_slider.getHighValue()
         dist_min = self.distance_slider.getLowValue()
         dist_max = self.distance_slider.getHighValue()
 
         pan_x, pan_y, zoom = self.track_widget.get_view_state()
-        # 1. Preparar vértices y bounding box (esto está bien)
+        map_image = self.map_image_cache if self.show_map_action.isChecked() else None
+        map_bbox = self.map_bbox_cache if map_image is not None else None
+
+        # Vista simplificada (sin filtro de vueltas): unos pocos miles de vértices en lugar de todas las muestras
+        centerline = self.session.centerline() if self.centerline_action.isChecked() and self.selected_laps is None else None
+        if centerline is not None:
+            profile = pd.DataFrame({column_name: centerline.profile(column_name, df[column_name].to_numpy()),
+                                    'LapDistPct': centerline.pct})
+            colors, min_edge_qcolor, max_edge_qcolor = self.compute_track_colors(
+                profile, column_name, np.ones(len(centerline), dtype=bool))
+            self.color_range_slider.set_edge_colors(min_edge_qcolor, max_edge_qcolor)
+            self.track_widget.setData(centerline.vertices(), colors, centerline.bbox(), map_image, map_bbox,
+                                      closed_line=True)
+            self.update_event_views(dist_min, dist_max)
+            self.track_widget.set_view_state(pan_x, pan_y, zoom)
+            self.track_widget.update()
+            return
+
+        # 1. Preparar vértices y bounding box (sin las posiciones GPS marcadas como no válidas)
         lon = df['Lon'].to_numpy()
         lat = df['Lat'].to_numpy()
+        gps_valid = df['GpsGlitch'].to_numpy() == 0 if 'GpsGlitch' in df.columns else np.ones(len(df), dtype=bool)
+        if not gps_valid.any():
+            self.track_widget.setData(None, None, None, None, None)
+            self.track_widget.update()
+            return
         vertices = np.vstack((lon, lat)).T.flatten()
-        track_bbox = {'min_lon': lon.min(), 'max_lon': lon.max(), 'min_lat': lat.min(), 'max_lat': lat.max()}
+        track_bbox = {'min_lon': lon[gps_valid].min(), 'max_lon': lon[gps_valid].max(),
+                      'min_lat': lat[gps_valid].min(), 'max_lat': lat[gps_valid].max()}
+
+        # 2. Colores según la columna elegida y los rangos de los sliders
+        colors, min_edge_qcolor, max_edge_qcolor = self.compute_track_colors(df, column_name, gps_valid)
+
+        # 3. Actualizar el fondo del Range Slider
+        self.color_range_slider .set_edge_colors(min_edge_qcolor, max_edge_qcolor)
+
+        # 4. Enviar datos al TrackWidget (con el fondo de mapa cacheado, si está activado)
+        self.track_widget.setData(vertices, colors, track_bbox, map_image, map_bbox)
+        self.update_event_views(dist_min, dist_max)
+
+        # 5. Restaurar vista
+        self.track_widget.set_view_state(pan_x, pan_y, zoom)
+        self.track_widget.update() # Forzar un redibujado explícito
 
-        # 2. --- LÓGICA DE COLORES DINÁMICA (VERSIÓN CORREGIDA) ---
+    def on_toggle_follow(self, checked):
+        if not checked:
+            self.follow_timer.stop()
+            print("INFO: Seguimiento del archivo detenido.")
+            return
+        if self.session is None or self.session.reader is None:
+            print("ADVERTENCIA: Abre primero el .ibt de la sesión en curso para seguirlo.")
+            self.follow_action.setChecked(False)
+            return
+        print(f"INFO: Siguiendo '{self.session.ibt_path}'.")
+        self.follow_timer.start()
+
+    def on_follow_timer(self):
+        """ Incorpora los registros nuevos del archivo y refresca solo lo que depende de ellos. """
+        if self.session is None or self.session.reader is None:
+            self.follow_action.setChecked(False)
+            return
+        first_new = self.session.follow_update()
+        if first_new is None:
+            return
+
+        self.dataframe = self.session.dataframe
+        if self.selected_laps != [THEORETICAL_LAP]:
+            self.playback_widget.extend_data(self.dataframe)
+        self.refresh_laps_table()
+        if self.corners_dock.isVisible():
+            self.refresh_corner_table()
+
+        new_laps = set(self.dataframe['Lap'].to_numpy()[first_new:].tolist())
+        if self.selected_laps is None:
+            self.append_track_tail(first_new)
+        elif new_laps & set(self.selected_laps):
+            self.process_and_update_track()
+        else:
+            self.update_event_views(self.distance_slider.getLowValue(), self.distance_slider.getHighValue())
+
+    def start_live_replay(self):
+        """ Reproduce un .ibt al ritmo real sobre un TelemetryRingBuffer (últimas N vueltas). """
+        file_name, _ = QFileDialog.getOpenFileName(self, "Reproducir .ibt en tiempo real", "", "IBT Files (*.ibt)")
+        if not file_name:
+            return
+        self.stop_live_replay()
+        self.follow_action.setChecked(False)
+        self.live_replay = IbtReplay(file_name, DRIVING_COLUMNS)
+        if not self.live_replay.channels:
+            print(f"ERROR: '{file_name}' no contiene canales de telemetría.")
+            self.stop_live_replay()
+            return
+        retain_laps = self.settings.value("liveRetainLaps", 3, type=int)
+        capacity = self.settings.value("liveCapacitySeconds", 3600, type=int) * (self.live_replay.reader.tick_rate or 60)
+        self.live_store = TelemetryRingBuffer(self.live_replay.dtypes, capacity=capacity, retain_laps=retain_laps)
+        # Hasta el primer bloque no hay sesión: las vistas no deben seguir usando la anterior
+        self.session = None
+        self.dataframe = None
+        self.selected_laps = None
+        self.clear_track_region()
+        self.process_and_update_track()
+        print(f"INFO: Reproduciendo '{file_name}' en tiempo real (se conservan las últimas {retain_laps} vueltas).")
+        self.live_replay.start()
+        self.live_timer.start()
+
+    def stop_live_replay(self):
+        if self.live_replay is None:
+            return
+        self.live_timer.stop()
+        self.live_replay.close()
+        self.live_replay = None
+        self.live_store = None
+        print("INFO: Reproducción en tiempo real detenida.")
+
+    def on_live_timer(self):
+        """ Pasa al almacén las muestras ya "ocurridas" y refresca las vistas con la ventana actual. """
+        block = self.live_replay.poll()
+        if block:
+            self.live_store.append(block)
+            if self.session is None:
+                session = TelemetrySession()
+                session.ibt_path = self.live_replay.reader.ibt_path
+                session.load_from_ring_buffer(self.live_store)
+                if not session.dataframe.empty:
+                    self.on_session_loaded(session, session.ibt_path, remember=False)
+            else:
+                self.session.load_from_ring_buffer(self.live_store)
+                self.dataframe = self.session.dataframe
+                self.playback_widget.extend_data(self.dataframe)
+                self.refresh_laps_table()
+                if self.corners_dock.isVisible():
+                    self.refresh_corner_table()
+                if self.selected_laps is not None:
+                    # Las vueltas que salen de la ventana dejan de estar disponibles
+                    self.selected_laps = [lap for lap in self.selected_laps if lap in self.session.lap_index] or None
+                self.process_and_update_track()
+        if self.live_replay.finished:
+            print("INFO: Fin de la reproducción en tiempo real.")
+            self.live_timer.stop()
+
+    def append_track_tail(self, first_row):
+        """ Añade al mapa solo los puntos desde first_row, con la misma coloración que el resto. """
+        column_name = self.color_combo.currentText()
+        if not column_name or column_name not in self.dataframe.columns or self.track_widget.vertices is None \
+                or self.track_widget.closed_line:
+            self.process_and_update_track()
+            return
+        tail = self.dataframe.iloc[first_row:]
+        lon = tail['Lon'].to_numpy()
+        lat = tail['Lat'].to_numpy()
+        gps_valid = tail['GpsGlitch'].to_numpy() == 0 if 'GpsGlitch' in tail.columns else np.ones(len(tail), dtype=bool)
+        colors, _, _ = self.compute_track_colors(tail, column_name, gps_valid)
+        self.track_widget.append_data(np.vstack((lon, lat)).T.flatten(), colors, lon[gps_valid], lat[gps_valid])
+        self.update_event_views(self.distance_slider.getLowValue(), self.distance_slider.getHighValue())
+
+    def compute_track_colors(self, df, column_name, gps_valid):
+        """
+        Colores RGBA de los puntos de df según la columna, el rango del slider de color y el
+        filtro de distancia. Devuelve (colores, color del extremo bajo, color del extremo alto).
+        """
+        vmin = self.color_range_slider.getLowValue()
+        vmax = self.color_range_slider.getHighValue()
+        dist_min = self.distance_slider.getLowValue()
+        dist_max = self.distance_slider.getHighValue()
+
+        # --- LÓGICA DE COLORES DINÁMICA (VERSIÓN CORREGIDA) ---
         values = df[column_name].to_numpy()
         colormap = self.color_range_slider .colormap
 
@@ -403,28 +1025,46 @@ class MainWindow(QMainWindow):
             max_edge_qcolor = QColor(80, 80, 90) # Color gris neutro para el slider
         # --- FIN DE LA LÓGICA DE COLORES ---
 
-        # 3. Actualizar el fondo del Range Slider
-        self.color_range_slider .set_edge_colors(min_edge_qcolor, max_edge_qcolor)
-
         # Filtro de distancia en la vuelta
         if 'LapDistPct' in df.columns:
             lap_pct_values = df['LapDistPct'].to_numpy()
             distance_mask_out = (lap_pct_values < dist_min) | (lap_pct_values > dist_max)
             colors[distance_mask_out, 3] = 0
+        colors[~gps_valid, 3] = 0
 
-        # 4. Enviar datos al TrackWidget
-        map_image = None
-        map_bbox = None # Inicializamos el bbox del mapa
-        if self.show_map_action.isChecked() and self.map_image_cache is not None:
-             map_image = self.map_image_cache
-             map_bbox = self.map_bbox_cache # Usamos el bbox del mapa cacheado
+        return colors, min_edge_qcolor, max_edge_qcolor
 
-        #map_image = self.map_image_cache if self.show_map_action.isChecked() else None
-        self.track_widget.setData(vertices, colors, track_bbox, map_image, map_bbox)
+    def update_event_views(self, dist_min, dist_max):
+        """
+        Consulta el índice de eventos con el filtro actual (vueltas y distancia) y actualiza
+        la lista y los marcadores del mapa. Solo se dibujan los eventos, no el DataFrame completo.
+        """
+        if self.session is None:
+            return
+        query = (self.session.rows_version, id(self.session.event_index()),
+                 tuple(self.selected_laps) if self.selected_laps is not None else None, dist_min, dist_max)
+        if query == self._event_query:
+            return
+        self._event_query = query
 
-        # 5. Restaurar vista
-        self.track_widget.set_view_state(pan_x, pan_y, zoom)
-        self.track_widget.update() # Forzar un redibujado explícito
+        events = self.session.events_in(laps=self.selected_laps, pct_range=(dist_min, dist_max))
+        self.event_list_widget.update_events(events)
+        if events.empty or not all(k in self.dataframe.columns for k in ['Lon', 'Lat']):
+            self.track_widget.set_event_markers(None, None)
+            return
+        if 'GpsGlitch' in self.dataframe.columns:
+            events = events[self.dataframe['GpsGlitch'].to_numpy()[events['StartRow'].to_numpy()] == 0]
+        rows = events['StartRow'].to_numpy()
+        lon = self.dataframe['Lon'].to_numpy()[rows]
+        lat = self.dataframe['Lat'].to_numpy()[rows]
+        colors = [EVENT_STYLES.get(t, (t, (1.0, 1.0, 1.0, 1.0)))[1] for t in events['Type']]
+        self.track_widget.set_event_markers(np.column_stack((lon, lat)).ravel(), np.array(colors))
+
+    def on_event_selected(self, start_row):
+        """ Lleva la reproducción (y el coche en el mapa) al inicio del evento elegido. """
+        if self.playback_widget.dataframe is not self.session.dataframe:
+            self.playback_widget.set_data(self.session.dataframe, self.session.stats.summary())
+        self.playback_widget.seek_to_tick(start_row)
 
     def deg2num(self, lat_deg, lon_deg, zoom):
         """ Convierte coordenadas geográficas a coordenadas de tesela de Google. """
@@ -531,11 +1171,14 @@ class MainWindow(QMainWindow):
         Se activa cada vez que la reproducción avanza un tick.
         Actualiza la posición del marcador en el mapa.
         """
-        # Asegurarnos de que tenemos datos y el índice es válido
-        if self.session and self.session.dataframe is not None and 0 <= tick_index < len(self.session.dataframe):
+        # Asegurarnos de que tenemos datos y el índice es válido (la reproducción puede ser la vuelta teórica)
+        playback_df = self.playback_widget.dataframe
+        if self.session and playback_df is not None and 0 <= tick_index < len(playback_df):
             # Obtenemos la fila de datos para el tick actual
-            data_row = self.session.dataframe.iloc[tick_index]
+            data_row = playback_df.iloc[tick_index]
             # Extraemos Lon y Lat
+            if data_row.get('GpsGlitch', 0):
+                return  # Posición GPS no válida: el coche se queda en el último punto bueno
             if all(k in data_row for k in ['Lon', 'Lat', 'Yaw']):
                 lon = data_row['Lon']
                 lat = data_row['Lat']
@@ -547,37 +1190,47 @@ class MainWindow(QMainWindow):
         if self.session is None or self.session.laps_df.empty:
             return
 
-        # 1. Obtener vueltas seleccionadas de la tabla
-        selected_rows = self.laps_table_widget.table.selectionModel().selectedRows()
-        lap_numbers = []
-        if selected_rows:
-            for index in selected_rows:
-                if index.row() < len(self.session.laps_df): # Excluir vuelta teórica
-                    lap_item = self.laps_table_widget.table.item(index.row(), 0)
-                    if lap_item: lap_numbers.append(int(lap_item.text()))
-        
-        # 2. Si no hay vueltas seleccionadas, usamos la mejor vuelta
-        if not lap_numbers and not self.session.laps_df.empty:
-            best_lap_row = self.session.laps_df.loc[self.session.laps_df['Time'].idxmin()]
-            lap_numbers.append(int(best_lap_row['Lap']))
-
-        # 3. Preparar los datos de las vueltas
-        laps_to_plot_data = {}
-        for lap_num in lap_numbers:
-            lap_df = self.session.dataframe[self.session.dataframe['Lap'] == lap_num]
-            laps_to_plot_data[f'Vuelta {lap_num}'] = lap_df
-        
-        # Añadir la vuelta teórica si existe
-        if 'theoretical_lap' in self.session.laps_df.index:
-             laps_to_plot_data['Teórica'] = self.session.get_theoretical_best_lap_data()
+        # 1. Obtener vueltas seleccionadas de la tabla (las de referencia son (sesión, vuelta))
+        selected_keys = self.laps_table_widget.selected_keys()
+        lap_numbers = [key for key in selected_keys if not isinstance(key, tuple)]
+        reference_keys = [key for key in selected_keys if isinstance(key, tuple) and key[0] < len(self.reference_sessions)]
 
+        # 2. Si no hay vueltas seleccionadas, usamos la mejor vuelta
+        if not lap_numbers and not reference_keys and self.session.best_lap() is not None:
+            lap_numbers.append(self.session.best_lap())
 
-        # 4. Obtener variables a graficar
+        # 3. Obtener variables a graficar
         checked_vars = []
         for i in range(self.comparison_widget.variable_list_widget.count()):
             item = self.comparison_widget.variable_list_widget.item(i)
             if item.checkState() == Qt.Checked:
                 checked_vars.append(item.text())
 
+        # 4. Remuestrear las vueltas sobre la rejilla común de distancia (cacheado por vuelta y canal)
+        channel_vars = [var for var in checked_vars if var != DELTA_VARIABLE]
+        distance, resampled = self.session.resample_laps(lap_numbers, channel_vars)
+        if DELTA_VARIABLE in checked_vars:
+            # Delta respecto a la mejor vuelta: su tiempo por distancia queda cacheado en la sesión
+            _, resampled[DELTA_VARIABLE] = self.session.delta_time(lap_numbers)
+        laps_to_plot_data = {}
+        for row, lap_num in enumerate(lap_numbers):
+            # La vuelta teórica se remuestrea y cachea como cualquier otra vuelta
+            lap_name = 'Teórica' if lap_num == THEORETICAL_LAP else f'Vuelta {lap_num}'
+            laps_to_plot_data[lap_name] = {var: resampled[var][row] for var in checked_vars}
+
+        # Vueltas de otras sesiones sobre la misma rejilla de distancia. Cada sesión remuestrea
+        # desde sus propias columnas (sin concatenar DataFrames) y cachea el resultado.
+        if reference_keys:
+            _, reference_elapsed = self.session.reference_elapsed() if DELTA_VARIABLE in checked_vars else (None, None)
+            for session_idx, lap_num in reference_keys:
+                label, ref_session = self.reference_sessions[session_idx]
+                _, ref_resampled = ref_session.resample_laps([lap_num], channel_vars, grid=distance)
+                lap_data = {var: ref_resampled[var][0] for var in channel_vars}
+                if DELTA_VARIABLE in checked_vars:
+                    _, elapsed = ref_session.elapsed_at_distance([lap_num], grid=distance)
+                    lap_data[DELTA_VARIABLE] = elapsed[0] - reference_elapsed if reference_elapsed is not None \
+                        else np.full(len(distance), np.nan)
+                laps_to_plot_data[f'{label} · V{lap_num}'] = lap_data
+
         # 5. Llamar a la función de dibujado
-        self.comparison_widget.update_plots(laps_to_plot_data, checked_vars)
\ No newline at end of file
+        self.comparison_widget.update_plots(distance, laps_to_plot_data, checked_vars)
\ No newline at end of file
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+File: TrackCenterline.py
+Created on 2025-08-04
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CENTERLINE_PARAMS = {
+    'bins': 2000,          # Vértices de la línea central (tramos iguales de LapDistPct)
+    'smooth_bins': 5,      # Ventana (en vértices) de la media móvil circular
+    'width_quantile': 0.05,  # La anchura va del cuantil q al 1 - q de los desvíos laterales
+}
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def _circular_smooth(values, window):
+    """ Media móvil centrada de una señal cerrada (el final de la vuelta enlaza con el principio). """
+    window = int(window)
+    if window <= 1 or len(values) < window:
+        return values
+    half = window // 2
+    padded = np.concatenate((values[-half:], values, values[:window - 1 - half]))
+    return np.convolve(padded, np.ones(window) / window, mode='valid')
+
+
+def _fill_circular(values):
+    """ Rellena los NaN interpolando entre los vecinos válidos, también a través de la meta. """
+    valid = np.isfinite(values)
+    if valid.all() or not valid.any():
+        return values
+    n = len(values)
+    idx = np.arange(n)
+    known = idx[valid]
+    return np.interp(idx, np.concatenate((known - n, known, known + n)),
+                     np.tile(values[valid], 3))
+
+
+class TrackCenterline:
+    """
+    Modelo compacto de la pista: una polilínea cerrada de unos pocos miles de vértices obtenida
+    de la mediana de Lat/Lon de todas las vueltas limpias en cada tramo de LapDistPct.
+    Cada vértice tiene coordenadas locales en metros, distancia acumulada, rumbo, curvatura
+    (1/m, positiva a la izquierda) y una estimación de la anchura usada por las trazadas.
+    """
+
+    def __init__(self, pct, lon, lat, width, rows, bins_of_rows):
+        self.pct = pct                  # Centro de cada tramo (0..1)
+        self.lon = lon
+        self.lat = lat
+        self.width = width              # m
+        self._rows = rows               # Filas posicionales usadas para construir el modelo
+        self._bins_of_rows = bins_of_rows
+        self._profiles = {}             # columna -> mediana por vértice (mapas de calor)
+
+        # Proyección equirectangular local: suficiente para el tamaño de un circuito
+        self.lat0 = float(np.mean(lat))
+        self.lon0 = float(np.mean(lon))
+        scale = np.pi / 180.0 * EARTH_RADIUS_M
+        self.x = (lon - self.lon0) * scale * np.cos(np.radians(self.lat0))
+        self.y = (lat - self.lat0) * scale
+
+        dx = np.roll(self.x, -1) - self.x
+        dy = np.roll(self.y, -1) - self.y
+        segment = np.hypot(dx, dy)
+        self.distance = np.concatenate(([0.0], np.cumsum(segment[:-1])))
+        self.length = float(segment.sum())
+
+        # Rumbo por diferencias centradas y curvatura = variación del rumbo por metro
+        self.heading = np.arctan2(np.roll(self.y, -1) - np.roll(self.y, 1), np.roll(self.x, -1) - np.roll(self.x, 1))
+        turn = np.angle(np.exp(1j * (np.roll(self.heading, -1) - np.roll(self.heading, 1))))
+        ds = segment + np.roll(segment, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.curvature = np.where(ds > 0, turn / ds, 0.0)
+
+    def __len__(self):
+        return len(self.pct)
+
+    def vertices(self):
+        """ Array plano [lon0, lat0, lon1, lat1, ...] para el TrackWidget. """
+        return np.column_stack((self.lon, self.lat)).ravel()
+
+    def bbox(self):
+        return {'min_lon': self.lon.min(), 'max_lon': self.lon.max(),
+                'min_lat': self.lat.min(), 'max_lat': self.lat.max()}
+
+    def bin_of(self, lap_dist_pct):
+        """ Vértice correspondiente a cada LapDistPct. """
+        bins = len(self.pct)
+        return np.clip((np.asarray(lap_dist_pct, dtype=np.float64) * bins).astype(np.int64), 0, bins - 1)
+
+    def profile(self, column, values):
+        """
+        Mediana de una columna (valores de todas las filas del DataFrame) en cada vértice, sobre
+        las mismas vueltas limpias que el modelo: el mapa de calor de la vista simplificada.
+        Se cachea por columna; discard_profiles la descarta si cambian sus valores.
+        """
+        if column not in self._profiles:
+            values = np.asarray(values, dtype=np.float64)[self._rows]
+            median = pd.Series(values).groupby(self._bins_of_rows).median()
+            profile = np.full(len(self.pct), np.nan)
+            profile[median.index.to_numpy()] = median.to_numpy()
+            self._profiles[column] = _fill_circular(profile)
+        return self._profiles[column]
+
+    def discard_profiles(self, columns=None):
+        if columns is None:
+            self._profiles = {}
+        for column in columns or []:
+            self._profiles.pop(column, None)
+
+
+def build_centerline(lap_dist_pct, lat, lon, clean=None, **params):
+    """
+    Línea central a partir de las muestras de la sesión. clean: máscara de las filas que se
+    usan (vueltas válidas y GPS correcto). Cada tramo toma la mediana de Lat/Lon, lo que ignora
+    salidas de pista y trazadas anómalas; los tramos vacíos se interpolan y el resultado se
+    suaviza con una media móvil circular. Devuelve None si no hay muestras suficientes.
+    """
+    p = dict(DEFAULT_CENTERLINE_PARAMS)
+    p.update(params)
+    bins = int(p['bins'])
+    pct = np.asarray(lap_dist_pct, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    usable = np.isfinite(pct) & np.isfinite(lat) & np.isfinite(lon) & (pct >= 0) & (pct <= 1)
+    if clean is not None:
+        usable &= np.asarray(clean, dtype=bool)
+    rows = np.flatnonzero(usable)
+    if len(rows) < bins // 10:
+        return None
+
+    bin_idx = np.clip((pct[rows] * bins).astype(np.int64), 0, bins - 1)
+    grouped = pd.DataFrame({'lat': lat[rows], 'lon': lon[rows]}).groupby(bin_idx).median()
+    occupied = grouped.index.to_numpy()
+    if len(occupied) < bins // 10:
+        return None
+    median_lat = np.full(bins, np.nan)
+    median_lon = np.full(bins, np.nan)
+    median_lat[occupied] = grouped['lat'].to_numpy()
+    median_lon[occupied] = grouped['lon'].to_numpy()
+    center_lat = _circular_smooth(_fill_circular(median_lat), p['smooth_bins'])
+    center_lon = _circular_smooth(_fill_circular(median_lon), p['smooth_bins'])
+
+    # Anchura: dispersión lateral de las muestras respecto a la línea central (en metros)
+    scale = np.pi / 180.0 * EARTH_RADIUS_M
+    cos_lat = np.cos(np.radians(np.mean(center_lat)))
+    cx, cy = center_lon * scale * cos_lat, center_lat * scale
+    tx, ty = np.roll(cx, -1) - np.roll(cx, 1), np.roll(cy, -1) - np.roll(cy, 1)
+    norm = np.hypot(tx, ty)
+    norm[norm == 0] = 1.0
+    tx, ty = tx / norm, ty / norm
+    ox = lon[rows] * scale * cos_lat - cx[bin_idx]
+    oy = lat[rows] * scale - cy[bin_idx]
+    lateral = pd.Series(ox * ty[bin_idx] - oy * tx[bin_idx]).groupby(bin_idx)
+    q = float(p['width_quantile'])
+    spread = (lateral.quantile(1 - q) - lateral.quantile(q))
+    width = np.full(bins, np.nan)
+    width[spread.index.to_numpy()] = spread.to_numpy()
+    width = _circular_smooth(_fill_circular(width), p['smooth_bins'])
+
+    centers = (np.arange(bins) + 0.5) / bins
+    return TrackCenterline(centers, center_lon, center_lat, width, rows, bin_idx)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+File: TrackSpatialIndex.py
+Created on 2025-08-05
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+
+METRES_PER_DEGREE = np.pi / 180.0 * 6371000.0
+DEFAULT_CELL_M = 5.0
+
+
+def points_in_polygon(x, y, poly_x, poly_y):
+    """
+    Máscara de los puntos (x, y) dentro del polígono (regla par-impar). Los puntos se ordenan por y
+    para que cada arista solo se compare con los puntos de su franja horizontal: un lazo dibujado
+    a mano tiene cientos de aristas cortas y cada punto solo cruza unas pocas.
+    """
+    order = np.argsort(y, kind='stable')
+    xs, ys = x[order], y[order]
+    inside = np.zeros(len(x), dtype=bool)
+    for i in range(len(poly_x)):
+        x0, y0 = poly_x[i - 1], poly_y[i - 1]
+        x1, y1 = poly_x[i], poly_y[i]
+        if y0 == y1:
+            continue
+        lo, hi = np.searchsorted(ys, [min(y0, y1), max(y0, y1)], side='left')
+        band = slice(lo, hi)
+        inside[band] ^= xs[band] < x0 + (ys[band] - y0) * (x1 - x0) / (y1 - y0)
+    result = np.empty(len(x), dtype=bool)
+    result[order] = inside
+    return result
+
+
+class TrackSpatialIndex:
+    """
+    Índice espacial de posiciones GPS por celdas cuadradas (grid buckets) en metros. Los puntos
+    se ordenan por celda, de modo que cada columna de celdas de una consulta es un tramo contiguo
+    del array ordenado que se localiza con dos búsquedas binarias. Buscar el punto más cercano al
+    ratón o los puntos de un lazo o rectángulo solo recorre las celdas afectadas, no todas las muestras.
+    Las consultas devuelven índices de los arrays originales de lon/lat.
+    """
+
+    def __init__(self, lon, lat, valid=None, cell_m=DEFAULT_CELL_M):
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        usable = np.isfinite(lon) & np.isfinite(lat)
+        if valid is not None:
+            usable &= np.asarray(valid, dtype=bool)
+        points = np.flatnonzero(usable)
+        self.size = len(lon)
+        self.cell_m = float(cell_m)
+        if len(points) == 0:
+            self.lon0 = self.lat0 = 0.0
+            self._kx = self._ky = METRES_PER_DEGREE
+            self._nx = self._ny = 0
+            self._keys = np.empty(0, dtype=np.int64)
+            self._points = np.empty(0, dtype=np.int64)
+            self._x = self._y = np.empty(0)
+            return
+
+        # Proyección equirectangular local desde la esquina inferior izquierda
+        self.lon0 = float(lon[points].min())
+        self.lat0 = float(lat[points].min())
+        self._ky = METRES_PER_DEGREE
+        self._kx = METRES_PER_DEGREE * np.cos(np.radians(float(lat[points].mean())))
+        x = (lon[points] - self.lon0) * self._kx
+        y = (lat[points] - self.lat0) * self._ky
+        cx = (x // self.cell_m).astype(np.int64)
+        cy = (y // self.cell_m).astype(np.int64)
+        self._nx = int(cx.max()) + 1
+        self._ny = int(cy.max()) + 1
+
+        keys = cx * self._ny + cy
+        order = np.argsort(keys, kind='stable')  # Dentro de cada celda se conserva el orden de filas
+        self._keys = keys[order]
+        self._points = points[order]
+        self._x = x[order]
+        self._y = y[order]
+
+    def __len__(self):
+        return len(self._points)
+
+    def to_local(self, lon, lat):
+        """ Coordenadas locales (m) del índice para lon/lat. """
+        return ((np.asarray(lon, dtype=np.float64) - self.lon0) * self._kx,
+                (np.asarray(lat, dtype=np.float64) - self.lat0) * self._ky)
+
+    def _candidates(self, x0, y0, x1, y1):
+        """ Posiciones (en el orden interno) de los puntos de las celdas que cubren el rectángulo. """
+        if len(self._points) == 0:
+            return np.empty(0, dtype=np.int64)
+        cx0 = max(0, int(np.floor(x0 / self.cell_m)))
+        cx1 = min(self._nx - 1, int(np.floor(x1 / self.cell_m)))
+        cy0 = max(0, int(np.floor(y0 / self.cell_m)))
+        cy1 = min(self._ny - 1, int(np.floor(y1 / self.cell_m)))
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+        columns = np.arange(cx0, cx1 + 1, dtype=np.int64) * self._ny
+        lo = np.searchsorted(self._keys, columns + cy0, side='left')
+        hi = np.searchsorted(self._keys, columns + cy1, side='right')
+        lengths = hi - lo
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Concatenación de los tramos [lo, hi) sin bucle de Python
+        starts = np.repeat(lo - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return starts + np.arange(total)
+
+    def nearest(self, lon, lat, max_dist_m, mask=None):
+        """
+        Punto más cercano a (lon, lat) a menos de max_dist_m metros. mask: booleano por punto
+        original (p. ej. los visibles con el filtro actual). Devuelve (índice, distancia) o None.
+        """
+        x, y = self.to_local(lon, lat)
+        candidates = self._candidates(x - max_dist_m, y - max_dist_m, x + max_dist_m, y + max_dist_m)
+        if mask is not None and len(candidates):
+            candidates = candidates[mask[self._points[candidates]]]
+        if len(candidates) == 0:
+            return None
+        dist2 = (self._x[candidates] - x) ** 2 + (self._y[candidates] - y) ** 2
+        best = int(np.argmin(dist2))
+        if dist2[best] > max_dist_m ** 2:
+            return None
+        return int(self._points[candidates[best]]), float(np.sqrt(dist2[best]))
+
+    def in_polygon(self, poly_lon, poly_lat, mask=None):
+        """ Índices (ordenados) de los puntos dentro del polígono (lazo) dado por sus vértices lon/lat. """
+        if len(poly_lon) < 3:
+            return np.empty(0, dtype=np.int64)
+        px, py = self.to_local(poly_lon, poly_lat)
+        candidates = self._candidates(px.min(), py.min(), px.max(), py.max())
+        inside = candidates[points_in_polygon(self._x[candidates], self._y[candidates], px, py)]
+        points = self._points[inside]
+        if mask is not None:
+            points = points[mask[points]]
+        return np.sort(points)
@@ -17,12 +17,16 @@ from PySide6.QtCore import Qt, QSettings, Signal, QPoint, QRect
 from OpenGL.GL import *
 from matplotlib import cm 
 from GLTFModel import GLTFModel
+from TrackSpatialIndex import METRES_PER_DEGREE
 
 from TelemetrySession import TelemetrySession
 from utils import resource_path
 
 class TrackWidget(QOpenGLWidget):
     mouse_coord_changed = Signal(float, float)
+    point_hovered = Signal(float, float, float)   # (lon, lat, radio de búsqueda en m) sin botones pulsados
+    point_clicked = Signal(float, float, float)   # (lon, lat, radio de búsqueda en m) clic sin arrastrar
+    region_selected = Signal(object, object)      # (lon, lat) de los vértices del lazo/rectángulo; vacíos = borrar
 
     """
     Este widget es el lienzo de OpenGL donde dibujaremos la pista.
@@ -38,16 +42,29 @@ class TrackWidget(QOpenGLWidget):
         self.point_size_normal = 3.0
         self.point_size_lowlight = 1.0
         self.point_size_marker = 15.0
+        self.line_width = 4.0
+        self.closed_line = False   # True: los vértices son una polilínea cerrada (línea central)
 
         # Variables para paneo y zoom
         self.pan_x = 0.0
         self.pan_y = 0.0
         self.zoom = 1.0
         self._last_mouse_pos = None
+        self._press_pos = None
+        self.pick_radius_px = 8
+        # Región de interés: Mayús + arrastrar dibuja un lazo, Ctrl + arrastrar un rectángulo
+        self._region_mode = None
+        self._region_screen = []
+        self.region_vertices = None  # Array plano [lon0, lat0, ...] de la región dibujada
+        self.setMouseTracking(True)  # mouseMoveEvent también sin botones (tooltip del punto bajo el cursor)
 
         self.map_texture_id = None
         self.map_image = None
 
+        # Marcadores de eventos (bloqueos, patinaje...): pocos cientos de puntos grandes
+        self.marker_vertices = None
+        self.marker_colors = None
+
         self.car_model = GLTFModel()        # Creamos una instancia de nuestra nueva clase
         self.current_car_pos = None     # Guardará (Lon, Lat, Alt)
         self.current_car_yaw = 0.0      # Guardará la orientación
@@ -66,10 +83,22 @@ class TrackWidget(QOpenGLWidget):
             self.current_car_pos = None
         self.update()
 
-    def setData(self, vertices, colors, track_bbox, map_image, map_bbox):
+    def set_event_markers(self, vertices, colors):
+        """ vertices: array plano [lon0, lat0, lon1, lat1, ...]; colors: RGBA float32 por marcador. """
+        if vertices is None or len(vertices) == 0:
+            self.marker_vertices = None
+            self.marker_colors = None
+        else:
+            self.marker_vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+            self.marker_colors = np.ascontiguousarray(colors, dtype=np.float32)
+        self.update()
+
+    def setData(self, vertices, colors, track_bbox, map_image, map_bbox, closed_line=False):
         """
         Recibe los datos ya procesados (vértices, colores, bounding box) y los prepara para OpenGL.
+        closed_line: dibuja los vértices como una línea cerrada en lugar de como puntos sueltos.
         """
+        self.closed_line = closed_line
         self.vertices = vertices
         self.colors = colors
         self.track_bbox = track_bbox
@@ -82,6 +111,22 @@ class TrackWidget(QOpenGLWidget):
         #self.reset_view() # Reseteamos la vista al cargar nuevos datos
         self.update() # Le decimos al widget que necesita redibujarse
 
+    def append_data(self, vertices, colors, valid_lon=None, valid_lat=None):
+        """
+        Añade puntos al final de los ya cargados (modo seguimiento) sin reprocesar los anteriores.
+        valid_lon/valid_lat: coordenadas válidas de los puntos nuevos para ampliar el bounding box.
+        """
+        if self.vertices is None or self.colors is None:
+            return
+        self.vertices = np.concatenate((self.vertices, vertices))
+        self.colors = np.concatenate((self.colors, colors))
+        if self.track_bbox is not None and valid_lon is not None and len(valid_lon) > 0:
+            self.track_bbox = {'min_lon': min(self.track_bbox['min_lon'], valid_lon.min()),
+                               'max_lon': max(self.track_bbox['max_lon'], valid_lon.max()),
+                               'min_lat': min(self.track_bbox['min_lat'], valid_lat.min()),
+                               'max_lat': max(self.track_bbox['max_lat'], valid_lat.max())}
+        self.update()
+
     def update_map_texture(self):
         """ Convierte la QImage en una textura de OpenGL. """
         if self.map_texture_id is not None:
@@ -199,12 +244,35 @@ class TrackWidget(QOpenGLWidget):
             glVertexPointer(2, GL_DOUBLE, 0, self.vertices)
             glColorPointer(4, GL_FLOAT, 0, self.colors)
             
-            # Dibujamos todos los puntos de una sola vez (muy eficiente)
-            glDrawArrays(GL_POINTS, 0, len(self.vertices) // 2)
+            if self.closed_line:
+                glLineWidth(self.line_width)
+                glDrawArrays(GL_LINE_LOOP, 0, len(self.vertices) // 2)
+            else:
+                # Dibujamos todos los puntos de una sola vez (muy eficiente)
+                glDrawArrays(GL_POINTS, 0, len(self.vertices) // 2)
 
             glDisableClientState(GL_COLOR_ARRAY)
             glDisableClientState(GL_VERTEX_ARRAY)
 
+        if self.marker_vertices is not None:
+            glPointSize(self.point_size_marker)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glEnableClientState(GL_COLOR_ARRAY)
+            glVertexPointer(2, GL_DOUBLE, 0, self.marker_vertices)
+            glColorPointer(4, GL_FLOAT, 0, self.marker_colors)
+            glDrawArrays(GL_POINTS, 0, len(self.marker_vertices) // 2)
+            glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glPointSize(self.point_size_normal)
+
+        if self.region_vertices is not None:
+            glColor4f(1.0, 1.0, 1.0, 0.9)
+            glLineWidth(1.5)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(2, GL_DOUBLE, 0, self.region_vertices)
+            glDrawArrays(GL_LINE_LOOP, 0, len(self.region_vertices) // 2)
+            glDisableClientState(GL_VERTEX_ARRAY)
+
         if self.current_car_pos is not None:
             glDisable(GL_TEXTURE_2D)
             glPushMatrix()
@@ -240,11 +308,54 @@ class TrackWidget(QOpenGLWidget):
         glBindTexture(GL_TEXTURE_2D, 0)
         glDisable(GL_TEXTURE_2D)
 
+    def screen_to_world(self, pos):
+        """ Convierte una posición en píxeles del widget a (lon, lat). """
+        left, right, bottom, top = self.get_world_limits()
+        mx = pos.x() / self.width()
+        my = 1.0 - pos.y() / self.height()
+        return left + mx * (right - left), bottom + my * (top - bottom)
+
+    def pick_radius_m(self):
+        """ Radio de búsqueda bajo el cursor (pick_radius_px píxeles) en metros. """
+        left, right, bottom, top = self.get_world_limits()
+        return self.pick_radius_px * (top - bottom) / max(1, self.height()) * METRES_PER_DEGREE
+
+    def set_region(self, lon, lat):
+        """ Dibuja (o borra, con None) el contorno de la región de interés. """
+        if lon is None or len(lon) < 3:
+            self.region_vertices = None
+        else:
+            self.region_vertices = np.column_stack((lon, lat)).ravel().astype(np.float64)
+        self.update()
+
+    def _region_polygon(self):
+        """ Vértices (lon, lat) de la región que se está dibujando. """
+        points = self._region_screen
+        if self._region_mode == 'rect' and len(points) == 2:
+            (x0, y0), (x1, y1) = points
+            points = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        world = [self.screen_to_world(QPoint(x, y)) for x, y in points]
+        return np.array([w[0] for w in world]), np.array([w[1] for w in world])
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
+            if self.track_bbox and event.modifiers() & (Qt.ShiftModifier | Qt.ControlModifier):
+                self._region_mode = 'lasso' if event.modifiers() & Qt.ShiftModifier else 'rect'
+                self._region_screen = [(event.x(), event.y())]
+                return
             self._last_mouse_pos = event.pos()
+            self._press_pos = event.pos()
 
     def mouseMoveEvent(self, event):
+        if self._region_mode is not None:
+            x, y = event.x(), event.y()
+            if self._region_mode == 'rect':
+                self._region_screen = self._region_screen[:1] + [(x, y)]
+            elif abs(x - self._region_screen[-1][0]) + abs(y - self._region_screen[-1][1]) >= 4:
+                self._region_screen.append((x, y))  # El lazo guarda un vértice cada pocos píxeles
+            self.set_region(*self._region_polygon())
+            return
+
         if self._last_mouse_pos is not None and event.buttons() & Qt.LeftButton:
             dx = event.x() - self._last_mouse_pos.x()
             dy = event.y() - self._last_mouse_pos.y()
@@ -284,16 +395,29 @@ class TrackWidget(QOpenGLWidget):
 
         # Calcular lon/lat bajo el mouse SIEMPRE que se mueve el mouse
         if self.track_bbox:
-            left, right, bottom, top = self.get_world_limits()
-            mx = event.x() / self.width()
-            my = 1.0 - event.y() / self.height()
-            lon = left + mx * (right - left)
-            lat = bottom + my * (top - bottom)
+            lon, lat = self.screen_to_world(event.pos())
             self.mouse_coord_changed.emit(lon, lat)
+            if event.buttons() == Qt.NoButton:
+                self.point_hovered.emit(lon, lat, self.pick_radius_m())
 
     def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self._region_mode is not None:
+            lon, lat = self._region_polygon()
+            self._region_mode = None
+            self._region_screen = []
+            if len(lon) < 3:
+                lon, lat = np.empty(0), np.empty(0)  # Mayús/Ctrl + clic sin arrastrar borra la región
+            self.set_region(lon, lat)
+            self.region_selected.emit(lon, lat)
+            return
         if event.button() == Qt.LeftButton:
             self._last_mouse_pos = None
+            # Un clic sin arrastrar (el arrastre es paneo) selecciona el punto bajo el cursor
+            if self._press_pos is not None and self.track_bbox \
+                    and (event.pos() - self._press_pos).manhattanLength() < 4:
+                lon, lat = self.screen_to_world(event.pos())
+                self.point_clicked.emit(lon, lat, self.pick_radius_m())
+            self._press_pos = None
 
     def wheelEvent(self, event):
         # Zoom centrado en el cursor
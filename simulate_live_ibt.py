@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+File: simulate_live_ibt.py
+Created on 2025-07-29
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+
+Simula un .ibt que iRacing está escribiendo: copia las cabeceras y los primeros registros de
+un archivo existente y va añadiendo el resto por bloques, para probar el modo "Seguir archivo".
+
+    python simulate_live_ibt.py <origen.ibt> <destino.ibt> [--initial-seconds 30] [--rate 1.0]
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from IbtReader import IbtReader, _DISK_HEADER_OFFSET, _DISK_HEADER_DTYPE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Añade registros de un .ibt a una copia, como en una sesión en directo.")
+    parser.add_argument('source', help="Archivo .ibt completo de origen")
+    parser.add_argument('destination', help="Copia que se irá ampliando")
+    parser.add_argument('--initial-seconds', type=float, default=30.0, help="Segundos de telemetría escritos al inicio")
+    parser.add_argument('--interval', type=float, default=1.0, help="Segundos reales entre escrituras")
+    parser.add_argument('--rate', type=float, default=1.0, help="Segundos de telemetría por segundo real")
+    args = parser.parse_args(argv)
+
+    reader = IbtReader(args.source)
+    buf_offset = int(reader.header['var_buf'][0]['buf_offset'])
+    buf_len = int(reader.header['buf_len'])
+    tick_rate = reader.tick_rate or 60
+    total = reader.record_count
+    reader.close()
+
+    with open(args.source, 'rb') as src:
+        prefix = bytearray(src.read(buf_offset))
+    # Como en una sesión abierta, el contador de registros del disco todavía vale 0
+    disk_header = np.frombuffer(bytes(prefix[_DISK_HEADER_OFFSET:_DISK_HEADER_OFFSET + _DISK_HEADER_DTYPE.itemsize]),
+                                dtype=_DISK_HEADER_DTYPE).copy()
+    disk_header['session_record_count'] = 0
+    prefix[_DISK_HEADER_OFFSET:_DISK_HEADER_OFFSET + _DISK_HEADER_DTYPE.itemsize] = disk_header.tobytes()
+
+    written = min(total, int(args.initial_seconds * tick_rate))
+    chunk = max(1, int(args.interval * args.rate * tick_rate))
+    with open(args.source, 'rb') as src, open(args.destination, 'wb') as dst:
+        dst.write(prefix)
+        src.seek(buf_offset)
+        dst.write(src.read(written * buf_len))
+        dst.flush()
+        print(f"INFO: {written} de {total} registros escritos en '{args.destination}'.")
+        while written < total:
+            time.sleep(args.interval)
+            count = min(chunk, total - written)
+            dst.write(src.read(count * buf_len))
+            dst.flush()
+            written += count
+            print(f"INFO: {written} de {total} registros escritos.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+File: conftest.py
+Created on 2025-08-06
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import os
+import sys
+
+# Los módulos de la aplicación están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
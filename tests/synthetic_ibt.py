@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+File: synthetic_ibt.py
+Created on 2025-08-06
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import struct
+
+import numpy as np
+
+SESSION_YAML = ("WeekendInfo:\n TrackName: spa\n TrackDisplayName: Spa\n"
+                "DriverInfo:\n Drivers:\n - CarScreenName: Dallara F3\n")
+
+# (nombre, tipo iRacing): 1 bool, 2 int, 4 float, 5 double
+CHANNELS = [('SessionTime', 5), ('Lap', 2), ('LapDistPct', 4), ('LapDist', 4), ('Speed', 4), ('RPM', 4),
+            ('Throttle', 4), ('Brake', 4), ('Gear', 2), ('Lat', 5), ('Lon', 5), ('Alt', 4),
+            ('SteeringWheelAngle', 4), ('Yaw', 4), ('YawRate', 4), ('LatAccel', 4), ('LongAccel', 4),
+            ('VertAccel', 4), ('LFspeed', 4), ('RFspeed', 4), ('LRspeed', 4), ('RRspeed', 4),
+            ('BrakeABSactive', 1)]
+_SIZES = {1: 1, 2: 4, 4: 4, 5: 8}
+_FORMATS = {1: '?', 2: '<i4', 4: '<f4', 5: '<f8'}
+
+
+def telemetry(seconds, hz=60, lap_s=60.0):
+    """ Canales de una sesión sintética: vueltas de lap_s segundos sobre un óvalo con bloqueos y patinadas. """
+    t = np.arange(int(round(seconds * hz))) / hz
+    pct = (t % lap_s) / lap_s
+    ang = pct * 2 * np.pi
+    wave = np.sin(ang * 4)
+    speed = 50 + 20 * wave
+    data = {'SessionTime': t, 'Lap': (t // lap_s).astype(int) + 1, 'LapDistPct': pct, 'LapDist': pct * 4000,
+            'Speed': speed, 'RPM': 8000 + 1000 * np.sin(ang * 3), 'Throttle': np.clip(wave + 0.5, 0, 1),
+            'Brake': np.clip(-wave - 0.3, 0, 1), 'Gear': (3 + 2 * wave).astype(int),
+            'Lat': 50.44 + 0.005 * np.sin(ang), 'Lon': 5.97 + 0.008 * np.cos(ang), 'Alt': np.zeros_like(t),
+            'SteeringWheelAngle': np.sin(ang * 8), 'Yaw': ang, 'YawRate': np.cos(ang * 4) * 0.5,
+            'LatAccel': 15 * np.sin(ang * 8), 'LongAccel': 5 * np.cos(ang * 4), 'VertAccel': 9.81 + np.sin(ang),
+            'BrakeABSactive': wave < -0.9}
+    for wheel in ['LFspeed', 'RFspeed', 'LRspeed', 'RRspeed']:
+        data[wheel] = speed.copy()
+    data['LFspeed'][wave < -0.95] = 0.5
+    data['LRspeed'][wave > 0.9] *= 1.3
+    data['RRspeed'][wave > 0.9] *= 1.3
+    return data
+
+
+def write_ibt(path, seconds, hz=60, lap_s=60.0, live=False):
+    """
+    Escribe un .ibt con la estructura del SDK de iRacing (cabecera, sub-header de disco, cabeceras
+    de variables, YAML y registros). live: deja a 0 el contador de registros del sub-header, como
+    en un archivo que iRacing todavía está grabando.
+    """
+    data = telemetry(seconds, hz, lap_s)
+    offsets, buf_len = [], 0
+    for _, var_type in CHANNELS:
+        offsets.append(buf_len)
+        buf_len += _SIZES[var_type]
+    n = len(data['SessionTime'])
+    yaml = SESSION_YAML.encode()
+    yaml_offset = 144 + 144 * len(CHANNELS)
+    buf_offset = yaml_offset + len(yaml) + 16
+
+    dtype = np.dtype({'names': [name for name, _ in CHANNELS],
+                      'formats': [_FORMATS[var_type] for _, var_type in CHANNELS],
+                      'offsets': offsets, 'itemsize': buf_len})
+    rows = np.zeros(n, dtype=dtype)
+    for name, _ in CHANNELS:
+        rows[name] = data[name]
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<12i', 2, 1, hz, 1, len(yaml), yaml_offset, len(CHANNELS), 144, 1, buf_len, 0, 0))
+        f.write(struct.pack('<4i', n, buf_offset, n, 0) + b'\0' * 48)
+        f.write(struct.pack('<Qddii', 1751000000, 0.0, float(data['SessionTime'][-1]),
+                            int(data['Lap'][-1]), 0 if live else n))
+        for (name, var_type), offset in zip(CHANNELS, offsets):
+            f.write(struct.pack('<iii?3x32s64s32s', var_type, offset, 1, False, name.encode(), b'', b''))
+        f.write(yaml)
+        f.write(b'\0' * 16)
+        f.write(rows.tobytes())
+    return str(path)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+File: test_batch_processor.py
+Created on 2025-08-07
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+from BatchProcessor import process_file
+from synthetic_ibt import write_ibt
+
+
+def test_best_lap_ignores_partial_final_lap(tmp_path):
+    # 5 vueltas de 60 s y un tramo de 3.4 s al cerrar la sesión
+    ibt_path = write_ibt(tmp_path / 'stub.ibt', seconds=5 * 60 + 3.4)
+    result = process_file(ibt_path, str(tmp_path), formats=())
+    assert result['Error'] is None
+    assert result['Laps'] == 6
+    assert result['BestLap'] in [1, 2, 3, 4, 5]
+    assert result['BestTime'] > 59
+    assert (tmp_path / 'stub_laps.csv').exists()
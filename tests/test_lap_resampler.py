@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+File: test_lap_resampler.py
+Created on 2025-08-07
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+
+from synthetic_ibt import write_ibt
+from TelemetrySession import TelemetrySession
+
+
+def test_elapsed_with_wrapped_lap_dist_at_lap_start(tmp_path):
+    session = TelemetrySession(write_ibt(tmp_path / 'laps.ibt', seconds=3 * 60))
+    # Las dos primeras muestras de la vuelta 2 todavía llevan la distancia de la vuelta anterior
+    start = session.lap_index[2][0]
+    df = session.dataframe
+    df.iloc[start:start + 2, df.columns.get_loc('LapDist')] = [3998.0, 3999.5]
+
+    grid, elapsed = session.elapsed_at_distance([2])
+    finite = elapsed[0][np.isfinite(elapsed[0])]
+    assert np.all(np.diff(finite) >= 0)
+    assert finite[-1] > 59
+
+    _, delta = session.delta_time([2], reference_lap=3)
+    assert np.nanmax(np.abs(delta)) < 0.1
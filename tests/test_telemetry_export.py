@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+File: test_telemetry_export.py
+Created on 2025-08-06
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+import pytest
+
+from TelemetryExport import format_fixed
+
+
+def _reference(value, decimals):
+    if decimals == 0:
+        if np.isnan(value):
+            return ''
+        return f"{int(round(value))}" if np.isfinite(value) else f"{value:.0f}"
+    return f"{value:.{decimals}f}"
+
+
+@pytest.mark.parametrize('decimals', [0, 1, 2, 3, 4, 5, 7])
+def test_format_fixed_matches_fstring_on_ties(decimals):
+    rng = np.random.default_rng(decimals)
+    ties = (rng.integers(-10**6, 10**6, 50_000) + 0.5) / 10**decimals
+    noise = rng.normal(0, 1000, 50_000)
+    special = [np.nan, np.inf, -np.inf, -0.0, -0.3, 0.5, -0.5, 1.315, 0.0115, 1e300]
+    values = np.concatenate((ties, noise, special))
+    expected = [_reference(v, decimals) for v in values]
+    assert list(format_fixed(values, decimals)) == expected
+
+
+def test_format_fixed_known_ties():
+    assert list(format_fixed([1.315, 0.0115], 2)) == ['1.31', '0.01']
+    assert list(format_fixed([0.0115], 3)) == ['0.011']
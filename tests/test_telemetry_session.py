@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+File: test_telemetry_session.py
+Created on 2025-08-06
+@author: Carlo Calderón Becerra
+@company: CarcaldeF1
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from IbtReader import IbtReader
+from MathChannels import MathChannelError
+from synthetic_ibt import write_ibt
+from TelemetrySession import TelemetrySession
+
+
+def _load(path):
+    """ Misma secuencia que el hilo de carga de la aplicación. """
+    session = TelemetrySession(path)
+    session.filter_driving_columns()
+    session.remove_problematic_rows()
+    return session
+
+
+def test_best_lap_ignores_partial_final_lap(tmp_path):
+    # 5 vueltas de 60 s y un tramo de 3.4 s al cerrar la sesión
+    session = TelemetrySession(write_ibt(tmp_path / 'stub.ibt', seconds=5 * 60 + 3.4))
+    assert session.laps_df['Lap'].tolist() == [1, 2, 3, 4, 5, 6]
+    assert session.complete_laps() == [1, 2, 3, 4, 5]
+    assert session.best_lap() in [1, 2, 3, 4, 5]
+
+
+def test_best_lap_ignores_invalid_laps(tmp_path):
+    session = TelemetrySession(write_ibt(tmp_path / 'laps.ibt', seconds=3 * 60))
+    session.invalid_laps = {lap for lap in session.complete_laps() if lap != 2}
+    assert session.best_lap() == 2
+
+
+def test_theoretical_lap_follows_laps_df_assignment(tmp_path):
+    session = TelemetrySession(write_ibt(tmp_path / 'laps.ibt', seconds=3 * 60))
+    session.get_theoretical_best_lap_data()
+    version = session.laps_version
+    laps_df = session.laps_df.copy()
+    laps_df.loc[laps_df['Lap'] != 3, 'S1'] += 1.0
+    session.laps_df = laps_df
+    assert session.laps_version == version + 1
+    theoretical = session.get_theoretical_best_lap_data()
+    assert theoretical['SourceLap'].iloc[0] == 3
+
+
+def test_follow_update_matches_fresh_load(tmp_path):
+    full = write_ibt(tmp_path / 'full.ibt', seconds=3 * 60 + 20)
+    reader = IbtReader(full)
+    buf_offset = int(reader.header['var_buf'][0]['buf_offset'])
+    buf_len = int(reader.header['buf_len'])
+    reader.close()
+    content = open(write_ibt(tmp_path / 'growing.ibt', seconds=3 * 60 + 20, live=True), 'rb').read()
+
+    # El archivo "en directo" empieza con 70 s grabados y crece dos veces
+    live = tmp_path / 'live.ibt'
+    sizes = [buf_offset + 70 * 60 * buf_len, buf_offset + 150 * 60 * buf_len, len(content)]
+    live.write_bytes(content[:sizes[0]])
+    followed = _load(str(live))
+    for size in sizes[1:]:
+        with open(live, 'ab') as f:
+            f.write(content[f.tell():size])
+        assert followed.follow_update() is not None
+
+    fresh = _load(full)
+    assert list(followed.dataframe.columns) == list(fresh.dataframe.columns)
+    assert followed.dataframe['LF_Lockup'].any() and followed.dataframe['WheelSpin'].any()
+    for column in fresh.dataframe.columns:
+        np.testing.assert_array_equal(followed.dataframe[column].to_numpy(), fresh.dataframe[column].to_numpy(),
+                                      err_msg=column)
+    pd.testing.assert_frame_equal(followed.laps_df.reset_index(drop=True), fresh.laps_df, check_dtype=False)
+    assert followed.invalid_laps == fresh.invalid_laps
+
+
+def test_math_channel_cannot_replace_telemetry_column(tmp_path):
+    session = _load(write_ibt(tmp_path / 'laps.ibt', seconds=2 * 60))
+    session.define_math_channels([('SpeedKmh', 'Speed * 3.6')])
+    session.ensure_columns(['SpeedKmh'])
+    for name in ['Lap', 'LFspeed', 'LF_Lockup']:
+        with pytest.raises(MathChannelError):
+            session.define_math_channels([(name, 'Speed * 0')])
+    assert 'Lap' in session.dataframe.columns and 'SpeedKmh' in session.dataframe.columns
+
+    session.define_math_channels([])
+    assert 'SpeedKmh' not in session.dataframe.columns
+    assert 'Lap' in session.dataframe.columns
+
+
+def test_corner_analysis_reference_skips_partial_final_lap(tmp_path):
+    session = _load(write_ibt(tmp_path / 'stub.ibt', seconds=5 * 60 + 3.4))
+    corners, _ = session.corner_analysis()
+    reference, _ = session.corner_analysis(reference_lap=1)
+    assert len(corners) == len(reference) > 1